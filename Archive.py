@@ -0,0 +1,169 @@
+import argparse  # Import argparse to read command line options
+import glob  # Import glob to find the yearly archive files
+import os  # Import os to build archive file names
+import re  # Import regular expressions to read the year out of an archive file name
+import sqlite3  # Import sqlite3 to catch database errors
+from datetime import date, timedelta  # Import date to work out the default cutoff
+import Gym_db  # Shared connection helper that enforces foreign keys
+
+# Archive files sit next to the live database, one per class year
+ARCHIVE_PATTERN = 'gym_archive_{year}.db'
+
+# Classes moved per transaction
+CHUNK_SIZE = 200
+
+# Archived tables and their keys, parents first
+ARCHIVED_TABLES = {
+    'classes': ('class_id',),
+    'member_class': ('member_id', 'class_id'),
+    'assignments': ('assignment_id',),
+    'trainer_hours': ('record_id',),
+}
+
+# Class dates are stored as DD/MM/YYYY; this turns them into sortable YYYY-MM-DD
+CLASS_ISO_DATE = "substr(date, 7, 4) || '-' || substr(date, 4, 2) || '-' || substr(date, 1, 2)"
+
+
+def archive_path(year, folder='.'):
+    return os.path.join(folder, ARCHIVE_PATTERN.format(year=year))
+
+
+def table_columns(conn, table, schema='main'):
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def create_archive_tables(conn, schema='archive'):
+    """Create the archive copies of the tables (same columns and keys, no foreign keys)"""
+    for table, key in ARCHIVED_TABLES.items():
+        columns = table_columns(conn, table)
+        # Foreign keys would point at tables (members, trainers) the archive does not hold
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {schema}.{table} "
+            f"({', '.join(columns)}, PRIMARY KEY ({', '.join(key)}))"
+        )
+
+
+def classes_to_archive(conn, cutoff):
+    """Map each year to the IDs of classes held before cutoff (an ISO date string)"""
+    years = {}
+    for class_id, year in conn.execute(f'''
+        SELECT class_id, substr(date, 7, 4) FROM classes
+        WHERE date LIKE '__/__/____' AND {CLASS_ISO_DATE} < ?
+        ORDER BY class_id
+    ''', (cutoff,)):
+        years.setdefault(year, []).append(class_id)
+    return years
+
+
+def move_chunk(conn, class_ids):
+    """Copy a chunk of classes and everything hanging off them to the archive, then delete them"""
+    conn.execute("DELETE FROM temp.archive_batch")
+    conn.executemany("INSERT INTO temp.archive_batch VALUES (?)", ((class_id,) for class_id in class_ids))
+
+    selections = {
+        'classes': "class_id IN (SELECT class_id FROM temp.archive_batch)",
+        'member_class': "class_id IN (SELECT class_id FROM temp.archive_batch)",
+        'assignments': "class_id IN (SELECT class_id FROM temp.archive_batch)",
+        'trainer_hours': '''assignment_id IN (
+            SELECT assignment_id FROM main.assignments
+            WHERE class_id IN (SELECT class_id FROM temp.archive_batch))''',
+    }
+    with conn:
+        for table, where in selections.items():
+            columns = ', '.join(table_columns(conn, table))
+            # OR REPLACE makes a re-run after an interrupted move harmless
+            conn.execute(
+                f"INSERT OR REPLACE INTO archive.{table} ({columns}) "
+                f"SELECT {columns} FROM main.{table} WHERE {where}"
+            )
+        # Signups, assignments and their hours go with the class through the cascades
+        conn.execute("DELETE FROM main.classes WHERE class_id IN (SELECT class_id FROM temp.archive_batch)")
+
+
+def archive_before(conn, cutoff, folder='.', chunk_size=CHUNK_SIZE):
+    """Move classes held before cutoff into yearly archive files; returns {year: classes moved}"""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch (class_id TEXT PRIMARY KEY)")
+    moved = {}
+    for year, class_ids in classes_to_archive(conn, cutoff).items():
+        conn.execute("ATTACH DATABASE ? AS archive", (archive_path(year, folder),))
+        try:
+            create_archive_tables(conn)
+            for start in range(0, len(class_ids), chunk_size):
+                move_chunk(conn, class_ids[start:start + chunk_size])
+                moved[year] = moved.get(year, 0) + len(class_ids[start:start + chunk_size])
+                print(f"{year}: {moved[year]} of {len(class_ids)} classes archived")
+        finally:
+            conn.execute("DETACH DATABASE archive")
+    return moved
+
+
+def compact(conn):
+    """Return the space freed by archiving to the file system"""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        # Switching to incremental mode only takes effect after one full VACUUM
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    else:
+        conn.execute("PRAGMA incremental_vacuum")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def attach_archives(conn, folder='.'):
+    """Attach every yearly archive and create temp views all_<table> over live plus archived rows; returns the years"""
+    years = []
+    for path in sorted(glob.glob(os.path.join(folder, ARCHIVE_PATTERN.format(year='*')))):
+        match = re.search(r'(\d{4})\.db$', path)
+        if match:
+            conn.execute(f"ATTACH DATABASE ? AS archive_{match.group(1)}", (path,))
+            years.append(match.group(1))
+
+    # Views that span attached databases have to be temporary
+    for table in ARCHIVED_TABLES:
+        columns = ', '.join(table_columns(conn, table))
+        parts = [f"SELECT {columns}, 'live' AS source FROM main.{table}"]
+        parts += [f"SELECT {columns}, '{year}' FROM archive_{year}.{table}" for year in years]
+        conn.execute(f"DROP VIEW IF EXISTS temp.all_{table}")
+        conn.execute(f"CREATE TEMP VIEW all_{table} AS " + " UNION ALL ".join(parts))
+    return years
+
+
+def open_with_archives(path=Gym_db.DB_PATH):
+    """Connection for reports: the live database plus all_<table> views over every archive"""
+    conn = Gym_db.get_connection(path)
+    attach_archives(conn, os.path.dirname(os.path.abspath(path)))
+    return conn
+
+
+def archive_file(cutoff, db_path=Gym_db.DB_PATH, chunk_size=CHUNK_SIZE, compact_after=True):
+    """Archive a database file's classes held before cutoff and compact it; returns {year: classes moved}"""
+    conn = Gym_db.get_connection(db_path)
+    try:
+        moved = archive_before(conn, cutoff, os.path.dirname(os.path.abspath(db_path)), chunk_size)
+        if moved and compact_after:
+            compact(conn)
+        return moved
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old classes and their history into yearly archive databases")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="live database file")
+    parser.add_argument('--before', default=(date.today() - timedelta(days=365)).isoformat(),
+                        help="archive classes held before this date, YYYY-MM-DD (default: one year ago)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="classes moved per transaction")
+    parser.add_argument('--no-compact', action='store_true', help="skip compacting the live database")
+    args = parser.parse_args()
+
+    try:
+        moved = archive_file(args.before, args.db, args.chunk_size, not args.no_compact)
+        if not moved:
+            print(f"No classes before {args.before}.")
+        elif not args.no_compact:
+            print("Live database compacted.")
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import argparse  # Import argparse to read command line options
+import hashlib  # Import hashlib to checksum snapshots
+import os  # Import os for file paths and atomic renames
+import sqlite3  # Import sqlite3 for the online backup API
+import tempfile  # Import tempfile to hold the benchmark database
+import threading  # Import threading to run sign-ups while the benchmark backs up
+import time  # Import time to throttle copying and time snapshots
+from datetime import datetime  # Import datetime to name snapshots
+import Gym_db  # Shared connection helper that enforces foreign keys
+
+# Snapshots are kept in this folder beside the database, so each branch rotates only its own
+BACKUP_FOLDER = 'backups'
+KEEP_SNAPSHOTS = 14
+
+# Pages copied per step and the pause between steps; writers can get in during each pause
+PAGES_PER_STEP = 64
+STEP_SLEEP = 0.005
+
+# A write from another connection restarts a paged backup; after this many restarts copy in one go
+MAX_RESTARTS = 5
+
+SNAPSHOT_PREFIX = 'gym_database-'
+
+
+class BackupRestarted(Exception):
+    """Raised from the progress callback when writers keep restarting a paged backup"""
+
+
+def snapshot_folder(db_path=Gym_db.DB_PATH):
+    """backups/ beside a database file (branches/<name>/backups for a branch)"""
+    return os.path.join(os.path.dirname(db_path), BACKUP_FOLDER)
+
+
+def file_checksum(path):
+    """SHA-256 of a file, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def copy_database(source, target, pages=PAGES_PER_STEP, sleep=STEP_SLEEP):
+    """Copy source into target with the backup API, a few pages at a time"""
+    progress = {'remaining': None, 'restarts': 0}
+
+    def on_progress(status, remaining, total):
+        # remaining only goes up when SQLite has started the copy over
+        if progress['remaining'] is not None and remaining > progress['remaining']:
+            progress['restarts'] += 1
+            if progress['restarts'] > MAX_RESTARTS:
+                raise BackupRestarted()
+        progress['remaining'] = remaining
+
+    try:
+        source.backup(target, pages=pages, progress=on_progress, sleep=sleep)
+    except BackupRestarted:
+        # Busy database: take the read lock once and copy everything in a single step
+        source.backup(target)
+
+
+def integrity_ok(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA integrity_check").fetchone()[0] == 'ok'
+    finally:
+        conn.close()
+
+
+def snapshot(db_path=Gym_db.DB_PATH, backup_dir=None, keep=KEEP_SNAPSHOTS):
+    """Take a consistent snapshot of a live database; returns the snapshot path"""
+    backup_dir = backup_dir or snapshot_folder(db_path)
+    os.makedirs(backup_dir, exist_ok=True)
+    name = SNAPSHOT_PREFIX + datetime.now().strftime('%Y%m%d-%H%M%S-%f') + '.db'
+    final_path = os.path.join(backup_dir, name)
+    partial_path = final_path + '.partial'
+
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(partial_path)
+    try:
+        copy_database(source, target)
+    finally:
+        target.close()
+        source.close()
+
+    if not integrity_ok(partial_path):
+        os.remove(partial_path)
+        raise sqlite3.DatabaseError(f"Snapshot of {db_path} failed its integrity check")
+
+    # The checksum is written before the rename, so a snapshot never appears without one
+    with open(final_path + '.sha256', 'w') as handle:
+        handle.write(f"{file_checksum(partial_path)}  {name}\n")
+    os.replace(partial_path, final_path)
+    rotate(backup_dir, keep)
+    return final_path
+
+
+def list_snapshots(backup_dir=None):
+    """Snapshot paths, oldest first"""
+    backup_dir = backup_dir or snapshot_folder()
+    if not os.path.isdir(backup_dir):
+        return []
+    names = sorted(
+        name for name in os.listdir(backup_dir)
+        if name.startswith(SNAPSHOT_PREFIX) and name.endswith('.db')
+    )
+    return [os.path.join(backup_dir, name) for name in names]
+
+
+def rotate(backup_dir=None, keep=KEEP_SNAPSHOTS):
+    """Delete all but the newest keep snapshots; returns the paths removed"""
+    removed = list_snapshots(backup_dir)[:-keep] if keep > 0 else []
+    for path in removed:
+        os.remove(path)
+        if os.path.exists(path + '.sha256'):
+            os.remove(path + '.sha256')
+    return removed
+
+
+def verify_snapshot(path):
+    """Check a snapshot against its checksum file and SQLite's integrity check"""
+    try:
+        with open(path + '.sha256') as handle:
+            expected = handle.read().split()[0]
+    except (OSError, IndexError):
+        return False
+    return file_checksum(path) == expected and integrity_ok(path)
+
+
+def restore(snapshot_path, db_path=Gym_db.DB_PATH, backup_dir=None):
+    """Verify a snapshot and copy it over the live database; returns the safety snapshot taken first"""
+    if not verify_snapshot(snapshot_path):
+        raise sqlite3.DatabaseError(f"{snapshot_path} failed verification; nothing was restored")
+
+    # Keep what is being overwritten, in case the wrong snapshot was picked
+    safety_path = snapshot(db_path, backup_dir, keep=0) if os.path.exists(db_path) else None
+
+    # Copying through the backup API takes the proper locks, so open connections see the
+    # restored data instead of a file swapped out from under them
+    source = sqlite3.connect(snapshot_path)
+    target = sqlite3.connect(db_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return safety_path
+
+
+def run_schedule(interval_minutes, db_path=Gym_db.DB_PATH, backup_dir=None, keep=KEEP_SNAPSHOTS):
+    """Take a snapshot every interval_minutes until interrupted"""
+    while True:
+        try:
+            path = snapshot(db_path, backup_dir, keep)
+            print(f"{datetime.now():%H:%M:%S} snapshot written to {path}")
+        except (OSError, sqlite3.Error) as e:
+            print(f"Backup error: {e}")
+        time.sleep(interval_minutes * 60)
+
+
+def benchmark(members=200_000, signups=300):
+    """Sign-up latency with no backup, a one-step backup and a paged backup, per journal mode"""
+    with tempfile.TemporaryDirectory() as folder:
+        db_path = os.path.join(folder, 'bench.db')
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE members (username TEXT PRIMARY KEY, email TEXT, member_id TEXT UNIQUE)")
+        conn.execute("CREATE TABLE member_class (member_id TEXT, class_id TEXT, signup_date TEXT, "
+                     "PRIMARY KEY (member_id, class_id))")
+        with conn:
+            conn.executemany(
+                "INSERT INTO members VALUES (?, ?, ?)",
+                ((f"user{i}", f"user{i}@example.com" + 'x' * 100, f"M{i:06d}") for i in range(members))
+            )
+        conn.close()
+
+        def signup_latencies(during):
+            """Run sign-ups in a thread while during() runs; returns (sorted latencies, backup seconds)"""
+            latencies = []
+
+            def writer():
+                writer_conn = sqlite3.connect(db_path, timeout=30)
+                for i in range(signups):
+                    start = time.perf_counter()
+                    with writer_conn:
+                        writer_conn.execute(
+                            "INSERT OR REPLACE INTO member_class VALUES (?, 'C1', date('now'))",
+                            (f"M{(i * 7919) % members:06d}",)
+                        )
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    time.sleep(0.002)
+                writer_conn.close()
+
+            thread = threading.Thread(target=writer)
+            thread.start()
+            start = time.perf_counter()
+            during()
+            backup_seconds = time.perf_counter() - start
+            thread.join()
+            return sorted(latencies), backup_seconds
+
+        def backup_with(pages):
+            def run():
+                source = sqlite3.connect(db_path)
+                target = sqlite3.connect(os.path.join(folder, 'copy.db'))
+                if pages == -1:
+                    source.backup(target)
+                else:
+                    copy_database(source, target, pages)
+                target.close()
+                source.close()
+            return run
+
+        print(f"Database of {members} members, {os.path.getsize(db_path) / 1e6:.1f} MB; {signups} sign-ups per run")
+        for journal_mode in ('delete', 'wal'):
+            conn = sqlite3.connect(db_path)
+            conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+            conn.close()
+            print(f"journal_mode={journal_mode}")
+            for label, during in [
+                ("no backup", lambda: None),
+                ("one-step backup", backup_with(-1)),
+                (f"paged backup ({PAGES_PER_STEP} pages/step)", backup_with(PAGES_PER_STEP)),
+            ]:
+                latencies, seconds = signup_latencies(during)
+                p50 = latencies[len(latencies) // 2]
+                p99 = latencies[int(len(latencies) * 0.99)]
+                print(f"  {label:30} sign-up p50 {p50:5.2f} ms  p99 {p99:6.2f} ms  "
+                      f"max {latencies[-1]:7.2f} ms  (backup {seconds:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online backups of the gym database")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="live database file")
+    parser.add_argument('--dir', help="snapshot folder (default: backups/ beside --db)")
+    parser.add_argument('--keep', type=int, default=KEEP_SNAPSHOTS, help="snapshots to keep")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--snapshot', action='store_true', help="take one snapshot now")
+    action.add_argument('--every', type=float, metavar='MINUTES', help="take a snapshot every MINUTES")
+    action.add_argument('--list', action='store_true', help="list snapshots and verify each one")
+    action.add_argument('--restore', metavar='SNAPSHOT', help="verify SNAPSHOT and restore it over --db")
+    action.add_argument('--benchmark', action='store_true', help="measure sign-up latency during a backup")
+    args = parser.parse_args()
+
+    try:
+        if args.snapshot:
+            print(f"Snapshot written to {snapshot(args.db, args.dir, args.keep)}")
+        elif args.every:
+            run_schedule(args.every, args.db, args.dir, args.keep)
+        elif args.list:
+            for path in list_snapshots(args.dir or snapshot_folder(args.db)):
+                print(f"{path}  {'ok' if verify_snapshot(path) else 'FAILED VERIFICATION'}")
+        elif args.restore:
+            safety_path = restore(args.restore, args.db, args.dir)
+            print(f"Restored {args.restore} over {args.db}")
+            if safety_path:
+                print(f"The previous contents were saved to {safety_path}")
+        elif args.benchmark:
+            benchmark()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Backup error: {e}")
+
+
+if __name__ == "__main__":
+    main()
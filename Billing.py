@@ -0,0 +1,276 @@
+import argparse  # Import argparse to read command line options
+import json  # Import json to pass the new invoice IDs to SQL
+import os  # Import os for the benchmark database path
+import sqlite3  # Import sqlite3 to catch database errors
+import tempfile  # Import tempfile to hold the benchmark database
+import time  # Import time to time billing runs
+from datetime import date, datetime  # Import datetime to work out billing periods and due dates
+import Gym_db  # Shared connection helper that enforces foreign keys
+import Plans  # Dated plan prices
+import Memberships  # Pause history, for prorating paused members
+import Households  # Family payers and dependents, billed as one invoice
+import Discounts  # Redeemed discount codes, taken off the next invoice
+
+# Members invoiced per transaction during a billing run
+BATCH_SIZE = 20_000
+
+# Invoices fall due this many days into the period
+DUE_DAYS = 14
+
+# Members who are billed: anyone on a plan with a price
+BILLABLE_MEMBERS = "members.membership_plan IS NOT NULL AND members.price > 0"
+
+
+def initialize_billing_tables(conn):
+    """Create the invoice and payment ledger"""
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS invoices (
+            invoice_id INTEGER PRIMARY KEY,
+            member_id TEXT NOT NULL,
+            period TEXT NOT NULL,
+            plan TEXT,
+            amount_pence INTEGER NOT NULL,
+            issued_at TEXT NOT NULL,
+            due_date TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'open',
+            UNIQUE (member_id, period),
+            FOREIGN KEY (member_id) REFERENCES members(member_id)
+                ON DELETE CASCADE ON UPDATE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS payments (
+            payment_id INTEGER PRIMARY KEY,
+            invoice_id INTEGER NOT NULL,
+            amount_pence INTEGER NOT NULL,
+            method TEXT,
+            paid_at TEXT NOT NULL,
+            FOREIGN KEY (invoice_id) REFERENCES invoices(invoice_id) ON DELETE CASCADE
+        );
+
+        -- Only the last four digits of a card are ever kept
+        CREATE TABLE IF NOT EXISTS payment_methods (
+            member_id TEXT PRIMARY KEY,
+            card_last4 TEXT NOT NULL,
+            expiry TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            FOREIGN KEY (member_id) REFERENCES members(member_id)
+                ON DELETE CASCADE ON UPDATE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS billing_runs (
+            period TEXT PRIMARY KEY,
+            started_at TEXT NOT NULL,
+            finished_at TEXT,
+            invoices_created INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_payments_invoice ON payments(invoice_id);
+        CREATE INDEX IF NOT EXISTS idx_invoices_period ON invoices(period);
+    ''')
+    Memberships.initialize_membership_tables(conn)
+    Households.initialize_household_tables(conn)
+    Discounts.initialize_discount_tables(conn)
+
+
+def current_period():
+    return date.today().strftime('%Y-%m')
+
+
+def run_monthly_billing(conn, period=None, batch_size=BATCH_SIZE):
+    """Invoice every household for a period (YYYY-MM); running it twice bills nobody twice.
+
+    A household's payer gets one invoice covering their dependents, who cost nothing under a
+    Family plan. Members paused for part of the period pay for the days they were active;
+    members paused for all of it are not charged. Discount codes redeemed by anyone in the
+    household and not yet used on an invoice come off the new invoice. Returns the number of
+    invoices created.
+    """
+    period = period or current_period()
+    start, end = Memberships.period_bounds(period)
+    days = (end - start).days
+    now = datetime.now().isoformat(timespec='seconds')
+    due_date = f"{period}-{DUE_DAYS + 1:02d}"
+
+    # Only members with a pause in the period are listed; the rest join to nothing and pay in full
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS billing_days (member_id TEXT PRIMARY KEY, active_days INTEGER)")
+    with conn:
+        conn.execute("DELETE FROM temp.billing_days")
+        conn.executemany("INSERT INTO temp.billing_days VALUES (?, ?)",
+                         Memberships.prorated_days(conn, period).items())
+
+    with conn:
+        conn.execute('''
+            INSERT INTO billing_runs (period, started_at) VALUES (?, ?)
+            ON CONFLICT (period) DO UPDATE SET started_at = excluded.started_at, finished_at = NULL
+        ''', (period, now))
+
+    created = 0
+    last_rowid = 0
+    while True:
+        # Walk the payers in rowid ranges; each range is one set-based INSERT ... SELECT over their households
+        upper = conn.execute('''
+            SELECT max(rowid) FROM (SELECT rowid FROM members WHERE rowid > ? ORDER BY rowid LIMIT ?)
+        ''', (last_rowid, batch_size)).fetchone()[0]
+        if upper is None:
+            break
+        params = {'period': period, 'days': days, 'now': now, 'due': due_date, 'lower': last_rowid, 'upper': upper,
+                  'family': Households.FAMILY_PLAN}
+        household = Households.HOUSEHOLD_TREE.format(
+            roots="m.rowid > :lower AND m.rowid <= :upper AND m.member_id IS NOT NULL")
+        with conn:
+            invoice_ids = [invoice_id for (invoice_id,) in conn.execute(f'''
+                INSERT INTO invoices (member_id, period, plan, amount_pence, issued_at, due_date)
+                WITH RECURSIVE {household},
+                -- Everyone in the household, so a dependent's unused discount counts even when they pay nothing
+                charges(root_id, pence, discount) AS (
+                    SELECT h.root_id,
+                           CASE WHEN NOT ({BILLABLE_MEMBERS}) OR coalesce(d.active_days, :days) <= 0 THEN 0
+                                WHEN h.depth > 0 AND root.membership_plan = :family THEN 0
+                                ELSE CAST(round(members.price * 100 * coalesce(d.active_days, :days) / :days) AS INTEGER)
+                           END,
+                           (
+                               SELECT coalesce(SUM(r.discount_pence), 0) FROM discount_redemptions r
+                               WHERE r.member_id = h.member_id AND NOT EXISTS (
+                                   SELECT 1 FROM discount_applications a WHERE a.code = r.code AND a.member_id = r.member_id
+                               )
+                           )
+                    FROM household h
+                    JOIN members ON members.member_id = h.member_id
+                    JOIN members root ON root.member_id = h.root_id
+                    LEFT JOIN temp.billing_days d ON d.member_id = h.member_id
+                )
+                SELECT c.root_id, :period, (SELECT membership_plan FROM members WHERE member_id = c.root_id),
+                       max(0, SUM(c.pence) - SUM(c.discount)), :now, :due
+                FROM charges c
+                WHERE true
+                GROUP BY c.root_id
+                HAVING SUM(c.pence) > 0
+                ON CONFLICT (member_id, period) DO NOTHING
+                RETURNING invoice_id
+            ''', params).fetchall()]
+            # Mark the discounts just taken off as used, in the same transaction as the invoices
+            conn.execute(f'''
+                INSERT INTO discount_applications (code, member_id, invoice_id)
+                WITH RECURSIVE {household}
+                SELECT r.code, r.member_id, i.invoice_id
+                -- CROSS JOIN keeps this order: the few redemptions first, then one invoice lookup each
+                FROM household h
+                CROSS JOIN discount_redemptions r ON r.member_id = h.member_id
+                CROSS JOIN invoices i ON i.member_id = h.root_id AND i.period = :period
+                WHERE i.invoice_id IN (SELECT value FROM json_each(:invoice_ids))
+                  AND NOT EXISTS (
+                      SELECT 1 FROM discount_applications a WHERE a.code = r.code AND a.member_id = r.member_id
+                  )
+            ''', {**params, 'invoice_ids': json.dumps(invoice_ids)})
+            created += len(invoice_ids)
+        last_rowid = upper
+
+    with conn:
+        conn.execute('''
+            UPDATE billing_runs SET finished_at = ?, invoices_created = invoices_created + ? WHERE period = ?
+        ''', (datetime.now().isoformat(timespec='seconds'), created, period))
+    return created
+
+
+def run_billing_file(period=None, db_path=Gym_db.DB_PATH):
+    """Run the monthly billing against a database file (used by the job queue)"""
+    conn = Gym_db.get_connection(db_path)
+    try:
+        initialize_billing_tables(conn)
+        # Pick up any price change that has come into effect since members were last repriced
+        Plans.initialize_plans(conn)
+        Plans.reprice_members(conn)
+        return run_monthly_billing(conn, period)
+    finally:
+        conn.close()
+
+
+def billing_history(conn, member_id):
+    """Invoices for a member, newest first: (invoice_id, period, plan, amount_pence, paid_pence, status, due_date)"""
+    return conn.execute('''
+        SELECT i.invoice_id, i.period, i.plan, i.amount_pence,
+               coalesce((SELECT SUM(p.amount_pence) FROM payments p WHERE p.invoice_id = i.invoice_id), 0),
+               i.status, i.due_date
+        FROM invoices i
+        WHERE i.member_id = ?
+        ORDER BY i.period DESC
+    ''', (member_id,)).fetchall()
+
+
+def record_payment(conn, invoice_id, amount_pence, method=None):
+    """Add a payment against an invoice and mark it paid once covered in full"""
+    with conn:
+        conn.execute(
+            "INSERT INTO payments (invoice_id, amount_pence, method, paid_at) VALUES (?, ?, ?, ?)",
+            (invoice_id, amount_pence, method, datetime.now().isoformat(timespec='seconds'))
+        )
+        conn.execute('''
+            UPDATE invoices SET status = 'paid'
+            WHERE invoice_id = ? AND amount_pence <= (SELECT SUM(amount_pence) FROM payments WHERE invoice_id = ?)
+        ''', (invoice_id, invoice_id))
+
+
+def save_payment_method(conn, member_id, card_number, expiry):
+    """Store the last four digits and expiry (MM/YY) of a member's card"""
+    digits = card_number.replace(' ', '').replace('-', '')
+    if not digits.isdigit() or not 12 <= len(digits) <= 19:
+        raise ValueError("Card number must be 12 to 19 digits")
+    try:
+        datetime.strptime(expiry.strip(), '%m/%y')
+    except ValueError:
+        raise ValueError("Expiry date must be MM/YY")
+    with conn:
+        conn.execute('''
+            INSERT INTO payment_methods (member_id, card_last4, expiry, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (member_id) DO UPDATE SET
+                card_last4 = excluded.card_last4, expiry = excluded.expiry, updated_at = excluded.updated_at
+        ''', (member_id, digits[-4:], expiry.strip(), datetime.now().isoformat(timespec='seconds')))
+
+
+def benchmark(members=100_000):
+    """Time a billing run over members, then a repeat run of the same period"""
+    with tempfile.TemporaryDirectory() as folder:
+        conn = Gym_db.get_connection(os.path.join(folder, 'bench.db'))
+        conn.execute('''
+            CREATE TABLE members (
+                username TEXT PRIMARY KEY, email TEXT, password TEXT, member_id TEXT UNIQUE,
+                role TEXT, membership_plan TEXT, price REAL
+            )
+        ''')
+        plans = [('Basic', 10.0), ('Gold', 20.0), ('Premium', 40.0), ('Family', 70.0)]
+        with conn:
+            conn.executemany(
+                "INSERT INTO members VALUES (?, ?, 'x', ?, 'member', ?, ?)",
+                ((f"user{i}", f"user{i}@example.com", f"M{i:06d}") + plans[i % len(plans)] for i in range(members))
+            )
+        initialize_billing_tables(conn)
+
+        for label in ("first run", "repeat run"):
+            start = time.perf_counter()
+            created = run_monthly_billing(conn, '2025-01')
+            print(f"{label}: {created} invoices for {members} members in {time.perf_counter() - start:.2f}s")
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monthly membership billing")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="database file to bill from")
+    parser.add_argument('--period', help="billing period YYYY-MM (default: this month)")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--run', action='store_true', help="invoice every billable member for the period")
+    action.add_argument('--benchmark', action='store_true', help="time a billing run over 100k members")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        return
+    try:
+        start = time.perf_counter()
+        created = run_billing_file(args.period, args.db)
+        print(f"{created} invoices created in {time.perf_counter() - start:.2f}s")
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Billing error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse  # Import argparse to read command line options
+import sqlite3  # Import sqlite3 to catch database errors
+from datetime import date, datetime  # Import datetime to find upcoming classes and stamp signups
+import Gym_db  # Shared connection helper that enforces foreign keys
+import Archive  # For the DD/MM/YYYY to ISO class date expression
+import Memberships  # Paused members cannot book
+import Occupancy  # Booked seats over time, per class
+
+# Classes listed per search
+SEARCH_LIMIT = 50
+
+# Seats left in a class, counted through the member_class(class_id) index
+SPACES_LEFT = "c.capacity - (SELECT COUNT(*) FROM member_class mc WHERE mc.class_id = c.class_id)"
+
+# Signup timestamps are written the same way Sprint_3's staff signup writes them
+SIGNUP_FORMAT = "%d/%m/%Y %H:%M"
+
+
+def initialize_booking_indexes(conn):
+    """Index classes by their date in sortable form, so upcoming classes are a range scan"""
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_classes_iso_date ON classes({Archive.CLASS_ISO_DATE})")
+    conn.commit()
+    Occupancy.initialize_occupancy_tables(conn)
+
+
+def iso_date(text):
+    """Accept DD/MM/YYYY (as classes store it) or YYYY-MM-DD and return YYYY-MM-DD"""
+    text = text.strip()
+    for pattern in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(text, pattern).date().isoformat()
+        except ValueError:
+            pass
+    raise ValueError("Dates must be DD/MM/YYYY")
+
+
+def upcoming_classes(conn, name='', on_date=None, limit=SEARCH_LIMIT):
+    """Classes from today on (or on one date) whose name contains name:
+    [(class_id, class_name, date, time, duration, difficulty_level, capacity, spaces_left)]"""
+    if on_date:
+        day = iso_date(on_date)
+        where, params = f"{Archive.CLASS_ISO_DATE} = ?", [day]
+    else:
+        where, params = f"{Archive.CLASS_ISO_DATE} >= ?", [date.today().isoformat()]
+    if name.strip():
+        where += " AND class_name LIKE ?"
+        params.append(f"%{name.strip()}%")
+    return conn.execute(f'''
+        SELECT c.class_id, c.class_name, c.date, c.time, c.duration, c.difficulty_level, c.capacity, {SPACES_LEFT}
+        FROM classes c
+        WHERE c.date LIKE '__/__/____' AND {where}
+        ORDER BY {Archive.CLASS_ISO_DATE}, c.time
+        LIMIT ?
+    ''', params + [limit]).fetchall()
+
+
+def book_class(conn, member_id, class_id):
+    """Book a member onto a class; returns the seats left afterwards.
+
+    The capacity check and the insert are one statement, so two members taking the last seat
+    at the same moment cannot both get it.
+    """
+    if not Memberships.is_active(conn, member_id):
+        if Memberships.status(conn, member_id) == Memberships.PAUSED:
+            raise ValueError("Paused memberships cannot book classes")
+        raise ValueError(f"No member {member_id}")
+    now = datetime.now().replace(second=0, microsecond=0)
+    try:
+        with conn:
+            cursor = conn.execute(f'''
+                INSERT INTO member_class (member_id, class_id, signup_date)
+                SELECT ?, c.class_id, ?
+                FROM classes c
+                WHERE c.class_id = ? AND {SPACES_LEFT} > 0 AND {Archive.CLASS_ISO_DATE} >= ?
+            ''', (member_id, now.strftime(SIGNUP_FORMAT), class_id, now.date().isoformat()))
+            if cursor.rowcount:
+                Occupancy.record_signup(conn, class_id, now)
+    except sqlite3.IntegrityError:
+        raise ValueError("You are already booked on this class")
+    row = conn.execute(f"SELECT {Archive.CLASS_ISO_DATE}, {SPACES_LEFT} FROM classes c WHERE class_id = ?",
+                       (class_id,)).fetchone()
+    if row is None:
+        raise ValueError("That class does not exist")
+    if not cursor.rowcount:
+        if conn.execute("SELECT 1 FROM member_class WHERE member_id = ? AND class_id = ?",
+                        (member_id, class_id)).fetchone():
+            raise ValueError("You are already booked on this class")
+        if row[0] < date.today().isoformat():
+            raise ValueError("That class has already taken place")
+        raise ValueError("That class is full")
+    return row[1]
+
+
+def cancel_booking(conn, member_id, class_id):
+    with conn:
+        cursor = conn.execute("DELETE FROM member_class WHERE member_id = ? AND class_id = ?", (member_id, class_id))
+        if cursor.rowcount:
+            Occupancy.record_signup(conn, class_id, delta=-1)
+    if not cursor.rowcount:
+        raise ValueError("You are not booked on this class")
+
+
+def member_bookings(conn, member_id):
+    """A member's upcoming classes: [(class_id, class_name, date, time, duration)]"""
+    return conn.execute(f'''
+        SELECT c.class_id, c.class_name, c.date, c.time, c.duration
+        FROM member_class mc
+        JOIN classes c ON c.class_id = mc.class_id
+        WHERE mc.member_id = ? AND {Archive.CLASS_ISO_DATE} >= ?
+        ORDER BY {Archive.CLASS_ISO_DATE}, c.time
+    ''', (member_id, date.today().isoformat())).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Class bookings")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="database file")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--search', metavar='NAME', nargs='?', const='', help="list upcoming classes")
+    action.add_argument('--book', nargs=2, metavar=('MEMBER_ID', 'CLASS_ID'), help="book a member onto a class")
+    action.add_argument('--cancel', nargs=2, metavar=('MEMBER_ID', 'CLASS_ID'), help="cancel a booking")
+    parser.add_argument('--date', help="only classes on this date (DD/MM/YYYY)")
+    args = parser.parse_args()
+
+    conn = Gym_db.get_connection(args.db)
+    try:
+        initialize_booking_indexes(conn)
+        Memberships.initialize_membership_tables(conn)
+        if args.book:
+            print(f"Booked; {book_class(conn, *args.book)} spaces left")
+        elif args.cancel:
+            cancel_booking(conn, *args.cancel)
+            print("Booking cancelled")
+        else:
+            for class_id, name, day, time, duration, level, capacity, spaces in upcoming_classes(conn, args.search, args.date):
+                print(f"{class_id:8} {name:20} {day} {time:8} {duration:6} {level or '':12} {spaces}/{capacity} left")
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Booking error: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
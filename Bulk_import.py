@@ -0,0 +1,196 @@
+import argparse  # Import argparse to read command line options
+import csv  # Import csv to stream rows in and write rejected rows out
+import re  # Import regular expressions for email validation
+import sqlite3  # Import sqlite3 to catch constraint violations
+import time  # Import time to report rows per second
+from concurrent.futures import ProcessPoolExecutor  # Import a process pool for hashing member passwords
+from itertools import islice  # Import islice to cut the row stream into chunks
+import Gym_db  # Shared connection helper that enforces foreign keys
+import Passwords  # Salted password hashing
+
+# Rows validated and written per savepoint
+CHUNK_SIZE = 1000
+
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+# What each import accepts: target table, conflict key and the (all required) columns
+IMPORT_SPECS = {
+    'members': {
+        'table': 'members',
+        'key': 'username',
+        'columns': ('username', 'email', 'password', 'member_id'),
+    },
+    'classes': {
+        'table': 'classes',
+        'key': 'class_id',
+        'columns': ('class_id', 'class_name', 'date', 'time', 'duration', 'capacity', 'difficulty_level'),
+    },
+    'trainers': {
+        'table': 'trainers',
+        'key': 'staff_id',
+        'columns': ('staff_id', 'forname', 'surname'),
+    },
+}
+
+
+def read_rows(path):
+    """Stream (line_number, row) pairs from a CSV file with a header row"""
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        reader = csv.DictReader(handle)
+        for row in reader:
+            yield reader.line_num, {name.strip(): (value or '').strip() for name, value in row.items() if name}
+
+
+def chunks(rows, size=CHUNK_SIZE):
+    """Group a row stream into lists of at most size rows"""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def validate_chunk(kind, chunk):
+    """Check a whole chunk column by column; returns (good_rows, [(line, row, error)])"""
+    spec = IMPORT_SPECS[kind]
+    errors = {}
+
+    # Each check runs down one column of the chunk rather than row by row through every rule
+    for column in spec['columns']:
+        for line, row in chunk:
+            if not row.get(column) and line not in errors:
+                errors[line] = f"missing {column}"
+
+    if kind == 'members':
+        for line, row in chunk:
+            if line not in errors and not EMAIL_RE.match(row['email']):
+                errors[line] = "invalid email"
+        # Hashes are stored as given, so one that could never verify would lock the member out
+        for line, row in chunk:
+            if line not in errors and Passwords.is_hashed(row['password']) and Passwords.parse_hash(row['password']) is None:
+                errors[line] = "malformed password hash"
+    elif kind == 'classes':
+        for line, row in chunk:
+            if line not in errors and not (row['capacity'].isdigit() and int(row['capacity']) > 0):
+                errors[line] = "capacity must be a positive whole number"
+
+    # The same key twice in one chunk would silently overwrite itself
+    seen = set()
+    for line, row in chunk:
+        key = row.get(spec['key'])
+        if line not in errors and key in seen:
+            errors[line] = f"duplicate {spec['key']}"
+        seen.add(key)
+
+    good = [(line, row) for line, row in chunk if line not in errors]
+    rejected = [(line, row, errors[line]) for line, row in chunk if line in errors]
+    return good, rejected
+
+
+def upsert_sql(kind):
+    """INSERT ... ON CONFLICT DO UPDATE statement for one import kind"""
+    spec = IMPORT_SPECS[kind]
+    columns = spec['columns']
+    updates = [f"{column} = excluded.{column}" for column in columns if column != spec['key']]
+    return f'''
+        INSERT INTO {spec['table']} ({', '.join(columns)})
+        VALUES ({', '.join('?' for _ in columns)})
+        ON CONFLICT({spec['key']}) DO UPDATE SET {', '.join(updates)}
+    '''
+
+
+def row_values(kind, row):
+    columns = IMPORT_SPECS[kind]['columns']
+    values = [row[column] for column in columns]
+    if kind == 'classes':
+        values[columns.index('capacity')] = int(row['capacity'])
+    return values
+
+
+def write_chunk(conn, kind, good):
+    """Upsert validated rows inside one savepoint; returns rows the database rejected"""
+    sql = upsert_sql(kind)
+    rejected = []
+    conn.execute("SAVEPOINT import_chunk")
+    try:
+        try:
+            conn.executemany(sql, [row_values(kind, row) for _, row in good])
+        except sqlite3.IntegrityError:
+            # Something in the chunk clashes (e.g. an email owned by another member);
+            # undo the chunk and retry row by row so only the offending rows are rejected
+            conn.execute("ROLLBACK TO import_chunk")
+            for line, row in good:
+                try:
+                    conn.execute(sql, row_values(kind, row))
+                except sqlite3.IntegrityError as e:
+                    rejected.append((line, row, str(e)))
+        conn.execute("RELEASE import_chunk")
+    except Exception:
+        conn.execute("ROLLBACK TO import_chunk")
+        conn.execute("RELEASE import_chunk")
+        raise
+    return rejected
+
+
+def hash_chunk_passwords(good, pool):
+    """Replace plaintext passwords with hashes; rows that are already hashed pass through"""
+    plain = [row for _, row in good if not Passwords.is_hashed(row['password'])]
+    for row, hashed in zip(plain, Passwords.hash_many([row['password'] for row in plain], pool)):
+        row['password'] = hashed
+
+
+def import_csv(conn, kind, path, errors_path=None, chunk_size=CHUNK_SIZE):
+    """Stream a CSV file into the database; returns (rows_imported, rows_rejected)"""
+    spec = IMPORT_SPECS[kind]
+    errors_path = errors_path or f"{path}.errors.csv"
+    imported = rejected_count = 0
+    start = time.perf_counter()
+
+    with open(errors_path, 'w', newline='', encoding='utf-8') as error_file, ProcessPoolExecutor() as pool:
+        error_writer = csv.writer(error_file)
+        error_writer.writerow(['line', 'error'] + list(spec['columns']))
+
+        for chunk in chunks(read_rows(path), chunk_size):
+            good, rejected = validate_chunk(kind, chunk)
+            if kind == 'members':
+                hash_chunk_passwords(good, pool)
+            database_rejected = write_chunk(conn, kind, good)
+            rejected += database_rejected
+
+            for line, row, error in sorted(rejected, key=lambda item: item[0]):
+                # Never write a password (even a hash) to the error file
+                error_writer.writerow([line, error] + [
+                    '' if column == 'password' else row.get(column, '') for column in spec['columns']
+                ])
+            imported += len(good) - len(database_rejected)
+            rejected_count += len(rejected)
+
+            elapsed = time.perf_counter() - start
+            print(f"{kind}: {imported} imported, {rejected_count} rejected "
+                  f"({(imported + rejected_count) / elapsed:.0f} rows/sec)")
+
+    return imported, rejected_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import members, classes or trainers from a CSV file")
+    parser.add_argument('kind', choices=sorted(IMPORT_SPECS), help="what the file contains")
+    parser.add_argument('csv_file', help="CSV file with a header row naming the columns")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="database file to import into")
+    parser.add_argument('--errors', help="where to write rejected rows (default: <csv_file>.errors.csv)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="rows written per savepoint")
+    args = parser.parse_args()
+
+    conn = Gym_db.get_connection(args.db)
+    try:
+        imported, rejected = import_csv(conn, args.kind, args.csv_file, args.errors, args.chunk_size)
+        print(f"Done: {imported} rows imported, {rejected} rejected.")
+    except (OSError, sqlite3.Error) as e:
+        print(f"Import failed: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+import argparse  # Import argparse to read command line options
+import json  # Import json to spool check-ins that could not be written
+import os  # Import os for the benchmark database path and the spool file
+import queue  # Import queue to hand scans to the writer thread
+import sqlite3  # Import sqlite3 to catch database errors
+import tempfile  # Import tempfile to hold the benchmark database
+import threading  # Import threading for the writer thread
+import time  # Import time for debouncing, refreshes and the benchmark
+import tkinter as tk  # Import Tkinter for the kiosk window
+from datetime import datetime  # Import datetime to stamp check-ins
+import Gym_db  # Shared connection helper that enforces foreign keys
+import Memberships  # Which members are active (not paused)
+import Occupancy  # Floor occupancy buckets fed by each check-in
+import Sessions  # Name of this desk
+
+# Check-ins written per transaction at most, and how long a scan may wait to be written
+COMMIT_BATCH = 500
+COMMIT_SECONDS = 0.5
+
+# A second scan of the same card within this window is the scanner double-reading, not a new visit
+DEBOUNCE_SECONDS = 60
+
+# How often the active-member set is reloaded so pauses and reactivations show up
+REFRESH_SECONDS = 60
+
+# A batch that fails to write (a locked database, say) is kept and retried, waiting twice as long each time
+RETRY_SECONDS = 0.5
+RETRY_MAX_SECONDS = 30
+
+# Closing waits this long for the writer: longer than SQLite's 5s busy timeout, so the batch
+# being written is either saved or spooled before the window goes away
+CLOSE_SECONDS = 8
+
+# Check-ins that could not be written are appended here (beside the database) and written on the next start
+SPOOL_SUFFIX = '-checkins.jsonl'
+
+# Recent scans listed on the kiosk
+RECENT_SHOWN = 12
+
+
+def initialize_attendance_table(conn):
+    """Create the append-only attendance log"""
+    conn.executescript('''
+        -- No foreign key: attendance is history and outlives a deleted member
+        CREATE TABLE IF NOT EXISTS attendance (
+            checkin_id INTEGER PRIMARY KEY,
+            member_id TEXT NOT NULL,
+            checked_in_at TEXT NOT NULL,
+            device TEXT
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_attendance_time ON attendance(checked_in_at);
+        CREATE INDEX IF NOT EXISTS idx_attendance_member ON attendance(member_id, checked_in_at);
+
+        CREATE TRIGGER IF NOT EXISTS attendance_no_update BEFORE UPDATE ON attendance BEGIN
+            SELECT RAISE(ABORT, 'attendance is append-only');
+        END;
+        CREATE TRIGGER IF NOT EXISTS attendance_no_delete BEFORE DELETE ON attendance BEGIN
+            SELECT RAISE(ABORT, 'attendance is append-only');
+        END;
+    ''')
+    Memberships.initialize_membership_tables(conn)
+    Occupancy.initialize_occupancy_tables(conn)
+
+
+def write_checkins(conn, batch):
+    """Insert (member_id, checked_in_at, device) rows and count them into occupancy, in one transaction"""
+    with conn:
+        conn.executemany("INSERT INTO attendance (member_id, checked_in_at, device) VALUES (?, ?, ?)", batch)
+        Occupancy.record_checkins(conn, [when for _, when, _ in batch])
+
+
+def spool(db_path, batch):
+    """Append check-ins that could not be written to the spool file, one JSON row per line"""
+    with open(db_path + SPOOL_SUFFIX, 'a', encoding='utf-8') as handle:
+        handle.writelines(json.dumps(row) + '\n' for row in batch)
+        handle.flush()
+        os.fsync(handle.fileno())
+
+
+def replay_spool(conn, db_path):
+    """Write the check-ins spooled by an earlier run; returns how many were written"""
+    path = db_path + SPOOL_SUFFIX
+    claimed = f"{path}.{os.getpid()}"
+    try:
+        # Claim the file first, so two kiosks starting together cannot both replay it
+        os.replace(path, claimed)
+    except FileNotFoundError:
+        return 0
+    batch = []
+    with open(claimed, encoding='utf-8') as handle:
+        for line in handle:
+            try:
+                batch.append(tuple(json.loads(line)))
+            except ValueError:
+                # A line cut short when the machine went down mid-write
+                continue
+    try:
+        write_checkins(conn, batch)
+    except sqlite3.Error as e:
+        print(f"Check-in error: {e} ({len(batch)} spooled check-ins kept for the next start)")
+        spool(db_path, batch)
+        batch = []
+    os.remove(claimed)
+    return len(batch)
+
+
+class ActiveMembers:
+    """In-memory set of active member IDs, so a scan is checked without a query"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.reload()
+
+    def reload(self):
+        self.members = {
+            member_id for (member_id,) in self.conn.execute(
+                f"SELECT member_id FROM members WHERE member_id IS NOT NULL AND {Memberships.ACTIVE_MEMBER}"
+            )
+        }
+        self.loaded_at = time.monotonic()
+
+    def __contains__(self, member_id):
+        if time.monotonic() - self.loaded_at > REFRESH_SECONDS:
+            self.reload()
+        if member_id in self.members:
+            return True
+        # Someone who joined since the last reload: one indexed lookup, then they are in the set
+        if Memberships.is_active(self.conn, member_id):
+            self.members.add(member_id)
+            return True
+        return False
+
+
+class CheckinRecorder:
+    """Validates scans against the active set and writes them on a thread in group commits"""
+
+    def __init__(self, db_path=Gym_db.DB_PATH, device=None):
+        self.db_path = db_path
+        self.device = device or Sessions.current_device()
+        conn = Gym_db.get_connection(db_path)
+        initialize_attendance_table(conn)
+        replay_spool(conn, db_path)
+        self.active = ActiveMembers(conn)
+        self._last_seen = {}
+        self._pending = queue.Queue()
+        self._stop = threading.Event()
+        # Set once closing gives up on the database; from then on every batch goes to the spool
+        self._spooling = False
+        self._spool_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._write, name="checkin-writer", daemon=True)
+        self._writer.start()
+
+    def scan(self, member_id):
+        """Check a scanned ID; returns (accepted, message) at once and queues the check-in"""
+        member_id = member_id.strip()
+        if not member_id:
+            return False, "Nothing scanned"
+        if member_id not in self.active:
+            if Memberships.status(self.active.conn, member_id) == Memberships.PAUSED:
+                return False, f"{member_id}: membership paused"
+            return False, f"{member_id}: not a member"
+        now = time.monotonic()
+        if now - self._last_seen.get(member_id, -DEBOUNCE_SECONDS) < DEBOUNCE_SECONDS:
+            return True, f"{member_id}: already checked in"
+        self._last_seen[member_id] = now
+        self._pending.put((member_id, datetime.now().isoformat(timespec='seconds'), self.device))
+        return True, f"{member_id}: welcome!"
+
+    def _write(self):
+        conn = Gym_db.get_connection(self.db_path)
+        try:
+            while not (self._stop.is_set() and self._pending.empty()):
+                try:
+                    batch = [self._pending.get(timeout=COMMIT_SECONDS)]
+                except queue.Empty:
+                    continue
+                # Gather whatever else arrives within the commit window into the same transaction
+                deadline = time.monotonic() + COMMIT_SECONDS
+                while len(batch) < COMMIT_BATCH:
+                    try:
+                        batch.append(self._pending.get(timeout=max(0, deadline - time.monotonic())))
+                    except queue.Empty:
+                        break
+                self._write_batch(conn, batch)
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn, batch):
+        """Write one batch; the members were already welcomed, so what cannot be written is spooled, never dropped
+
+        A locked or busy database is retried with back-off while the kiosk runs; any other error will not
+        fix itself and is spooled at once.
+        """
+        delay = RETRY_SECONDS
+        while not self._spooling:
+            try:
+                write_checkins(conn, batch)
+                return
+            except sqlite3.OperationalError as e:
+                if self._stop.is_set():
+                    print(f"Check-in error: {e} (closing; spooling {len(batch)} check-ins and the rest)")
+                    self._spooling = True
+                    break
+                print(f"Check-in error: {e} (retrying {len(batch)} check-ins in {delay:g}s)")
+                # Closing cuts the wait short
+                self._stop.wait(delay)
+                delay = min(delay * 2, RETRY_MAX_SECONDS)
+            except sqlite3.Error as e:
+                print(f"Check-in error: {e} ({len(batch)} check-ins spooled)")
+                break
+        self._spool(batch)
+
+    def _spool(self, batch):
+        with self._spool_lock:
+            spool(self.db_path, batch)
+
+    def close(self):
+        """Write any queued check-ins and stop the writer, waiting at most CLOSE_SECONDS; safe to call more than once"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._writer.join(CLOSE_SECONDS)
+        if self._writer.is_alive():
+            # Still stuck on the database: spool whatever it has not picked up rather than keep the window waiting
+            self._spooling = True
+            leftover = []
+            while True:
+                try:
+                    leftover.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            if leftover:
+                self._spool(leftover)
+        self.active.conn.close()
+
+
+def open_kiosk(master, db_path=Gym_db.DB_PATH):
+    """Full-attention check-in window; a keyboard-wedge scanner types the ID and presses Enter"""
+    recorder = CheckinRecorder(db_path)
+    window = tk.Toplevel(master)
+    window.title("FLEXI GYM - Check-in")
+    window.geometry("600x500")
+    window.configure(bg="#2e8b57")
+
+    tk.Label(window, text="Scan your membership card", font=("Montserrat", 20, "bold"),
+             fg="white", bg="#2e8b57").pack(pady=(30, 10))
+    entry = tk.Entry(window, font=("Montserrat", 18), justify="center")
+    entry.pack(pady=10)
+    result = tk.Label(window, text="", font=("Montserrat", 16, "bold"), fg="white", bg="#2e8b57")
+    result.pack(pady=10)
+    recent = tk.Listbox(window, font=("Montserrat", 11), height=RECENT_SHOWN, width=45)
+    recent.pack(pady=10)
+    on_floor = tk.Label(window, text="", font=("Montserrat", 12), fg="white", bg="#2e8b57")
+    on_floor.pack()
+
+    def show_on_floor():
+        # Read from the per-minute buckets, so this is one primary-key lookup
+        if window.winfo_exists():
+            on_floor.config(text=f"On the floor now: about {Occupancy.current(recorder.active.conn)}")
+            master.after(REFRESH_SECONDS * 1000, show_on_floor)
+
+    def on_scan(event=None):
+        accepted, message = recorder.scan(entry.get())
+        entry.delete(0, tk.END)
+        result.config(text=message, bg="#2e8b57" if accepted else "#c0392b")
+        window.configure(bg="#2e8b57" if accepted else "#c0392b")
+        recent.insert(0, f"{datetime.now():%H:%M:%S}  {message}")
+        recent.delete(RECENT_SHOWN, tk.END)
+        # Back to green for the next person
+        master.after(1500, lambda: window.winfo_exists() and window.configure(bg="#2e8b57"))
+
+    def on_close():
+        recorder.close()
+        window.destroy()
+
+    entry.bind("<Return>", on_scan)
+    entry.focus_set()
+    show_on_floor()
+    window.protocol("WM_DELETE_WINDOW", on_close)
+    # Whoever tears down the main window flushes the queued check-ins through this first
+    window.recorder = recorder
+    return window
+
+
+def benchmark(members=20_000, scans=20_000):
+    """Time validating and recording scans, then how long the writer takes to catch up"""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'bench.db')
+        conn = Gym_db.get_connection(path)
+        conn.execute("CREATE TABLE members (username TEXT PRIMARY KEY, member_id TEXT UNIQUE)")
+        with conn:
+            conn.executemany("INSERT INTO members VALUES (?, ?)", ((f"user{i}", f"M{i:06d}") for i in range(members)))
+        conn.close()
+
+        recorder = CheckinRecorder(path, device='benchmark')
+        start = time.perf_counter()
+        for number in range(scans):
+            recorder.scan(f"M{number % members:06d}")
+        scanned = time.perf_counter() - start
+        recorder.close()
+        total = time.perf_counter() - start
+        print(f"{scans} scans: {scanned / scans * 1e6:.1f}us each on the scanning thread, "
+              f"all written after {total:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Member check-in kiosk")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="database file")
+    parser.add_argument('--benchmark', action='store_true', help="time 20k scans")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        return
+    root = tk.Tk()
+    root.withdraw()
+    kiosk = open_kiosk(root, args.db)
+    kiosk.bind("<Destroy>", lambda event: event.widget is kiosk and root.destroy())
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 import sqlite3  # Import the SQLite library to interact with the database
+import Gym_db  # Shared connection helper that enforces foreign keys
+import Search_index  # Full-text search index over members, staff, classes and trainers
+import Sessions  # Per-desk remembered logins
+import Passwords  # Salted password hashing
+import Billing  # Invoice and payment ledger
+import Plans  # Dated plan prices
 
 def create_database():
-    # Connect to SQLite database 
-    conn = sqlite3.connect('gym_database.db')
+    # Connect to SQLite database with foreign keys enforced
+    conn = Gym_db.get_connection()
     cursor = conn.cursor()
 
     try:
@@ -61,8 +67,10 @@ def create_database():
                 class_id TEXT,
                 signup_date TEXT,
                 PRIMARY KEY (member_id, class_id),
-                FOREIGN KEY (member_id) REFERENCES members(member_id),
+                FOREIGN KEY (member_id) REFERENCES members(member_id)
+                    ON DELETE CASCADE ON UPDATE CASCADE,
                 FOREIGN KEY (class_id) REFERENCES classes(class_id)
+                    ON DELETE CASCADE ON UPDATE CASCADE
             )
         ''')
 
@@ -77,12 +85,14 @@ def create_database():
                 date TEXT,
                 duration_minutes INTEGER,
                 assignment_date TEXT,
-                FOREIGN KEY (class_id) REFERENCES classes(class_id),
+                FOREIGN KEY (class_id) REFERENCES classes(class_id)
+                    ON DELETE CASCADE ON UPDATE CASCADE,
                 FOREIGN KEY (trainer_id) REFERENCES trainers(staff_id)
+                    ON DELETE RESTRICT ON UPDATE CASCADE
             )
         ''')
 
-        # Create 'trainer_hours' table to track hours worked by each trainer
+        # Create 'trainer_hours' table to track hours worked by each trainer for each assignment
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS trainer_hours (
                 record_id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -90,10 +100,33 @@ def create_database():
                 trainer_name TEXT,
                 date TEXT,
                 minutes_worked INTEGER,
+                assignment_id INTEGER,
                 FOREIGN KEY (trainer_id) REFERENCES trainers(staff_id)
+                    ON UPDATE CASCADE,
+                FOREIGN KEY (assignment_id) REFERENCES assignments(assignment_id)
+                    ON DELETE CASCADE
             )
         ''')
 
+        # Member IDs are referenced by 'member_class' so they must be unique
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_members_member_id ON members(member_id)")
+        Gym_db.create_foreign_key_indexes(conn)
+
+        # Build the full-text search index; its triggers pick up the rows added below
+        Search_index.initialize_search_index(conn)
+
+        # Create 'sessions' table for per-desk "Remember Me" logins
+        Sessions.initialize_sessions_table(conn)
+
+        # Emails and staff IDs must be unique so registration can rely on the constraints
+        Gym_db.create_unique_indexes(conn)
+
+        # Create the invoice and payment ledger used by monthly billing
+        Billing.initialize_billing_tables(conn)
+
+        # Plan catalogue; member prices come from here rather than being typed in twice
+        Plans.initialize_plans(conn)
+
         # Adding data into 'staff' table
         staff_data = [
             ('Jake', 'Smith', 'j.smith1', 'j.smith1@flexigym.com', 'nuhuyty123!!', 'JS897', 'admin/trainer'),
@@ -107,28 +140,41 @@ def create_database():
             ('Yousuf', 'Raza', 'y.raza', 'y.raza@flexigym.com', 'bhyt234511', 'YR2346876', 'trainer'),
             ('Hayley', 'Wright', 'H.Wright', 'h.wright@flexigym.com', 'gtyybtytqwe', 'HW3224567', 'trainer')
         ]
+        # Store salted hashes rather than the plaintext demo passwords
+        staff_data = [row[:4] + (Passwords.hash_password(row[4]),) + row[5:] for row in staff_data]
+        # Upserts rather than INSERT OR REPLACE: a replace deletes the old row first,
+        # which would fire the ON DELETE cascades and wipe signups and assignments
         cursor.executemany('''
-            INSERT OR REPLACE INTO staff 
+            INSERT INTO staff 
             VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(username) DO UPDATE SET
+                forname = excluded.forname, surname = excluded.surname, email = excluded.email,
+                password = excluded.password, staff_id = excluded.staff_id, role = excluded.role
         ''', staff_data)
 
         # Adding  data into 'members' table
         members_data = [
-            ('TJ234', 'Javis11@gmail.com', 'wer1234!!', 'TomJ236', 'member', 'Basic', 10.00),
-            ('BeingSalmanKhan21', 'beinghuman23@gmail.com', 'nbhbytb123!', 'KHA1234', 'member', 'Silver', 15.00),
-            ('shera01', 'beingshera@live.com', 'nhgbuytb', 'Gur23458', 'member', 'Gold', 20.00),
-            ('Kevin-_1', 'k.hil123@gmail.com', 'nbnhon123!', 'KEV233', 'member', 'Inclusive', 25.00),
-            ('Mstarc223', 'starc22@gmail.com', 'bvyvhy123!', 'Matt765', 'member', 'Student', 30.00),
-            ('qasimero234', 'qasimero13@outlook.com', 'jhijbv12335', 'QAS3246', 'member', 'VIP Elite', 35.00),
-            ('Stuart08', 'broaddy@gmail.com', 'bvyyt123!!', 'STU1289', 'member', 'Premium', 40.00),
-            ('Jimmy09', 'JA99@outlook.com', 'hghnqwe34!', 'JAM2347', 'member', 'Personal Training', 55.00),
-            ('JS234', 'JS21@outlook.com', 'bhybtynb1!', 'JOH768943', 'member', 'Platinum', 60.00),
-            ('Smith01', 'e.smith23@gmail.com', 'bhygbf67g!!1', 'EMM234', 'member', 'Diamond', 65.00),
-            ('Louise23', 'l.tate234@gmail.com', 'bbhhyytfqw', 'LOU123!!', 'member', 'Family', 70.00)
+            ('TJ234', 'Javis11@gmail.com', 'wer1234!!', 'TomJ236', 'member', 'Basic'),
+            ('BeingSalmanKhan21', 'beinghuman23@gmail.com', 'nbhbytb123!', 'KHA1234', 'member', 'Silver'),
+            ('shera01', 'beingshera@live.com', 'nhgbuytb', 'Gur23458', 'member', 'Gold'),
+            ('Kevin-_1', 'k.hil123@gmail.com', 'nbnhon123!', 'KEV233', 'member', 'Inclusive'),
+            ('Mstarc223', 'starc22@gmail.com', 'bvyvhy123!', 'Matt765', 'member', 'Student'),
+            ('qasimero234', 'qasimero13@outlook.com', 'jhijbv12335', 'QAS3246', 'member', 'VIP Elite'),
+            ('Stuart08', 'broaddy@gmail.com', 'bvyyt123!!', 'STU1289', 'member', 'Premium'),
+            ('Jimmy09', 'JA99@outlook.com', 'hghnqwe34!', 'JAM2347', 'member', 'Personal Training'),
+            ('JS234', 'JS21@outlook.com', 'bhybtynb1!', 'JOH768943', 'member', 'Platinum'),
+            ('Smith01', 'e.smith23@gmail.com', 'bhygbf67g!!1', 'EMM234', 'member', 'Diamond'),
+            ('Louise23', 'l.tate234@gmail.com', 'bbhhyytfqw', 'LOU123!!', 'member', 'Family')
         ]
+        prices = dict(Plans.current_prices(conn))
+        members_data = [row[:2] + (Passwords.hash_password(row[2]),) + row[3:] + (prices[row[5]] / 100,)
+                        for row in members_data]
         cursor.executemany('''
-            INSERT OR REPLACE INTO members 
+            INSERT INTO members 
             VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(username) DO UPDATE SET
+                email = excluded.email, password = excluded.password, member_id = excluded.member_id,
+                role = excluded.role, membership_plan = excluded.membership_plan, price = excluded.price
         ''', members_data)
 
         # Adding data into 'classes' table
@@ -145,8 +191,12 @@ def create_database():
             ('KB010', 'Kickboxing', '30/07/2025', '9:45pm', '35min', 5, 'Intermediate')
         ]
         cursor.executemany('''
-            INSERT OR REPLACE INTO classes 
+            INSERT INTO classes 
             VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(class_id) DO UPDATE SET
+                class_name = excluded.class_name, date = excluded.date, time = excluded.time,
+                duration = excluded.duration, capacity = excluded.capacity,
+                difficulty_level = excluded.difficulty_level
         ''', classes_data)
 
         # Adding data into 'trainers' table
@@ -162,8 +212,10 @@ def create_database():
             ('Hayley', 'Wright', 'HW3224567')
         ]
         cursor.executemany('''
-            INSERT OR REPLACE INTO trainers 
+            INSERT INTO trainers 
             VALUES (?, ?, ?)
+            ON CONFLICT(staff_id) DO UPDATE SET
+                forname = excluded.forname, surname = excluded.surname
         ''', trainers_data)
 
         # Commit to database
@@ -0,0 +1,118 @@
+import argparse  # Import argparse to read command line options
+import json  # Import json to unpack the lists the dashboard query aggregates
+import sqlite3  # Import sqlite3 to catch database errors
+import time  # Import time to report how long the dashboard took
+from datetime import date  # Import date to pick out upcoming classes
+import Gym_db  # Shared connection helper that enforces foreign keys
+import Archive  # For the DD/MM/YYYY to ISO class date expression
+import Billing  # Invoice ledger (also creates the pause and household tables)
+
+# Upcoming bookings shown on the dashboard
+BOOKINGS_SHOWN = 10
+
+
+def _table_exists(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+
+def _has_column(conn, table, column):
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def dashboard_query(conn):
+    """The single SELECT behind the dashboard, leaving out parts whose tables this database lacks
+    (Sprint_1 on its own creates a members table without plans, and no classes)"""
+    plan = "m.membership_plan, m.price" if _has_column(conn, 'members', 'membership_plan') else "NULL, NULL"
+
+    bookings = "'[]'"
+    if _table_exists(conn, 'classes') and _table_exists(conn, 'member_class'):
+        trainers = "NULL"
+        if _table_exists(conn, 'assignments'):
+            trainers = "(SELECT group_concat(DISTINCT a.trainer_name) FROM assignments a WHERE a.class_id = c.class_id)"
+        bookings = f'''(
+            SELECT json_group_array(json_array(class_id, class_name, date, time, trainers)) FROM (
+                SELECT c.class_id, c.class_name, c.date, c.time, {trainers} AS trainers
+                FROM member_class mc
+                JOIN classes c ON c.class_id = mc.class_id
+                WHERE mc.member_id = m.member_id AND {Archive.CLASS_ISO_DATE} >= :today
+                ORDER BY {Archive.CLASS_ISO_DATE}, c.time
+                LIMIT {BOOKINGS_SHOWN}
+            )
+        )'''
+
+    return f'''
+        SELECT m.username, m.email, m.member_id, {plan},
+               EXISTS (
+                   SELECT 1 FROM membership_pauses p
+                   WHERE p.member_id = m.member_id AND p.resumed_on IS NULL AND p.paused_from <= :today
+               ),
+               (SELECT payer_id FROM household_links WHERE member_id = m.member_id),
+               (
+                   SELECT json_array(i.period, i.amount_pence, i.status, i.due_date)
+                   FROM invoices i WHERE i.member_id = m.member_id ORDER BY i.period DESC LIMIT 1
+               ),
+               (
+                   SELECT coalesce(SUM(i.amount_pence - coalesce(
+                       (SELECT SUM(p.amount_pence) FROM payments p WHERE p.invoice_id = i.invoice_id), 0)), 0)
+                   FROM invoices i WHERE i.member_id = m.member_id AND i.status = 'open'
+               ),
+               {bookings}
+        FROM members m
+        WHERE m.username = :username
+    '''
+
+
+def member_dashboard(conn, username):
+    """Everything the member dashboard shows, from one query; None if there is no such member"""
+    row = conn.execute(dashboard_query(conn), {'username': username, 'today': date.today().isoformat()}).fetchone()
+    if row is None:
+        return None
+    username, email, member_id, plan, price, paused, payer_id, invoice, outstanding, bookings = tuple(row)
+    bookings = [tuple(booking) for booking in json.loads(bookings)]
+    trainers = sorted({name for *_, names in bookings if names for name in names.split(',')})
+    return {
+        'username': username,
+        'email': email,
+        'member_id': member_id,
+        'plan': plan,
+        'price': price,
+        'status': 'paused' if paused else 'active',
+        'payer_id': payer_id,
+        'latest_invoice': tuple(json.loads(invoice)) if invoice else None,
+        'outstanding_pence': outstanding,
+        'bookings': bookings,
+        'trainers': trainers,
+    }
+
+
+def prepare_dashboard(conn):
+    """Make sure the ledger, pause and household tables the query reads exist"""
+    Billing.initialize_billing_tables(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show a member's dashboard")
+    parser.add_argument('username', help="member to show")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="database file")
+    args = parser.parse_args()
+
+    conn = Gym_db.get_connection(args.db)
+    try:
+        prepare_dashboard(conn)
+        start = time.perf_counter()
+        summary = member_dashboard(conn, args.username)
+        elapsed = (time.perf_counter() - start) * 1000
+        if summary is None:
+            print(f"No member {args.username}")
+            return
+        for key, value in summary.items():
+            print(f"{key:18} {value}")
+        print(f"({elapsed:.1f} ms)")
+    except sqlite3.Error as e:
+        print(f"Dashboard error: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import argparse  # Import argparse to read command line options
+import csv  # Import csv to write comma-separated exports
+import gzip  # Import gzip for compressed exports
+import json  # Import json to write JSON Lines exports
+import sqlite3  # Import sqlite3 to catch database errors
+import time  # Import time to report how long an export took
+import Gym_db  # Shared connection helper that enforces foreign keys
+
+# Rows pulled from SQLite per fetchmany call
+BATCH_SIZE = 5000
+
+# Balance between file size and speed; level 9 is several times slower for little gain
+GZIP_LEVEL = 5
+
+FORMATS = ('csv', 'jsonl')
+
+# Every export is a single query streamed straight to the file (passwords are never exported)
+EXPORTS = {
+    'members': '''
+        SELECT username, email, member_id FROM members ORDER BY username
+    ''',
+    'classes': '''
+        SELECT c.class_id, c.class_name, c.date, c.time, c.duration, c.capacity, c.difficulty_level,
+               coalesce(s.signups, 0) AS signups,
+               c.capacity - coalesce(s.signups, 0) AS spaces_left
+        FROM classes c
+        LEFT JOIN (SELECT class_id, COUNT(*) AS signups FROM member_class GROUP BY class_id) s
+            ON s.class_id = c.class_id
+        ORDER BY c.class_id
+    ''',
+    'member_class': '''
+        SELECT member_id, class_id, signup_date FROM member_class
+    ''',
+    'assignments': '''
+        SELECT assignment_id, class_id, class_name, trainer_id, trainer_name,
+               date, duration_minutes, assignment_date
+        FROM assignments ORDER BY assignment_id
+    ''',
+    'trainer_hours': '''
+        SELECT record_id, trainer_id, trainer_name, date, minutes_worked, assignment_id
+        FROM trainer_hours ORDER BY record_id
+    ''',
+}
+
+
+def format_for(path):
+    """Work out (format, compressed) from a file name such as members.csv.gz"""
+    name = path.lower()
+    compressed = name.endswith('.gz')
+    if compressed:
+        name = name[:-3]
+    for fmt in FORMATS:
+        if name.endswith('.' + fmt):
+            return fmt, compressed
+    return 'csv', compressed
+
+
+def stream_rows(conn, name, batch_size=BATCH_SIZE):
+    """Run an export query; returns (column_names, generator of row batches)"""
+    cursor = conn.execute(EXPORTS[name])
+    columns = [description[0] for description in cursor.description]
+
+    def batches():
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                return
+            yield batch
+
+    return columns, batches()
+
+
+def open_output(path, compressed):
+    if compressed:
+        return gzip.open(path, 'wt', newline='', encoding='utf-8', compresslevel=GZIP_LEVEL)
+    return open(path, 'w', newline='', encoding='utf-8')
+
+
+def export(conn, name, path, fmt=None, compressed=None, batch_size=BATCH_SIZE):
+    """Stream one export to a CSV or JSONL file (optionally gzipped); returns the number of rows written"""
+    guessed_format, guessed_compressed = format_for(path)
+    fmt = fmt or guessed_format
+    compressed = guessed_compressed if compressed is None else compressed
+
+    columns, batches = stream_rows(conn, name, batch_size)
+    written = 0
+    with open_output(path, compressed) as handle:
+        if fmt == 'csv':
+            writer = csv.writer(handle)
+            writer.writerow(columns)
+            for batch in batches:
+                writer.writerows(batch)
+                written += len(batch)
+        else:
+            # Column names are encoded once; building each line from pre-encoded keys
+            # is about twice as fast as json.dumps on a fresh dict per row
+            encode = json.JSONEncoder(ensure_ascii=False).encode
+            keys = [encode(column) + ': ' for column in columns]
+            for batch in batches:
+                handle.write(''.join(
+                    '{' + ', '.join([key + encode(value) for key, value in zip(keys, row)]) + '}\n'
+                    for row in batch
+                ))
+                written += len(batch)
+    return written
+
+
+def export_file(name, path, fmt=None, compressed=None, db_path=Gym_db.DB_PATH):
+    """Open a connection, run one export and close it (safe to call from a worker thread)"""
+    conn = Gym_db.get_connection(db_path)
+    try:
+        return export(conn, name, path, fmt, compressed)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export gym data to CSV or JSON Lines")
+    parser.add_argument('export', choices=sorted(EXPORTS), help="what to export")
+    parser.add_argument('output', help="file to write; the extension picks the format (.csv, .jsonl, add .gz to compress)")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="database file to read")
+    parser.add_argument('--format', choices=FORMATS, help="override the format implied by the file name")
+    parser.add_argument('--gzip', action='store_true', default=None, help="compress even without a .gz extension")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        rows = export_file(args.export, args.output, args.format, args.gzip, args.db)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Export failed: {e}")
+        return
+    elapsed = time.perf_counter() - start
+    print(f"Exported {rows} {args.export} rows to {args.output} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import argparse  # Import argparse to read command line options
+import os  # Import os for the benchmark database path
+import secrets  # Import secrets to generate unguessable campaign codes
+import sqlite3  # Import sqlite3 to catch database errors
+import tempfile  # Import tempfile to hold the benchmark database
+import time  # Import time to time code generation and validation
+from collections import namedtuple  # Import namedtuple for compiled rules
+from datetime import date, datetime  # Import datetime to check expiry dates
+import Gym_db  # Shared connection helper that enforces foreign keys
+import Plans  # Plan prices, to price a code check
+
+KINDS = ('percent', 'fixed')
+
+# Letters and digits that cannot be misread for each other on a screen or a flyer
+CODE_ALPHABET = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+CODE_LENGTH = 10
+
+# A code's rules as loaded from the table; checked without touching the database
+Rule = namedtuple('Rule', 'code kind amount plan expires_on max_uses')
+
+# Process-wide cache: code -> Rule (or None for a code that does not exist), valid for one version
+_rules = {}
+_rules_version = None
+
+
+def initialize_discount_tables(conn):
+    """Create the discount code, redemption and application tables"""
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS discount_codes (
+            code TEXT PRIMARY KEY,
+            kind TEXT NOT NULL CHECK (kind IN ('percent', 'fixed')),
+            amount INTEGER NOT NULL CHECK (amount > 0),
+            plan TEXT,
+            expires_on TEXT,
+            max_uses INTEGER CHECK (max_uses > 0),
+            uses INTEGER NOT NULL DEFAULT 0,
+            campaign TEXT,
+            created_at TEXT NOT NULL,
+            CHECK (kind != 'percent' OR amount <= 100),
+            CHECK (max_uses IS NULL OR uses <= max_uses)
+        ) WITHOUT ROWID;
+
+        CREATE INDEX IF NOT EXISTS idx_discount_codes_campaign ON discount_codes(campaign)
+            WHERE campaign IS NOT NULL;
+
+        -- A member can use each code once
+        CREATE TABLE IF NOT EXISTS discount_redemptions (
+            code TEXT NOT NULL,
+            member_id TEXT NOT NULL,
+            discount_pence INTEGER NOT NULL,
+            redeemed_at TEXT NOT NULL,
+            PRIMARY KEY (code, member_id),
+            FOREIGN KEY (code) REFERENCES discount_codes(code) ON DELETE CASCADE,
+            FOREIGN KEY (member_id) REFERENCES members(member_id)
+                ON DELETE CASCADE ON UPDATE CASCADE
+        );
+        CREATE INDEX IF NOT EXISTS idx_discount_redemptions_member ON discount_redemptions(member_id);
+
+        -- The invoice a redemption was taken off; redemptions without a row here are still owed
+        CREATE TABLE IF NOT EXISTS discount_applications (
+            code TEXT NOT NULL,
+            member_id TEXT NOT NULL,
+            invoice_id INTEGER NOT NULL,
+            PRIMARY KEY (code, member_id),
+            FOREIGN KEY (code, member_id) REFERENCES discount_redemptions(code, member_id)
+                ON DELETE CASCADE ON UPDATE CASCADE,
+            FOREIGN KEY (invoice_id) REFERENCES invoices(invoice_id) ON DELETE CASCADE
+        ) WITHOUT ROWID;
+
+        -- Bumped when a code is added or its rules change (not when it is used) so cached rules are dropped
+        CREATE TABLE IF NOT EXISTS discount_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO discount_version VALUES (1, 0);
+
+        CREATE TRIGGER IF NOT EXISTS discount_rules_changed_ai AFTER INSERT ON discount_codes BEGIN
+            UPDATE discount_version SET version = version + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS discount_rules_changed_au
+        AFTER UPDATE OF kind, amount, plan, expires_on, max_uses ON discount_codes BEGIN
+            UPDATE discount_version SET version = version + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS discount_rules_changed_ad AFTER DELETE ON discount_codes BEGIN
+            UPDATE discount_version SET version = version + 1;
+        END;
+    ''')
+
+
+def normalise(code):
+    return code.strip().upper()
+
+
+def _check_rule(kind, amount, expires_on):
+    if kind not in KINDS:
+        raise ValueError(f"Discount kind must be one of {', '.join(KINDS)}")
+    if amount <= 0 or (kind == 'percent' and amount > 100):
+        raise ValueError("Percent discounts run from 1 to 100; fixed discounts must be above zero")
+    if expires_on:
+        date.fromisoformat(expires_on)  # rejects anything that is not YYYY-MM-DD
+
+
+def create_code(conn, code, kind, amount, plan=None, expires_on=None, max_uses=None):
+    """Add one code; amount is a percentage for 'percent' and pence for 'fixed'"""
+    _check_rule(kind, amount, expires_on)
+    with conn:
+        conn.execute('''
+            INSERT INTO discount_codes (code, kind, amount, plan, expires_on, max_uses, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (normalise(code), kind, amount, plan, expires_on, max_uses,
+              datetime.now().isoformat(timespec='seconds')))
+
+
+def generate_codes(conn, count, kind, amount, campaign, prefix='', plan=None, expires_on=None):
+    """Create count unique single-use codes for a campaign in one transaction; returns the codes"""
+    _check_rule(kind, amount, expires_on)
+    now = datetime.now().isoformat(timespec='seconds')
+    codes = []
+    with conn:
+        while len(codes) < count:
+            batch = {prefix.upper() + ''.join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+                     for _ in range(count - len(codes))}
+            # Codes that collide with existing ones are skipped and drawn again
+            for code in batch:
+                cursor = conn.execute('''
+                    INSERT INTO discount_codes (code, kind, amount, plan, expires_on, max_uses, campaign, created_at)
+                    VALUES (?, ?, ?, ?, ?, 1, ?, ?)
+                    ON CONFLICT (code) DO NOTHING
+                ''', (code, kind, amount, plan, expires_on, campaign, now))
+                if cursor.rowcount:
+                    codes.append(code)
+    return codes
+
+
+def _rule(conn, code):
+    """The compiled rule for a code, loading it once per process until a rule changes"""
+    global _rules_version
+    version = conn.execute("SELECT version FROM discount_version").fetchone()[0]
+    if version != _rules_version:
+        _rules.clear()
+        _rules_version = version
+    if code not in _rules:
+        row = conn.execute('''
+            SELECT code, kind, amount, plan, expires_on, max_uses FROM discount_codes WHERE code = ?
+        ''', (code,)).fetchone()
+        _rules[code] = Rule(*row) if row else None
+    return _rules[code]
+
+
+def check_rule(rule, plan, on):
+    """Raise ValueError if a rule does not allow the code for this plan on this date"""
+    if rule is None:
+        raise ValueError("That discount code does not exist")
+    if rule.expires_on and on > rule.expires_on:
+        raise ValueError("That discount code has expired")
+    if rule.plan and rule.plan != plan:
+        raise ValueError(f"That discount code is only valid on the {rule.plan} plan")
+
+
+def discount_pence(rule, price_pence):
+    """What a rule takes off a price, never more than the price itself"""
+    if rule.kind == 'percent':
+        return min(price_pence, price_pence * rule.amount // 100)
+    return min(price_pence, rule.amount)
+
+
+def validate(conn, code, plan, price_pence, on=None):
+    """Discount in pence a code gives on a plan, raising ValueError if it cannot be used"""
+    rule = _rule(conn, normalise(code))
+    check_rule(rule, plan, on or date.today().isoformat())
+    return discount_pence(rule, price_pence)
+
+
+def redeem(conn, code, member_id, plan, price_pence, on=None):
+    """Use a code for a member; the usage count is taken in the same transaction as the redemption"""
+    code = normalise(code)
+    discount = validate(conn, code, plan, price_pence, on)
+    with conn:
+        # The guard on uses makes the increment atomic: two desks cannot both take the last use
+        cursor = conn.execute('''
+            UPDATE discount_codes SET uses = uses + 1
+            WHERE code = ? AND (max_uses IS NULL OR uses < max_uses)
+        ''', (code,))
+        if not cursor.rowcount:
+            raise ValueError("That discount code has been used up")
+        try:
+            conn.execute('''
+                INSERT INTO discount_redemptions (code, member_id, discount_pence, redeemed_at)
+                VALUES (?, ?, ?, ?)
+            ''', (code, member_id, discount, datetime.now().isoformat(timespec='seconds')))
+        except sqlite3.IntegrityError:
+            raise ValueError("You have already used that discount code")
+    return discount
+
+
+def benchmark(count=50_000, checks=100_000):
+    """Time generating a campaign of codes and validating them from the rule cache"""
+    with tempfile.TemporaryDirectory() as folder:
+        conn = Gym_db.get_connection(os.path.join(folder, 'bench.db'))
+        initialize_discount_tables(conn)
+        start = time.perf_counter()
+        codes = generate_codes(conn, count, 'percent', 20, 'benchmark')
+        print(f"generated {len(codes)} codes in {time.perf_counter() - start:.2f}s")
+
+        for label in ("cold", "cached"):
+            start = time.perf_counter()
+            for number in range(checks):
+                validate(conn, codes[number % len(codes)], 'Gold', 2000)
+            print(f"{label}: {(time.perf_counter() - start) / checks * 1e6:.1f}us per validation")
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Discount codes")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="database file")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--create', metavar='CODE', help="add a code")
+    action.add_argument('--generate', type=int, metavar='COUNT', help="create COUNT single-use codes")
+    action.add_argument('--check', metavar='CODE', help="show what a code gives on --plan")
+    action.add_argument('--benchmark', action='store_true', help="time generating and validating 50k codes")
+    parser.add_argument('--kind', choices=KINDS, default='percent', help="percent off or a fixed amount")
+    parser.add_argument('--amount', type=float, help="percentage, or pounds for fixed discounts")
+    parser.add_argument('--plan', help="plan the code is limited to (or checked against)")
+    parser.add_argument('--expires', help="last day the code can be used, YYYY-MM-DD")
+    parser.add_argument('--max-uses', type=int, help="how many times the code can be used")
+    parser.add_argument('--campaign', help="campaign name for --generate")
+    parser.add_argument('--prefix', default='', help="prefix for generated codes")
+    parser.add_argument('--output', help="file to write generated codes to, one per line")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        return
+    conn = Gym_db.get_connection(args.db)
+    try:
+        initialize_discount_tables(conn)
+        amount = None
+        if args.amount is not None:
+            amount = round(args.amount) if args.kind == 'percent' else round(args.amount * 100)
+        if args.create:
+            create_code(conn, args.create, args.kind, amount or 0, args.plan, args.expires, args.max_uses)
+            print(f"Created {normalise(args.create)}")
+        elif args.generate:
+            codes = generate_codes(conn, args.generate, args.kind, amount or 0, args.campaign or 'campaign',
+                                   args.prefix, args.plan, args.expires)
+            if args.output:
+                with open(args.output, 'w', encoding='utf-8') as handle:
+                    handle.writelines(f"{code}\n" for code in codes)
+            print(f"Generated {len(codes)} codes" + (f" into {args.output}" if args.output else ""))
+        else:
+            Plans.initialize_plans(conn)
+            price = Plans.price_of(conn, args.plan)
+            if price is None:
+                raise ValueError(f"Unknown plan: {args.plan}")
+            print(f"{normalise(args.check)} takes £{validate(conn, args.check, args.plan, price) / 100:.2f} "
+                  f"off {args.plan} ({Plans.format_price(price)})")
+    except (ValueError, OSError, sqlite3.Error) as e:
+        print(f"Discount error: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+import argparse  # Import argparse to read command line options
+import os  # Import os to spot rotated or truncated log files
+import re  # Import re to parse log lines
+import sqlite3  # Import sqlite3 to catch database errors
+import tempfile  # Import tempfile to hold the benchmark log and database
+import time  # Import time to poll a followed log and time ingestion
+from datetime import datetime  # Import datetime to read log timestamps
+import Gym_db  # Shared connection helper that enforces foreign keys
+import Checkin  # Attendance table the door entries are written to
+import Occupancy  # Floor occupancy buckets fed by each entry
+
+# One access event per line, e.g.
+#   2025-06-03T07:31:12 door=main card=04A1B2C3 result=granted
+# Fields after the timestamp may come in any order; result defaults to granted.
+LINE_PATTERN = re.compile(rb'^(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2})\S*((?:\s+\w+=\S+)+)\s*$')
+FIELD_PATTERN = re.compile(rb'(\w+)=(\S+)')
+
+# Attendance rows per transaction; the file offset is saved in the same transaction
+BATCH_SIZE = 5000
+
+# How often a followed log is checked for new lines
+POLL_SECONDS = 1.0
+
+# Card lookups kept in memory before the cache starts over
+CARD_CACHE_SIZE = 100_000
+
+
+def initialize_door_tables(conn):
+    """Create the card register and the per-file ingestion checkpoints"""
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS member_cards (
+            card_id TEXT PRIMARY KEY,
+            member_id TEXT NOT NULL,
+            FOREIGN KEY (member_id) REFERENCES members(member_id)
+                ON DELETE CASCADE ON UPDATE CASCADE
+        );
+        CREATE INDEX IF NOT EXISTS idx_member_cards_member ON member_cards(member_id);
+
+        -- How far into each log file has been ingested; file_id notices rotation
+        CREATE TABLE IF NOT EXISTS door_log_offsets (
+            path TEXT PRIMARY KEY,
+            file_id TEXT NOT NULL,
+            byte_offset INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+
+        -- Granted entries whose card matched nobody, kept until the card is assigned
+        CREATE TABLE IF NOT EXISTS door_log_rejects (
+            reject_id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL,
+            seen_at TEXT NOT NULL,
+            door TEXT NOT NULL,
+            card_id TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_door_log_rejects_card ON door_log_rejects(upper(card_id));
+    ''')
+    Checkin.initialize_attendance_table(conn)
+
+
+def assign_card(conn, card_id, member_id):
+    """Register a member's card; returns how many earlier entries with it were recovered from the rejects"""
+    with conn:
+        conn.execute('''
+            INSERT INTO member_cards (card_id, member_id) VALUES (?, ?)
+            ON CONFLICT (card_id) DO UPDATE SET member_id = excluded.member_id
+        ''', (card_id.upper(), member_id))
+        return replay_rejects(conn, card_id)
+
+
+class CardLookup:
+    """Card ID -> member_id with a bounded in-memory cache
+
+    Unknown cards are not cached: a card assigned while a log is being followed must match from then on.
+    """
+
+    def __init__(self, conn, size=CARD_CACHE_SIZE):
+        self.conn = conn
+        self.size = size
+        self._cache = {}
+
+    def __call__(self, card_id):
+        if card_id not in self._cache:
+            if len(self._cache) >= self.size:
+                self._cache.clear()
+            # Cards printed with the member ID itself work without being registered
+            row = self.conn.execute('''
+                SELECT member_id FROM member_cards WHERE card_id = ?
+                UNION ALL
+                SELECT member_id FROM members WHERE member_id = ?
+                LIMIT 1
+            ''', (card_id.upper(), card_id)).fetchone()
+            if row is None:
+                return None
+            self._cache[card_id] = row[0]
+        return self._cache[card_id]
+
+
+def file_id(path):
+    """Identity of the file behind a path, which changes when the log is rotated"""
+    stat = os.stat(path)
+    return f"{stat.st_dev}:{stat.st_ino}"
+
+
+def read_lines(handle, follow=False, poll_seconds=POLL_SECONDS, stop=None):
+    """Yield (line, offset after it) for each complete line; None marks a pause at the end of the file.
+
+    A half-written last line is left for the next read, so its offset is never checkpointed.
+    """
+    offset = handle.tell()
+    while True:
+        line = handle.readline()
+        if line.endswith(b'\n'):
+            offset += len(line)
+            yield line, offset
+            continue
+        handle.seek(offset)
+        yield None
+        if not follow or (stop is not None and stop()):
+            return
+        time.sleep(poll_seconds)
+
+
+def parse(lines):
+    """(offset, when, door, card) for granted entries with a valid timestamp, (offset, None, ...) for anything else"""
+    for item in lines:
+        if item is None:
+            yield None
+            continue
+        line, offset = item
+        match = LINE_PATTERN.match(line)
+        if match is None:
+            yield offset, None, None, None
+            continue
+        fields = dict(FIELD_PATTERN.findall(match.group(2)))
+        if fields.get(b'result', b'granted') != b'granted' or b'card' not in fields:
+            yield offset, None, None, None
+            continue
+        when = match.group(1).replace(b' ', b'T').decode('ascii')
+        try:
+            datetime.fromisoformat(when)
+        except ValueError:
+            # Shaped like a timestamp but not a real one (month 13, say): skip it like any bad line
+            yield offset, None, None, None
+            continue
+        yield offset, when, fields.get(b'door', b'door').decode('utf-8', 'replace'), fields[b'card'].decode('ascii', 'replace')
+
+
+def resolve(events, lookup, debounce_seconds=Checkin.DEBOUNCE_SECONDS):
+    """(offset, attendance row or None, unmatched (when, door, card) or None)
+
+    Repeat entries of one member within the debounce window are dropped.
+    """
+    last_entry = {}
+    for event in events:
+        if event is None:
+            yield None
+            continue
+        offset, when, door, card = event
+        if when is None:
+            yield offset, None, None
+            continue
+        member_id = lookup(card)
+        if member_id is None:
+            yield offset, None, (when, door, card)
+            continue
+        moment = datetime.fromisoformat(when).timestamp()
+        if moment - last_entry.get(member_id, float('-inf')) < debounce_seconds:
+            yield offset, None, None
+            continue
+        last_entry[member_id] = moment
+        yield offset, (member_id, when, f"door:{door}"), None
+
+
+def batches(records, size=BATCH_SIZE):
+    """(rows, rejects, offset to checkpoint) every size lines, and whenever the file runs dry"""
+    rows, rejects, offset, consumed = [], [], None, 0
+    for record in records:
+        if record is not None:
+            offset, row, reject = record
+            consumed += 1
+            if row is not None:
+                rows.append(row)
+            if reject is not None:
+                rejects.append(reject)
+            if consumed < size:
+                continue
+        if offset is not None:
+            yield rows, rejects, offset
+            rows, rejects, offset, consumed = [], [], None, 0
+
+
+def record_entries(conn, rows):
+    """Insert attendance rows and count them into occupancy, inside the caller's transaction"""
+    conn.executemany("INSERT INTO attendance (member_id, checked_in_at, device) VALUES (?, ?, ?)", rows)
+    Occupancy.record_checkins(conn, [when for _, when, _ in rows])
+
+
+def replay_rejects(conn, card_id=None):
+    """Write kept entries whose card now resolves (only card_id's, if given); returns the rows written
+
+    Runs inside the caller's transaction.
+    """
+    query = "SELECT reject_id, seen_at, door, card_id FROM door_log_rejects"
+    params = ()
+    if card_id is not None:
+        query += " WHERE upper(card_id) = ?"
+        params = (card_id.upper(),)
+    events = conn.execute(query + " ORDER BY seen_at", params).fetchall()
+    rows, replayed = [], []
+    for reject_id, row, reject in resolve(events, CardLookup(conn)):
+        if reject is None:
+            replayed.append((reject_id,))
+            if row is not None:
+                rows.append(row)
+    record_entries(conn, rows)
+    conn.executemany("DELETE FROM door_log_rejects WHERE reject_id = ?", replayed)
+    return len(rows)
+
+
+def write_batch(conn, path, identity, rows, offset, rejects=()):
+    """Write attendance rows, unmatched entries and the new offset in one transaction, so a restart neither skips nor repeats"""
+    with conn:
+        record_entries(conn, rows)
+        conn.executemany("INSERT INTO door_log_rejects (path, seen_at, door, card_id) VALUES (?, ?, ?, ?)",
+                         ((path, when, door, card) for when, door, card in rejects))
+        conn.execute('''
+            INSERT INTO door_log_offsets (path, file_id, byte_offset, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (path) DO UPDATE SET
+                file_id = excluded.file_id, byte_offset = excluded.byte_offset, updated_at = excluded.updated_at
+        ''', (path, identity, offset, datetime.now().isoformat(timespec='seconds')))
+
+
+def ingest(conn, path, follow=False, batch_size=BATCH_SIZE, poll_seconds=POLL_SECONDS):
+    """Ingest a door log from its last checkpoint; with follow, keep tailing it (and its rotations)
+
+    Returns (attendance rows written, entries with an unknown card kept in door_log_rejects).
+    """
+    path = os.path.abspath(path)
+    lookup = CardLookup(conn)
+    written = rejected = 0
+    while True:
+        identity = file_id(path)
+        row = conn.execute("SELECT file_id, byte_offset FROM door_log_offsets WHERE path = ?", (path,)).fetchone()
+        # A new file behind the path, or one that shrank, is read from the start
+        offset = row[1] if row and row[0] == identity and row[1] <= os.path.getsize(path) else 0
+
+        with open(path, 'rb') as handle:
+            handle.seek(offset)
+            rotated = lambda: os.path.exists(path) and file_id(path) != identity
+            lines = read_lines(handle, follow, poll_seconds, stop=rotated)
+            for rows, rejects, offset in batches(resolve(parse(lines), lookup), batch_size):
+                write_batch(conn, path, identity, rows, offset, rejects)
+                written += len(rows)
+                rejected += len(rejects)
+
+        if not (follow and os.path.exists(path) and file_id(path) != identity):
+            return written, rejected
+
+
+def ingest_path(path, db_path=Gym_db.DB_PATH):
+    """Ingest whatever is new in a door log (used by the job queue)"""
+    conn = Gym_db.get_connection(db_path)
+    try:
+        initialize_door_tables(conn)
+        return ingest(conn, path)
+    finally:
+        conn.close()
+
+
+def benchmark(lines=1_000_000, members=20_000):
+    """Time ingesting a generated log, then a second run that should find nothing new"""
+    with tempfile.TemporaryDirectory() as folder:
+        conn = Gym_db.get_connection(os.path.join(folder, 'bench.db'))
+        conn.execute("CREATE TABLE members (username TEXT PRIMARY KEY, member_id TEXT UNIQUE)")
+        with conn:
+            conn.executemany("INSERT INTO members VALUES (?, ?)", ((f"user{i}", f"M{i:06d}") for i in range(members)))
+        initialize_door_tables(conn)
+
+        log_path = os.path.join(folder, 'door.log')
+        with open(log_path, 'w') as log:
+            for number in range(lines):
+                seconds = number * 7
+                log.write(f"2025-06-{1 + seconds // 86400 % 28:02d}T{seconds // 3600 % 24:02d}:{seconds // 60 % 60:02d}:"
+                          f"{seconds % 60:02d} door=main card=M{number * 7919 % members:06d} result=granted\n")
+        size = os.path.getsize(log_path) / 1e6
+
+        for label in ("first run", "second run"):
+            start = time.perf_counter()
+            written, _ = ingest(conn, log_path)
+            elapsed = time.perf_counter() - start
+            print(f"{label}: {written} rows from {size:.0f} MB in {elapsed:.2f}s")
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest door-controller access logs into attendance")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="database file")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--ingest', metavar='LOG', nargs='+', help="ingest new lines from log files")
+    action.add_argument('--follow', metavar='LOG', help="keep ingesting a log as it grows, until Ctrl+C")
+    action.add_argument('--assign', nargs=2, metavar=('CARD_ID', 'MEMBER_ID'), help="register a member's card")
+    action.add_argument('--replay-rejects', action='store_true', help="write kept entries whose card is now known")
+    action.add_argument('--benchmark', action='store_true', help="time ingesting a 1M-line log")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="attendance rows per transaction")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        return
+    conn = Gym_db.get_connection(args.db)
+    try:
+        initialize_door_tables(conn)
+        if args.assign:
+            recovered = assign_card(conn, *args.assign)
+            print(f"Card {args.assign[0]} now belongs to {args.assign[1]}; {recovered} earlier entries recovered")
+        elif args.replay_rejects:
+            with conn:
+                recovered = replay_rejects(conn)
+            print(f"{recovered} kept entries written to attendance")
+        elif args.follow:
+            print(f"Following {args.follow}; press Ctrl+C to stop")
+            ingest(conn, args.follow, follow=True, batch_size=args.batch_size)
+        else:
+            for path in args.ingest:
+                start = time.perf_counter()
+                written, rejected = ingest(conn, path, batch_size=args.batch_size)
+                print(f"{path}: {written} attendance rows in {time.perf_counter() - start:.2f}s, "
+                      f"{rejected} unknown cards kept in door_log_rejects")
+    except KeyboardInterrupt:
+        pass
+    except (OSError, sqlite3.Error) as e:
+        print(f"Door log error: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import argparse  # Import argparse to read command line options
+import os  # Import os to size the worker pool
+import sqlite3  # Import sqlite3 to open read-only branch connections
+from concurrent.futures import ProcessPoolExecutor  # Import a process pool to query branches in parallel
+import Gym_db  # Branch database locator
+
+# SQLite allows at most 10 attached databases per connection
+MAX_ATTACHED = 10
+
+# Each report: the per-branch query ({db} is the attached schema) and how many leading columns are
+# the grouping key; every remaining column is a count or total that is summed across branches
+REPORTS = {
+    'members_per_plan': {
+        'sql': '''SELECT coalesce(membership_plan, '(none)'), COUNT(*), coalesce(SUM(price), 0)
+                  FROM {db}.members GROUP BY 1''',
+        'keys': 1,
+        'headings': ('plan', 'members', 'monthly revenue'),
+    },
+    'trainer_hours': {
+        'sql': '''SELECT trainer_id, trainer_name, SUM(minutes_worked)
+                  FROM {db}.trainer_hours GROUP BY trainer_id, trainer_name''',
+        'keys': 2,
+        'headings': ('trainer_id', 'trainer', 'minutes'),
+    },
+    'class_signups': {
+        'sql': '''SELECT c.class_name, COUNT(DISTINCT c.class_id), COUNT(mc.member_id)
+                  FROM {db}.classes c LEFT JOIN {db}.member_class mc ON mc.class_id = c.class_id
+                  GROUP BY c.class_name''',
+        'keys': 1,
+        'headings': ('class', 'sessions', 'signups'),
+    },
+}
+
+
+def merge(rows, keys):
+    """Add up the value columns of rows that share the same key columns"""
+    totals = {}
+    for row in rows:
+        key, values = tuple(row[:keys]), row[keys:]
+        if key in totals:
+            totals[key] = [total + (value or 0) for total, value in zip(totals[key], values)]
+        else:
+            totals[key] = [value or 0 for value in values]
+    return sorted(key + tuple(values) for key, values in totals.items())
+
+
+def query_shards(report, paths):
+    """Worker: ATTACH a group of branch databases read-only and aggregate them in one query"""
+    spec = REPORTS[report]
+    conn = sqlite3.connect(':memory:', uri=True)
+    # Reports never write, so no statement on this connection may take a write lock on a branch's
+    # front desk. The shards are attached with mode=rw rather than mode=ro, because a read-only
+    # open of a WAL database fails when its -wal/-shm files are missing and cannot be created.
+    # mode=rw still will not create a missing branch file.
+    conn.execute("PRAGMA query_only = ON")
+    try:
+        selects = []
+        for number, path in enumerate(paths):
+            conn.execute(f"ATTACH DATABASE ? AS shard{number}", (f"file:{os.path.abspath(path)}?mode=rw",))
+            selects.append(spec['sql'].format(db=f"shard{number}"))
+        columns = [f"c{number}" for number in range(len(spec['headings']))]
+        keys, values = columns[:spec['keys']], columns[spec['keys']:]
+        return conn.execute(f'''
+            WITH parts ({', '.join(columns)}) AS ({' UNION ALL '.join(selects)})
+            SELECT {', '.join(keys + [f"SUM({value})" for value in values])}
+            FROM parts GROUP BY {', '.join(keys)}
+        ''').fetchall()
+    finally:
+        conn.close()
+
+
+def run_report(report, branches=None, workers=None):
+    """Run a report over every branch (or the ones given) in parallel; returns merged rows"""
+    paths = [Gym_db.branch_path(branch) for branch in (branches or Gym_db.list_branches())]
+    if not paths:
+        return []
+    workers = workers or min(len(paths), os.cpu_count() or 1)
+    # Spread the branches over the workers, never attaching more than SQLite allows per connection
+    group_size = min(MAX_ATTACHED, -(-len(paths) // workers))
+    groups = [paths[start:start + group_size] for start in range(0, len(paths), group_size)]
+
+    if len(groups) == 1:
+        partials = [query_shards(report, groups[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(query_shards, [report] * len(groups), groups))
+    return merge((row for partial in partials for row in partial), REPORTS[report]['keys'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reports across every branch database")
+    parser.add_argument('report', choices=sorted(REPORTS), help="report to run")
+    parser.add_argument('--branches', nargs='+', help="limit the report to these branches")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    try:
+        rows = run_report(args.report, args.branches, args.workers)
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        return
+    if not rows:
+        print("No branch databases found.")
+        return
+    print(" | ".join(REPORTS[args.report]['headings']))
+    for row in rows:
+        print(" | ".join(str(value) for value in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import glob  # Import glob to find the branch databases
+import os  # Import os to read the branch name and build paths
+import sqlite3  # Import the SQLite library to interact with the database
+
+# Each branch keeps its own database (plus archives) in branches/<name>/
+BRANCH_DIR = 'branches'
+BRANCH_DB_NAME = 'gym_database.db'
+
+
+def current_branch():
+    """Branch this front desk belongs to (FLEXIGYM_BRANCH), or None for a single-gym install"""
+    return os.environ.get('FLEXIGYM_BRANCH') or None
+
+
+def branch_path(branch):
+    """Database file for a branch; None means the original single database"""
+    if branch is None:
+        return 'gym_database.db'
+    return os.path.join(BRANCH_DIR, branch, BRANCH_DB_NAME)
+
+
+def list_branches():
+    """Names of every branch that has a database"""
+    return sorted(
+        os.path.basename(os.path.dirname(path))
+        for path in glob.glob(os.path.join(BRANCH_DIR, '*', BRANCH_DB_NAME))
+    )
+
+
+# Default database file shared by every module of the application
+DB_PATH = branch_path(current_branch())
+
+# Database files already brought up to date by this process
+_upgraded_paths = set()
+
+
+def get_connection(path=DB_PATH):
+    """Open a connection with foreign keys enforced and the schema up to date"""
+    if os.path.dirname(path):
+        # A new branch's folder has to exist before SQLite can create its file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    # SQLite ignores FOREIGN KEY clauses unless this is switched on per connection
+    conn.execute("PRAGMA foreign_keys = ON")
+    # Write-ahead logging lets readers (including online backups) run without blocking writers
+    conn.execute("PRAGMA journal_mode = WAL")
+    if path not in _upgraded_paths:
+        upgrade_schema(conn)
+        _upgraded_paths.add(path)
+    return conn
+
+
+def _table_exists(conn, table):
+    """Check whether a table exists in the database"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+def _add_cascading_foreign_keys(conn):
+    """Rebuild the link tables so the engine cascades deletes and ID changes"""
+    script = ["PRAGMA foreign_keys = OFF;", "BEGIN;"]
+
+    # A foreign key may only point at a unique column
+    if _table_exists(conn, 'members'):
+        script.append("CREATE UNIQUE INDEX IF NOT EXISTS idx_members_member_id ON members(member_id);")
+
+    if _table_exists(conn, 'member_class'):
+        script.append('''
+            CREATE TABLE member_class_new (
+                member_id TEXT,
+                class_id TEXT,
+                signup_date TEXT,
+                PRIMARY KEY (member_id, class_id),
+                FOREIGN KEY (member_id) REFERENCES members(member_id)
+                    ON DELETE CASCADE ON UPDATE CASCADE,
+                FOREIGN KEY (class_id) REFERENCES classes(class_id)
+                    ON DELETE CASCADE ON UPDATE CASCADE
+            );
+            INSERT INTO member_class_new SELECT member_id, class_id, signup_date FROM member_class;
+            DROP TABLE member_class;
+            ALTER TABLE member_class_new RENAME TO member_class;
+        ''')
+
+    if _table_exists(conn, 'assignments'):
+        script.append('''
+            CREATE TABLE assignments_new (
+                assignment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                class_id TEXT,
+                class_name TEXT,
+                trainer_id TEXT,
+                trainer_name TEXT,
+                date TEXT,
+                duration_minutes INTEGER,
+                assignment_date TEXT,
+                FOREIGN KEY (class_id) REFERENCES classes(class_id)
+                    ON DELETE CASCADE ON UPDATE CASCADE,
+                FOREIGN KEY (trainer_id) REFERENCES trainers(staff_id)
+                    ON DELETE RESTRICT ON UPDATE CASCADE
+            );
+            INSERT INTO assignments_new
+                SELECT assignment_id, class_id, class_name, trainer_id, trainer_name,
+                       date, duration_minutes, assignment_date
+                FROM assignments;
+            DROP TABLE assignments;
+            ALTER TABLE assignments_new RENAME TO assignments;
+        ''')
+
+    if _table_exists(conn, 'trainer_hours'):
+        # Each hours record now belongs to the assignment that produced it.
+        # Legacy rows are paired with assignments by trainer, date and length;
+        # rows that match nothing keep a NULL link and show up as orphans.
+        script.append('''
+            CREATE TABLE trainer_hours_new (
+                record_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                trainer_id TEXT,
+                trainer_name TEXT,
+                date TEXT,
+                minutes_worked INTEGER,
+                assignment_id INTEGER,
+                FOREIGN KEY (trainer_id) REFERENCES trainers(staff_id)
+                    ON UPDATE CASCADE,
+                FOREIGN KEY (assignment_id) REFERENCES assignments(assignment_id)
+                    ON DELETE CASCADE
+            );
+        ''')
+        if _table_exists(conn, 'assignments'):
+            script.append('''
+                INSERT INTO trainer_hours_new
+                    SELECT h.record_id, h.trainer_id, h.trainer_name, h.date, h.minutes_worked, a.assignment_id
+                    FROM (
+                        SELECT *, ROW_NUMBER() OVER (
+                            PARTITION BY trainer_id, date, minutes_worked ORDER BY record_id
+                        ) AS n
+                        FROM trainer_hours
+                    ) h
+                    LEFT JOIN (
+                        SELECT assignment_id, trainer_id, date, duration_minutes, ROW_NUMBER() OVER (
+                            PARTITION BY trainer_id, date, duration_minutes ORDER BY assignment_id
+                        ) AS n
+                        FROM assignments
+                    ) a
+                    ON a.trainer_id = h.trainer_id AND a.date = h.date
+                       AND a.duration_minutes = h.minutes_worked AND a.n = h.n;
+            ''')
+        else:
+            script.append('''
+                INSERT INTO trainer_hours_new
+                    SELECT record_id, trainer_id, trainer_name, date, minutes_worked, NULL
+                    FROM trainer_hours;
+            ''')
+        script.append('''
+            DROP TABLE trainer_hours;
+            ALTER TABLE trainer_hours_new RENAME TO trainer_hours;
+        ''')
+
+    script.append("COMMIT;")
+    script.append("PRAGMA foreign_keys = ON;")
+    conn.executescript("\n".join(script))
+
+
+def create_foreign_key_indexes(conn):
+    """Index the child side of every foreign key so cascades do not scan"""
+    statements = {
+        'member_class': ["CREATE INDEX IF NOT EXISTS idx_member_class_class ON member_class(class_id)"],
+        'assignments': [
+            "CREATE INDEX IF NOT EXISTS idx_assignments_class ON assignments(class_id)",
+            "CREATE INDEX IF NOT EXISTS idx_assignments_trainer ON assignments(trainer_id)",
+        ],
+        'trainer_hours': [
+            "CREATE INDEX IF NOT EXISTS idx_trainer_hours_trainer ON trainer_hours(trainer_id)",
+            "CREATE INDEX IF NOT EXISTS idx_trainer_hours_assignment ON trainer_hours(assignment_id)",
+        ],
+    }
+    for table, indexes in statements.items():
+        if _table_exists(conn, table):
+            for sql in indexes:
+                conn.execute(sql)
+    conn.commit()
+
+
+def create_unique_indexes(conn):
+    """Enforce uniqueness of every account field people register with"""
+    statements = {
+        'members': ["CREATE UNIQUE INDEX IF NOT EXISTS uq_members_email ON members(email)"],
+        'staff': [
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_staff_email ON staff(email)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_staff_staff_id ON staff(staff_id)",
+            # Superseded by the unique index above
+            "DROP INDEX IF EXISTS idx_staff_staff_id",
+        ],
+    }
+    for table, indexes in statements.items():
+        if _table_exists(conn, table):
+            for sql in indexes:
+                try:
+                    conn.execute(sql)
+                except sqlite3.IntegrityError as e:
+                    # Legacy duplicates: report them and keep the application usable
+                    print(f"Database error: {e} ({sql})")
+    conn.commit()
+
+
+# Ordered schema upgrades; the position in this list is the schema version
+_MIGRATIONS = [
+    _add_cascading_foreign_keys,
+]
+
+
+def upgrade_schema(conn):
+    """Apply any schema upgrades the database has not seen yet"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(_MIGRATIONS, start=1):
+        if number > version:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+    create_foreign_key_indexes(conn)
+    create_unique_indexes(conn)
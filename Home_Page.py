@@ -2,6 +2,8 @@ import tkinter as tk  # Import the Tkinter library for GUI creation
 from tkinter import font as tkfont, messagebox  # Import font management and message boxes
 import os  # Import OS module to interact with the file system
 import subprocess  # Import subprocess to run external Python scripts
+import Job_queue  # Background workers for long-running jobs queued by the sprints
+import Checkin  # Front-door check-in kiosk
 
 class SprintNavigator:
     def __init__(self, root):
@@ -23,6 +25,14 @@ class SprintNavigator:
         # Dictionary to track subprocesses running sprint modules
         self.sprint_processes = {}
 
+        # The check-in kiosk window, while it is open
+        self.kiosk = None
+
+        # Workers that run the jobs (exports, backups, archiving) queued by the sprint windows
+        self.job_workers = Job_queue.WorkerPool()
+        self.job_workers.start()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # Create main sections of the application interface
         self.create_header()
         self.create_main_menu()
@@ -69,6 +79,22 @@ class SprintNavigator:
             grid_frame.grid_columnconfigure(i % 2, weight=1)
             grid_frame.grid_rowconfigure(i // 2, weight=1)
 
+        # Button that turns this screen into the front-door check-in kiosk
+        tk.Button(
+            self.main_menu_frame,
+            text="CHECK-IN KIOSK",
+            font=("Montserrat", 11, "bold"),
+            fg="white",
+            bg=self.primary_green,
+            activebackground="#246b43",
+            activeforeground="white",
+            cursor="hand2",
+            bd=0,
+            padx=20,
+            pady=8,
+            command=self.open_checkin_kiosk
+        ).pack(side="bottom", pady=(0, 5))
+
         # Add a motivational quote at the bottom of the main menu
         quote = tk.Label(
             self.main_menu_frame,
@@ -185,6 +211,25 @@ class SprintNavigator:
             # Show error if the sprint module file is not found
             messagebox.showerror("Not Found", f"File {filename} not found")
 
+    def open_checkin_kiosk(self):
+        # Only one kiosk per desk; bring the open one to the front instead
+        if self.kiosk is not None and self.kiosk.winfo_exists():
+            self.kiosk.lift()
+            return
+        try:
+            self.kiosk = Checkin.open_kiosk(self.root)
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not open the check-in kiosk\n{str(e)}")
+
+    def on_close(self):
+        # Write the kiosk's queued check-ins (spooling them if the database stays locked, so this waits
+        # at most Checkin.CLOSE_SECONDS); destroying the root skips the kiosk's own close handler
+        if self.kiosk is not None and self.kiosk.winfo_exists():
+            self.kiosk.recorder.close()
+        # Let the workers finish their current job before the window goes away
+        self.job_workers.stop()
+        self.root.destroy()
+
 if __name__ == "__main__":
     root = tk.Tk()
 
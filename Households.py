@@ -0,0 +1,161 @@
+import argparse  # Import argparse to read command line options
+import sqlite3  # Import sqlite3 to catch database errors
+from datetime import datetime  # Import datetime to stamp when a dependent was added
+import Gym_db  # Shared connection helper that enforces foreign keys
+
+# A payer on this plan covers everyone in the household, up to FAMILY_MAX_MEMBERS people in all
+FAMILY_PLAN = 'Family'
+FAMILY_MAX_MEMBERS = 6
+
+# Every member with the root payer of their household; members with no payer are their own root
+HOUSEHOLD_TREE = '''
+    household(root_id, member_id, depth) AS (
+        SELECT m.member_id, m.member_id, 0
+        FROM members m
+        WHERE {roots} AND NOT EXISTS (SELECT 1 FROM household_links l WHERE l.member_id = m.member_id)
+        UNION ALL
+        SELECT h.root_id, l.member_id, h.depth + 1
+        FROM household_links l
+        JOIN household h ON l.payer_id = h.member_id
+    )
+'''
+
+# The root payer of one member, found by walking up the links
+ROOT_PAYER = '''
+    WITH RECURSIVE up(member_id, depth) AS (
+        SELECT ?, 0
+        UNION ALL
+        SELECT l.payer_id, up.depth + 1 FROM household_links l JOIN up ON l.member_id = up.member_id
+    )
+    SELECT member_id FROM up ORDER BY depth DESC LIMIT 1
+'''
+
+
+def initialize_household_tables(conn):
+    """Create the payer/dependent links; a member appears at most once, as someone's dependent"""
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS household_links (
+            member_id TEXT PRIMARY KEY,
+            payer_id TEXT NOT NULL,
+            relationship TEXT,
+            added_at TEXT NOT NULL,
+            CHECK (member_id != payer_id),
+            FOREIGN KEY (member_id) REFERENCES members(member_id)
+                ON DELETE CASCADE ON UPDATE CASCADE,
+            FOREIGN KEY (payer_id) REFERENCES members(member_id)
+                ON DELETE CASCADE ON UPDATE CASCADE
+        );
+
+        -- Walking down from a payer to their dependents
+        CREATE INDEX IF NOT EXISTS idx_household_links_payer ON household_links(payer_id);
+    ''')
+
+
+def root_payer(conn, member_id):
+    """Member who pays for this member's household (themselves if nobody pays for them)"""
+    return conn.execute(ROOT_PAYER, (member_id,)).fetchone()[0]
+
+
+def household(conn, member_id):
+    """Everyone in a member's household: [(member_id, username, membership_plan, depth, payer_id)], payer first"""
+    root = root_payer(conn, member_id)
+    return conn.execute(f'''
+        WITH RECURSIVE {HOUSEHOLD_TREE.format(roots="m.member_id = :root")}
+        SELECT h.member_id, m.username, m.membership_plan, h.depth, l.payer_id
+        FROM household h
+        JOIN members m ON m.member_id = h.member_id
+        LEFT JOIN household_links l ON l.member_id = h.member_id
+        ORDER BY h.depth, m.username
+    ''', {'root': root}).fetchall()
+
+
+def is_covered(conn, member_id):
+    """True if a member's household is paid for by a Family plan payer"""
+    root = root_payer(conn, member_id)
+    return conn.execute(
+        "SELECT membership_plan = ? FROM members WHERE member_id = ?", (FAMILY_PLAN, root)
+    ).fetchone() == (1,)
+
+
+def add_dependent(conn, payer_id, member_id, relationship=None):
+    """Put a member in a payer's household, refusing loops and over-full Family households"""
+    with conn:
+        # Take the write lock before the checks, so two adds at once cannot both pass them
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("SELECT 1 FROM household_links WHERE member_id = ?", (member_id,)).fetchone():
+            raise ValueError("That member already belongs to a household")
+        # A loop would leave the whole household without anyone at the top to bill
+        if root_payer(conn, payer_id) == member_id:
+            raise ValueError("A member cannot be added to a household they pay for")
+        members = household(conn, payer_id)
+        dependents = household(conn, member_id)
+        if is_covered(conn, payer_id) and len(members) + len(dependents) > FAMILY_MAX_MEMBERS:
+            raise ValueError(f"A {FAMILY_PLAN} plan covers at most {FAMILY_MAX_MEMBERS} people")
+        try:
+            conn.execute('''
+                INSERT INTO household_links (member_id, payer_id, relationship, added_at) VALUES (?, ?, ?, ?)
+            ''', (member_id, payer_id, relationship, datetime.now().isoformat(timespec='seconds')))
+        except sqlite3.IntegrityError as e:
+            if 'FOREIGN KEY' in str(e):
+                raise ValueError("No such member")
+            raise ValueError("A member cannot pay for themselves")
+
+
+def remove_dependent(conn, member_id):
+    """Take a member (and anyone they pay for) out of their household"""
+    with conn:
+        cursor = conn.execute("DELETE FROM household_links WHERE member_id = ?", (member_id,))
+    if not cursor.rowcount:
+        raise ValueError("That member is not anyone's dependent")
+
+
+def household_totals(conn):
+    """Every household with more than one member: [(payer_id, members, monthly_pence)] in one query"""
+    return conn.execute(f'''
+        WITH RECURSIVE {HOUSEHOLD_TREE.format(roots="m.member_id IS NOT NULL")}
+        SELECT h.root_id, count(*),
+               SUM(CASE WHEN h.depth > 0 AND root.membership_plan = :family THEN 0
+                        ELSE CAST(round(coalesce(m.price, 0) * 100) AS INTEGER) END)
+        FROM household h
+        JOIN members m ON m.member_id = h.member_id
+        JOIN members root ON root.member_id = h.root_id
+        GROUP BY h.root_id
+        HAVING count(*) > 1
+        ORDER BY h.root_id
+    ''', {'family': FAMILY_PLAN}).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Family households")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="database file")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--add', nargs=2, metavar=('PAYER_ID', 'MEMBER_ID'), help="add a dependent to a payer")
+    action.add_argument('--remove', metavar='MEMBER_ID', help="take a dependent out of their household")
+    action.add_argument('--show', metavar='MEMBER_ID', help="list a member's household")
+    action.add_argument('--totals', action='store_true', help="monthly total of every household")
+    parser.add_argument('--relationship', help="how the dependent is related to the payer")
+    args = parser.parse_args()
+
+    conn = Gym_db.get_connection(args.db)
+    try:
+        initialize_household_tables(conn)
+        if args.add:
+            add_dependent(conn, *args.add, args.relationship)
+            print(f"{args.add[1]} added to {args.add[0]}'s household")
+        elif args.remove:
+            remove_dependent(conn, args.remove)
+            print(f"{args.remove} removed from their household")
+        elif args.show:
+            for member_id, username, plan, depth, payer_id in household(conn, args.show):
+                print(f"{'  ' * depth}{username} ({member_id}) {plan or ''}" + (f" paid by {payer_id}" if payer_id else ''))
+        else:
+            for payer_id, members, pence in household_totals(conn):
+                print(f"{payer_id:12} {members} members £{pence / 100:.2f}/month")
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Household error: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse  # Import argparse to read command line options
+import Gym_db  # Shared connection helper that enforces foreign keys
+
+
+def foreign_key_violations(conn):
+    """Yield (table, rowid, parent) for every row whose parent row is missing"""
+    for table, rowid, parent, _fkid in conn.execute("PRAGMA foreign_key_check"):
+        yield table, rowid, parent
+
+
+def unlinked_trainer_hours(conn):
+    """Yield hours records that are not tied to any assignment"""
+    for (rowid,) in conn.execute("SELECT rowid FROM trainer_hours WHERE assignment_id IS NULL"):
+        yield 'trainer_hours', rowid, 'assignments'
+
+
+def orphan_report(conn):
+    """Stream every orphaned row in the database as (table, rowid, parent)"""
+    yield from foreign_key_violations(conn)
+    yield from unlinked_trainer_hours(conn)
+
+
+def clean_orphans(conn):
+    """Delete every orphaned row in one transaction and return counts per table"""
+    # Collect the row IDs first: rows must not be deleted while the report cursor is open
+    orphans = {}
+    for table, rowid, _parent in orphan_report(conn):
+        orphans.setdefault(table, set()).add(rowid)
+
+    with conn:
+        for table, rowids in orphans.items():
+            conn.executemany(f"DELETE FROM {table} WHERE rowid = ?", ((rowid,) for rowid in rowids))
+
+    return {table: len(rowids) for table, rowids in orphans.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report (and optionally remove) orphaned rows in the gym database")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="database file to check")
+    parser.add_argument('--fix', action='store_true', help="delete the orphaned rows")
+    args = parser.parse_args()
+
+    conn = Gym_db.get_connection(args.db)
+    try:
+        if args.fix:
+            counts = clean_orphans(conn)
+            for table, count in counts.items():
+                print(f"{table}: removed {count} orphaned rows")
+            if not counts:
+                print("No orphaned rows found.")
+        else:
+            total = 0
+            for table, rowid, parent in orphan_report(conn):
+                print(f"{table} row {rowid}: missing {parent} record")
+                total += 1
+            print(f"{total} orphaned rows found.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
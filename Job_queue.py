@@ -0,0 +1,292 @@
+import argparse  # Import argparse to read command line options
+import importlib  # Import importlib to load job handlers only when a job needs them
+import json  # Import json to store job arguments and results
+import os  # Import os to name this worker
+import sqlite3  # Import sqlite3 to catch database errors in the workers
+import threading  # Import threading for the worker pool
+import time  # Import time for leases and retry delays
+import traceback  # Import traceback to keep the error of a failed job
+import Gym_db  # Shared connection helper that enforces foreign keys
+
+# What each job kind runs: (module, function); modules are imported on first use
+JOB_HANDLERS = {
+    'export': ('Data_export', 'export_file'),
+    'backup': ('Backup', 'snapshot'),
+    'archive': ('Archive', 'archive_file'),
+    'billing': ('Billing', 'run_billing_file'),
+    'receipts': ('Receipts', 'render_period_file'),
+    'door_logs': ('Door_logs', 'ingest_path'),
+    'occupancy': ('Occupancy', 'expire_file'),
+}
+
+# Jobs are retried this many times in total, waiting RETRY_DELAY * 2^attempt seconds in between
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 5
+
+# A worker that stops renewing a job's lease is presumed dead and the job is re-queued
+LEASE_SECONDS = 300
+
+# While a job runs its lease is renewed this many times per lease period
+HEARTBEATS_PER_LEASE = 3
+
+WORKERS = 2
+POLL_SECONDS = 1.0
+
+
+def initialize_job_queue(conn):
+    """Create the jobs table and the indexes behind claiming and polling"""
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id INTEGER PRIMARY KEY,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            lease_seconds INTEGER NOT NULL,
+            run_after REAL NOT NULL,
+            lease_owner TEXT,
+            lease_expires REAL,
+            result TEXT,
+            error TEXT,
+            created_at REAL NOT NULL,
+            finished_at REAL
+        );
+
+        -- Only queued jobs are in this index, in the order they should run
+        CREATE INDEX IF NOT EXISTS idx_jobs_runnable
+            ON jobs(priority DESC, run_after, job_id) WHERE status = 'queued';
+
+        -- Running jobs by lease expiry, to find the ones whose worker died
+        CREATE INDEX IF NOT EXISTS idx_jobs_leases
+            ON jobs(lease_expires) WHERE status = 'running';
+    ''')
+
+
+def enqueue(conn, kind, args=(), kwargs=None, priority=0, delay=0,
+            max_attempts=MAX_ATTEMPTS, lease_seconds=LEASE_SECONDS):
+    """Queue a job (higher priority runs first); returns its job_id"""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    now = time.time()
+    with conn:
+        cursor = conn.execute('''
+            INSERT INTO jobs (kind, payload, priority, max_attempts, lease_seconds, run_after, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (kind, json.dumps({'args': list(args), 'kwargs': kwargs or {}}),
+              priority, max_attempts, lease_seconds, now + delay, now))
+    return cursor.lastrowid
+
+
+def job_status(conn, job_id):
+    """(status, result, error) of a job; a primary-key lookup, cheap enough to poll"""
+    row = conn.execute("SELECT status, result, error FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    status, result, error = row
+    return status, json.loads(result) if result is not None else None, error
+
+
+def claim_next(conn, worker):
+    """Lease the next runnable job to worker; returns (job_id, kind, payload, lease_seconds) or None"""
+    now = time.time()
+    with conn:
+        # Jobs whose worker vanished go back in the queue
+        conn.execute('''
+            UPDATE jobs SET status = 'queued', lease_owner = NULL
+            WHERE status = 'running' AND lease_expires < ?
+        ''', (now,))
+        # One statement picks and leases the job, so two workers can never take the same one
+        return conn.execute('''
+            UPDATE jobs
+            SET status = 'running', lease_owner = ?, lease_expires = ? + lease_seconds, attempts = attempts + 1
+            WHERE job_id = (
+                SELECT job_id FROM jobs
+                WHERE status = 'queued' AND run_after <= ?
+                ORDER BY priority DESC, run_after, job_id
+                LIMIT 1
+            )
+            RETURNING job_id, kind, payload, lease_seconds
+        ''', (worker, now, now)).fetchone()
+
+
+def renew_lease(conn, job_id, worker):
+    """Push a running job's lease out by another lease period; False if worker no longer holds it"""
+    with conn:
+        cursor = conn.execute('''
+            UPDATE jobs SET lease_expires = ? + lease_seconds
+            WHERE job_id = ? AND lease_owner = ? AND status = 'running'
+        ''', (time.time(), job_id, worker))
+    return cursor.rowcount > 0
+
+
+def finish(conn, job_id, worker, result=None, error=None):
+    """Record a job's outcome; a failure is retried with back-off until max_attempts"""
+    now = time.time()
+    with conn:
+        if error is None:
+            conn.execute('''
+                UPDATE jobs SET status = 'done', result = ?, error = NULL, finished_at = ?, lease_owner = NULL
+                WHERE job_id = ? AND lease_owner = ?
+            ''', (json.dumps(result, default=str), now, job_id, worker))
+        else:
+            conn.execute('''
+                UPDATE jobs SET
+                    status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                    run_after = ? + ? * (1 << attempts),
+                    finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END,
+                    error = ?, lease_owner = NULL
+                WHERE job_id = ? AND lease_owner = ?
+            ''', (now, RETRY_DELAY, now, error, job_id, worker))
+
+
+def run_job(kind, payload):
+    module_name, function_name = JOB_HANDLERS[kind]
+    handler = getattr(importlib.import_module(module_name), function_name)
+    arguments = json.loads(payload)
+    return handler(*arguments['args'], **arguments['kwargs'])
+
+
+class WorkerPool:
+    """Threads that take jobs off the queue until stopped"""
+
+    def __init__(self, db_path=Gym_db.DB_PATH, workers=WORKERS, poll_seconds=POLL_SECONDS):
+        self.db_path = db_path
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        conn = Gym_db.get_connection(self.db_path)
+        try:
+            initialize_job_queue(conn)
+        finally:
+            conn.close()
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(f"{os.getpid()}-{number}",),
+                                      name=f"job-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        """Ask the workers to finish their current job and exit"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _work(self, worker):
+        conn = Gym_db.get_connection(self.db_path)
+        try:
+            while not self._stop.is_set():
+                try:
+                    job = claim_next(conn, worker)
+                except sqlite3.Error as e:
+                    # A locked database must not kill the worker; try again after the usual poll
+                    print(f"Job worker {worker} could not claim a job: {e}")
+                    self._stop.wait(self.poll_seconds)
+                    continue
+                if job is None:
+                    self._stop.wait(self.poll_seconds)
+                    continue
+                job_id, kind, payload, lease_seconds = job
+                # Keep the lease alive however long the handler takes; only a dead worker lets it lapse
+                done = threading.Event()
+                heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, worker, lease_seconds, done),
+                                             name=f"job-heartbeat-{job_id}", daemon=True)
+                heartbeat.start()
+                try:
+                    result = run_job(kind, payload)
+                except Exception:
+                    error = traceback.format_exc(limit=3)
+                    result = None
+                else:
+                    error = None
+                finally:
+                    done.set()
+                    heartbeat.join()
+                self._finish(conn, job_id, worker, result, error)
+        finally:
+            conn.close()
+
+    def _finish(self, conn, job_id, worker, result, error):
+        """finish(), retried while the database is busy; if the pool stops first the lease lapses and the job re-runs"""
+        while True:
+            try:
+                finish(conn, job_id, worker, result=result, error=error)
+                return
+            except sqlite3.Error as e:
+                print(f"Job {job_id} outcome not saved yet: {e}")
+                if self._stop.wait(self.poll_seconds):
+                    return
+
+    def _heartbeat(self, job_id, worker, lease_seconds, done):
+        conn = Gym_db.get_connection(self.db_path)
+        try:
+            while not done.wait(lease_seconds / HEARTBEATS_PER_LEASE):
+                try:
+                    if not renew_lease(conn, job_id, worker):
+                        return
+                except sqlite3.Error as e:
+                    # A busy database delays one renewal; the next one still lands well inside the lease
+                    print(f"Job {job_id} lease renewal failed: {e}")
+        finally:
+            conn.close()
+
+
+def watch_job(widget, job_id, on_done, on_error=None, on_waiting=None, poll_ms=500, db_path=Gym_db.DB_PATH):
+    """Poll a job from Tk with after(); calls on_done(result) or on_error(error) once it settles"""
+    def check():
+        conn = Gym_db.get_connection(db_path)
+        try:
+            status, result, error = job_status(conn, job_id)
+        finally:
+            conn.close()
+        if status == 'done':
+            on_done(result)
+        elif status == 'failed':
+            if on_error:
+                on_error(error)
+        else:
+            if on_waiting:
+                on_waiting(status)
+            widget.after(poll_ms, check)
+
+    widget.after(poll_ms, check)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Background job queue")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="database file holding the queue")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--work', action='store_true', help="run a worker pool until interrupted")
+    action.add_argument('--list', action='store_true', help="show the most recent jobs")
+    parser.add_argument('--workers', type=int, default=WORKERS, help="worker threads for --work")
+    args = parser.parse_args()
+
+    if args.work:
+        pool = WorkerPool(args.db, args.workers)
+        pool.start()
+        print(f"{args.workers} workers running; press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pool.stop()
+        return
+
+    conn = Gym_db.get_connection(args.db)
+    try:
+        initialize_job_queue(conn)
+        for job_id, kind, status, attempts, error in conn.execute('''
+            SELECT job_id, kind, status, attempts, error FROM jobs ORDER BY job_id DESC LIMIT 20
+        '''):
+            last_line = error.strip().splitlines()[-1] if error else ''
+            print(f"#{job_id} {kind:8} {status:8} attempts={attempts} {last_line}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
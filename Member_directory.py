@@ -0,0 +1,142 @@
+import Gym_db  # Shared connection helper that enforces foreign keys
+
+# Columns the directory shows and can be sorted on
+SORT_COLUMNS = ('username', 'email', 'member_id')
+
+# Members shown on each page of the directory
+PAGE_SIZE = 50
+
+
+def initialize_directory_indexes(conn):
+    """Create the indexes that back every sortable column"""
+    # username is unique on its own; the other columns use it as a tie-breaker and are indexed
+    # on the same coalesce() expression the queries sort by
+    conn.execute("DROP INDEX IF EXISTS idx_members_email_username")
+    conn.execute("DROP INDEX IF EXISTS idx_members_member_id_username")
+    for column in SORT_COLUMNS[1:]:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_members_{column}_key ON members({sort_expression(column)}, username)")
+    conn.commit()
+
+
+def sort_expression(column):
+    """What a column is sorted by: NULLs (no email or member ID) sort as '' so keyset paging does not stop at them"""
+    return column if column == 'username' else f"coalesce({column}, '')"
+
+
+class MemberDirectory:
+    """Keyset-paginated view of the members table sorted on any column"""
+
+    def __init__(self, conn, page_size=PAGE_SIZE):
+        self.conn = conn
+        self.page_size = page_size
+        self.sort_column = 'username'
+        self.descending = False
+        self.page_number = 0
+        self.rows = []
+        self.has_next = False
+        self._prefetched = None
+
+    def _key(self, row):
+        """Keyset position of a row under the current sort"""
+        if self.sort_column == 'username':
+            return (row[0],)
+        value = row[SORT_COLUMNS.index(self.sort_column)]
+        return ('' if value is None else value, row[0])
+
+    def _fetch(self, key=None, backwards=False):
+        """Fetch one page after (or before) a keyset position; returns (rows, more_available)"""
+        columns = [sort_expression(self.sort_column)]
+        if self.sort_column != 'username':
+            columns.append('username')
+        # Walking backwards through an ascending list is a descending scan, and vice versa
+        descending = self.descending != backwards
+        direction = "DESC" if descending else "ASC"
+
+        order = ", ".join(f"{column} {direction}" for column in columns)
+        beyond = '<' if descending else '>'
+        # One extra row tells us whether another page exists without a COUNT(*)
+        limit = self.page_size + 1
+        if key is None:
+            query = f"SELECT username, email, member_id FROM members ORDER BY {order} LIMIT ?"
+            params = [limit]
+        elif len(columns) == 1:
+            query = f"SELECT username, email, member_id FROM members WHERE {columns[0]} {beyond} ? ORDER BY {order} LIMIT ?"
+            params = [key[0], limit]
+        else:
+            # Not a row-value comparison: SQLite would only seek on the first column, then walk every row
+            # sharing that value (thousands of members without an email). Two seeks on the
+            # (expression, username) index instead: the rest of the current value, then the values after it.
+            sort = columns[0]
+            query = f'''
+                SELECT username, email, member_id FROM (
+                    SELECT * FROM (
+                        SELECT username, email, member_id, {sort} AS sort_key FROM members
+                        WHERE {sort} = ? AND username {beyond} ? ORDER BY username {direction} LIMIT ?
+                    )
+                    UNION ALL
+                    SELECT * FROM (
+                        SELECT username, email, member_id, {sort} AS sort_key FROM members
+                        WHERE {sort} {beyond} ? ORDER BY {order} LIMIT ?
+                    )
+                )
+                ORDER BY sort_key {direction}, username {direction} LIMIT ?
+            '''
+            params = [key[0], key[1], limit, key[0], limit, limit]
+
+        rows = self.conn.execute(query, params).fetchall()
+        more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows.reverse()
+        return rows, more
+
+    def sort_by(self, column, descending=False):
+        """Change the sort order and return the first page"""
+        if column not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort members by {column}")
+        self.sort_column = column
+        self.descending = descending
+        return self.first_page()
+
+    def first_page(self):
+        self.page_number = 1
+        self._prefetched = None
+        self.rows, self.has_next = self._fetch()
+        return self.rows
+
+    def next_page(self):
+        if not self.has_next:
+            return self.rows
+        key = self._key(self.rows[-1])
+        if self._prefetched and self._prefetched[0] == key:
+            _, self.rows, self.has_next = self._prefetched
+        else:
+            self.rows, self.has_next = self._fetch(key)
+        self._prefetched = None
+        self.page_number += 1
+        return self.rows
+
+    def previous_page(self):
+        if self.page_number <= 1:
+            return self.rows
+        self.rows, _ = self._fetch(self._key(self.rows[0]), backwards=True)
+        self.has_next = True
+        self._prefetched = None
+        self.page_number -= 1
+        return self.rows
+
+    def prefetch_next(self):
+        """Load the following page ahead of time so 'Next' is instant"""
+        if self.has_next and self._prefetched is None:
+            key = self._key(self.rows[-1])
+            rows, more = self._fetch(key)
+            self._prefetched = (key, rows, more)
+
+
+def open_directory(path=Gym_db.DB_PATH, page_size=PAGE_SIZE):
+    """Open a connection and a directory positioned on the first page"""
+    conn = Gym_db.get_connection(path)
+    initialize_directory_indexes(conn)
+    directory = MemberDirectory(conn, page_size)
+    directory.first_page()
+    return directory
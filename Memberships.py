@@ -0,0 +1,167 @@
+import argparse  # Import argparse to read command line options
+import sqlite3  # Import sqlite3 to catch database errors
+from datetime import date, datetime, timedelta  # Import datetime for pause dates and billing periods
+import Gym_db  # Shared connection helper that enforces foreign keys
+
+ACTIVE = 'active'
+PAUSED = 'paused'
+
+# Members with no pause in force today; answered from the small index of open pauses, not the history
+ACTIVE_MEMBER = '''NOT EXISTS (
+    SELECT 1 FROM membership_pauses p
+    WHERE p.member_id = members.member_id AND p.resumed_on IS NULL AND p.paused_from <= date('now', 'localtime')
+)'''
+
+
+def initialize_membership_tables(conn):
+    """Create the pause history; a pause with no resume date is the member's current state"""
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS membership_pauses (
+            pause_id INTEGER PRIMARY KEY,
+            member_id TEXT NOT NULL,
+            paused_from TEXT NOT NULL,
+            resumed_on TEXT,
+            reason TEXT,
+            created_at TEXT NOT NULL,
+            CHECK (resumed_on IS NULL OR resumed_on >= paused_from),
+            FOREIGN KEY (member_id) REFERENCES members(member_id)
+                ON DELETE CASCADE ON UPDATE CASCADE
+        );
+
+        -- At most one open pause per member; also the index behind "who is paused right now"
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_membership_pauses_open
+            ON membership_pauses(member_id) WHERE resumed_on IS NULL;
+
+        -- Pauses overlapping a billing period, found by start date
+        CREATE INDEX IF NOT EXISTS idx_membership_pauses_period
+            ON membership_pauses(paused_from, resumed_on);
+    ''')
+
+
+def _day(value):
+    """Today's date for None, otherwise check and return a YYYY-MM-DD string"""
+    if value is None:
+        return date.today().isoformat()
+    date.fromisoformat(value)  # rejects anything that is not YYYY-MM-DD
+    return value
+
+
+def status(conn, member_id, on=None):
+    """'active' or 'paused' as of a date (default today)"""
+    paused = conn.execute('''
+        SELECT 1 FROM membership_pauses
+        WHERE member_id = ? AND paused_from <= ? AND (resumed_on IS NULL OR resumed_on > ?)
+    ''', (member_id, _day(on), _day(on))).fetchone()
+    return PAUSED if paused else ACTIVE
+
+
+def is_active(conn, member_id):
+    return conn.execute(
+        f"SELECT 1 FROM members WHERE member_id = ? AND {ACTIVE_MEMBER}", (member_id,)
+    ).fetchone() is not None
+
+
+def pause(conn, member_id, paused_from=None, reason=None):
+    """Pause a membership from a date (default today); an already paused member cannot be paused again"""
+    paused_from = _day(paused_from)
+    try:
+        with conn:
+            conn.execute('''
+                INSERT INTO membership_pauses (member_id, paused_from, reason, created_at) VALUES (?, ?, ?, ?)
+            ''', (member_id, paused_from, reason, datetime.now().isoformat(timespec='seconds')))
+    except sqlite3.IntegrityError as e:
+        if 'FOREIGN KEY' in str(e):
+            raise ValueError(f"No member {member_id}")
+        raise ValueError("This membership is already paused")
+
+
+def resume(conn, member_id, resumed_on=None):
+    """Reactivate a paused membership from a date (default today)"""
+    resumed_on = _day(resumed_on)
+    if resumed_on > date.today().isoformat():
+        raise ValueError("A membership can only be reactivated from today or an earlier date")
+    with conn:
+        # Reactivating a pause that has not started yet cancels it
+        cursor = conn.execute('''
+            UPDATE membership_pauses SET resumed_on = max(?, paused_from)
+            WHERE member_id = ? AND resumed_on IS NULL
+        ''', (resumed_on, member_id))
+    if not cursor.rowcount:
+        raise ValueError("This membership is not paused")
+
+
+def period_bounds(period):
+    """First day of a YYYY-MM period and first day of the next"""
+    start = datetime.strptime(period, '%Y-%m').date()
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def active_days(intervals, start, end):
+    """Days in [start, end) not covered by any paused [from, to) interval (to may be None).
+
+    Sorts the clipped intervals and sweeps once, so overlapping or repeated pauses are counted once.
+    """
+    paused = 0
+    covered_to = start
+    for paused_from, resumed_on in sorted((max(a, start), min(b or end, end)) for a, b in intervals):
+        if resumed_on <= covered_to:
+            continue
+        paused += (resumed_on - max(paused_from, covered_to)).days
+        covered_to = resumed_on
+    return (end - start).days - paused
+
+
+def prorated_days(conn, period):
+    """{member_id: active days} for members with a pause overlapping a period; everyone else is billed in full"""
+    start, end = period_bounds(period)
+    intervals = {}
+    for member_id, paused_from, resumed_on in conn.execute('''
+        SELECT member_id, paused_from, resumed_on FROM membership_pauses
+        WHERE paused_from < ? AND (resumed_on IS NULL OR resumed_on > ?)
+    ''', (end.isoformat(), start.isoformat())):
+        intervals.setdefault(member_id, []).append(
+            (date.fromisoformat(paused_from), date.fromisoformat(resumed_on) if resumed_on else None)
+        )
+    return {member_id: active_days(spans, start, end) for member_id, spans in intervals.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pause and reactivate memberships")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="database file")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--pause', metavar='MEMBER_ID', help="pause a membership")
+    action.add_argument('--resume', metavar='MEMBER_ID', help="reactivate a membership")
+    action.add_argument('--status', metavar='MEMBER_ID', help="show a member's status and pause history")
+    action.add_argument('--prorate', metavar='PERIOD', help="list the members billed part of a period (YYYY-MM)")
+    parser.add_argument('--date', help="date the pause or reactivation takes effect, YYYY-MM-DD (default today)")
+    parser.add_argument('--reason', help="why the membership is paused")
+    args = parser.parse_args()
+
+    conn = Gym_db.get_connection(args.db)
+    try:
+        initialize_membership_tables(conn)
+        if args.pause:
+            pause(conn, args.pause, args.date, args.reason)
+            print(f"{args.pause} paused from {args.date or 'today'}")
+        elif args.resume:
+            resume(conn, args.resume, args.date)
+            print(f"{args.resume} reactivated from {args.date or 'today'}")
+        elif args.status:
+            print(f"{args.status}: {status(conn, args.status)}")
+            for paused_from, resumed_on, reason in conn.execute('''
+                SELECT paused_from, resumed_on, reason FROM membership_pauses WHERE member_id = ? ORDER BY paused_from
+            ''', (args.status,)):
+                print(f"  paused {paused_from} to {resumed_on or '(open)'} {reason or ''}")
+        else:
+            start, end = period_bounds(args.prorate)
+            for member_id, days in sorted(prorated_days(conn, args.prorate).items()):
+                print(f"{member_id:12} {days}/{(end - start).days} days")
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Membership error: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import argparse  # Import argparse to read command line options
+import sqlite3  # Import sqlite3 to catch database errors
+import sys  # Import sys to store counters little-endian on any machine
+from array import array  # Import array for the fixed-width per-minute counters
+from datetime import date, datetime, timedelta  # Import datetime to place events in minute buckets
+import Gym_db  # Shared connection helper that enforces foreign keys
+import Archive  # For the DD/MM/YYYY to ISO class date expression
+
+# Series names: the gym floor, and one per class for its booked seats
+FLOOR = 'floor'
+CLASS_PREFIX = 'class:'
+
+# Nobody checks out, so a visit is assumed to last this long
+VISIT_MINUTES = 90
+
+MINUTES_PER_DAY = 1440
+HOURS_PER_DAY = 24
+
+# Per-minute buckets are kept this long, hourly ones this long; daily ones are kept for good.
+# An event on a day whose minutes have expired is merged into the hourly and daily peaks instead.
+MINUTE_RETENTION_DAYS = 14
+HOUR_RETENTION_DAYS = 400
+
+# Signup times as Sprint_3 and Bookings write them
+SIGNUP_FORMAT = "%d/%m/%Y %H:%M"
+
+# Check-ins replayed per call to record() during a rebuild
+REBUILD_CHUNK = 10_000
+
+RESOLUTIONS = ('minute', 'hour', 'day')
+
+
+def initialize_occupancy_tables(conn):
+    """Create the bucket tables: one row per series and day, counters packed as unsigned 16-bit arrays"""
+    conn.executescript('''
+        -- 1440 counters: how many people (or booked seats) at each minute of the day
+        CREATE TABLE IF NOT EXISTS occupancy_minutes (
+            series TEXT NOT NULL,
+            day TEXT NOT NULL,
+            counts BLOB NOT NULL,
+            PRIMARY KEY (series, day)
+        ) WITHOUT ROWID;
+
+        -- 24 counters: the peak of each hour
+        CREATE TABLE IF NOT EXISTS occupancy_hours (
+            series TEXT NOT NULL,
+            day TEXT NOT NULL,
+            peaks BLOB NOT NULL,
+            PRIMARY KEY (series, day)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS occupancy_days (
+            series TEXT NOT NULL,
+            day TEXT NOT NULL,
+            peak INTEGER NOT NULL,
+            arrivals INTEGER NOT NULL,
+            PRIMARY KEY (series, day)
+        ) WITHOUT ROWID;
+    ''')
+
+
+def _unpack(blob, size):
+    counters = array('H')
+    if blob is None:
+        counters.frombytes(bytes(2 * size))
+    else:
+        counters.frombytes(blob)
+        if sys.byteorder == 'big':
+            counters.byteswap()
+    return counters
+
+
+def _pack(counters):
+    if sys.byteorder == 'big':
+        counters = array('H', counters)
+        counters.byteswap()
+    return counters.tobytes()
+
+
+def class_series(class_id):
+    return f"{CLASS_PREFIX}{class_id}"
+
+
+def record(conn, spans):
+    """Apply (series, start, end, delta) spans to the buckets: one read and write per series and day.
+
+    A span adds delta to every minute in [start, end) and counts as an arrival when delta is positive.
+    Call inside the caller's transaction so the events and the buckets commit together.
+    """
+    # Each span only marks where it starts and stops; the minutes are filled in once per day below
+    changes = {}
+    arrivals = {}
+    for series, start, end, delta in spans:
+        if delta > 0:
+            key = (series, start.date().isoformat())
+            arrivals[key] = arrivals.get(key, 0) + delta
+        moment = start.replace(second=0, microsecond=0)
+        while moment < end:
+            day = moment.date()
+            day_end = min(end, datetime.combine(day + timedelta(days=1), datetime.min.time()))
+            steps = changes.setdefault((series, day.isoformat()), [0] * (MINUTES_PER_DAY + 1))
+            steps[moment.hour * 60 + moment.minute] += delta
+            steps[MINUTES_PER_DAY if day_end.date() != day else day_end.hour * 60 + day_end.minute] -= delta
+            moment = day_end
+
+    today = date.today()
+    minute_cutoff = (today - timedelta(days=MINUTE_RETENTION_DAYS)).isoformat()
+    hour_cutoff = (today - timedelta(days=HOUR_RETENTION_DAYS)).isoformat()
+    for (series, day), steps in changes.items():
+        row = conn.execute("SELECT counts FROM occupancy_minutes WHERE series = ? AND day = ?", (series, day)).fetchone()
+        # Past the minute retention the day's counters are gone; starting from zero would
+        # understate the peaks, so the result is merged into the rollups rather than replacing them
+        merge = row is None and day < minute_cutoff
+        counters = _unpack(row[0] if row else None, MINUTES_PER_DAY)
+        running = 0
+        for minute in range(MINUTES_PER_DAY):
+            running += steps[minute]
+            if running:
+                counters[minute] = min(0xFFFF, max(0, counters[minute] + running))
+        peaks = array('H', (max(counters[hour * 60:(hour + 1) * 60]) for hour in range(HOURS_PER_DAY)))
+
+        if not merge:
+            conn.execute('''
+                INSERT INTO occupancy_minutes (series, day, counts) VALUES (?, ?, ?)
+                ON CONFLICT (series, day) DO UPDATE SET counts = excluded.counts
+            ''', (series, day, _pack(counters)))
+        if day >= hour_cutoff:
+            if merge:
+                old = conn.execute("SELECT peaks FROM occupancy_hours WHERE series = ? AND day = ?",
+                                   (series, day)).fetchone()
+                if old:
+                    peaks = array('H', map(max, peaks, _unpack(old[0], HOURS_PER_DAY)))
+            conn.execute('''
+                INSERT INTO occupancy_hours (series, day, peaks) VALUES (?, ?, ?)
+                ON CONFLICT (series, day) DO UPDATE SET peaks = excluded.peaks
+            ''', (series, day, _pack(peaks)))
+        conn.execute('''
+            INSERT INTO occupancy_days (series, day, peak, arrivals) VALUES (?, ?, ?, ?)
+            ON CONFLICT (series, day) DO UPDATE SET
+                peak = CASE WHEN ? THEN max(peak, excluded.peak) ELSE excluded.peak END,
+                arrivals = arrivals + excluded.arrivals
+        ''', (series, day, max(peaks), arrivals.get((series, day), 0), merge))
+
+
+def checkin_spans(times):
+    """Floor spans for check-in timestamps (ISO strings)"""
+    for when in times:
+        start = datetime.fromisoformat(when)
+        yield FLOOR, start, start + timedelta(minutes=VISIT_MINUTES), 1
+
+
+def record_checkins(conn, times):
+    record(conn, checkin_spans(times))
+
+
+def signup_span(conn, class_id, signed_up_at, delta):
+    """A class's booked seats rise (or fall) from the signup until the end of the class day"""
+    row = conn.execute(f"SELECT {Archive.CLASS_ISO_DATE} FROM classes WHERE class_id = ?", (class_id,)).fetchone()
+    if row is None:
+        return None
+    try:
+        class_end = date.fromisoformat(row[0]) + timedelta(days=1)
+    except ValueError:
+        return None
+    end = datetime.combine(class_end, datetime.min.time())
+    if signed_up_at >= end:
+        return None
+    return class_series(class_id), signed_up_at, end, delta
+
+
+def record_signup(conn, class_id, signed_up_at=None, delta=1):
+    """Count a booking (delta 1) or cancellation (delta -1) in the class's series"""
+    span = signup_span(conn, class_id, signed_up_at or datetime.now(), delta)
+    if span:
+        record(conn, [span])
+
+
+def rebuild(conn):
+    """Recompute every bucket from all of attendance and member_class (for history written before this existed);
+    days past the minute or hour retention only get the rollups they would have kept"""
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    with conn:
+        for table in ('occupancy_minutes', 'occupancy_hours', 'occupancy_days'):
+            conn.execute(f"DELETE FROM {table}")
+        times = conn.execute("SELECT checked_in_at FROM attendance ORDER BY checked_in_at") if 'attendance' in tables else []
+        spans, last_end = [], datetime.min
+        for (when,) in times:
+            start = datetime.fromisoformat(when)
+            # Only cut between chunks once every earlier visit has ended, so no visit is split across two
+            # calls (an expired day's counters are not kept between them)
+            if len(spans) >= REBUILD_CHUNK and last_end <= datetime.combine(start.date(), datetime.min.time()):
+                record(conn, spans)
+                spans = []
+            spans.append((FLOOR, start, start + timedelta(minutes=VISIT_MINUTES), 1))
+            last_end = max(last_end, spans[-1][2])
+        record(conn, spans)
+
+        spans = []
+        signups = conn.execute("SELECT class_id, signup_date FROM member_class").fetchall() if 'member_class' in tables else []
+        for class_id, signup_date in signups:
+            try:
+                signed_up_at = datetime.strptime(signup_date or '', SIGNUP_FORMAT)
+            except ValueError:
+                continue
+            span = signup_span(conn, class_id, signed_up_at, 1)
+            if span:
+                spans.append(span)
+        record(conn, spans)
+    expire(conn)
+
+
+def expire(conn, today=None):
+    """Drop per-minute and hourly buckets past their retention; daily buckets stay"""
+    today = today or date.today()
+    with conn:
+        conn.execute("DELETE FROM occupancy_minutes WHERE day < ?",
+                     ((today - timedelta(days=MINUTE_RETENTION_DAYS)).isoformat(),))
+        conn.execute("DELETE FROM occupancy_hours WHERE day < ?",
+                     ((today - timedelta(days=HOUR_RETENTION_DAYS)).isoformat(),))
+
+
+def expire_file(db_path=Gym_db.DB_PATH):
+    """Apply retention to a database file (used by the job queue)"""
+    conn = Gym_db.get_connection(db_path)
+    try:
+        initialize_occupancy_tables(conn)
+        expire(conn)
+    finally:
+        conn.close()
+
+
+def series_range(conn, series, first_day, last_day, resolution='hour'):
+    """[(timestamp, value)] for a series between two ISO days inclusive, read from pre-aggregated buckets"""
+    if resolution == 'day':
+        return conn.execute('''
+            SELECT day, peak FROM occupancy_days WHERE series = ? AND day BETWEEN ? AND ? ORDER BY day
+        ''', (series, first_day, last_day)).fetchall()
+    table, column, size, step = {
+        'minute': ('occupancy_minutes', 'counts', MINUTES_PER_DAY, 1),
+        'hour': ('occupancy_hours', 'peaks', HOURS_PER_DAY, 60),
+    }[resolution]
+    points = []
+    for day, blob in conn.execute(f'''
+        SELECT day, {column} FROM {table} WHERE series = ? AND day BETWEEN ? AND ? ORDER BY day
+    ''', (series, first_day, last_day)):
+        for slot, value in enumerate(_unpack(blob, size)):
+            points.append((f"{day}T{slot * step // 60:02d}:{slot * step % 60:02d}", value))
+    return points
+
+
+def current(conn, series=FLOOR):
+    """Value of a series at this minute"""
+    now = datetime.now()
+    row = conn.execute("SELECT counts FROM occupancy_minutes WHERE series = ? AND day = ?",
+                       (series, now.date().isoformat())).fetchone()
+    return _unpack(row[0], MINUTES_PER_DAY)[now.hour * 60 + now.minute] if row else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gym floor and class occupancy over time")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="database file")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--show', metavar='SERIES', help=f"print a series ('{FLOOR}' or '{CLASS_PREFIX}<class_id>')")
+    action.add_argument('--rebuild', action='store_true', help="recompute all buckets from attendance and signups")
+    action.add_argument('--expire', action='store_true', help="drop buckets past their retention")
+    parser.add_argument('--from', dest='first_day', default=date.today().isoformat(), help="first day, YYYY-MM-DD")
+    parser.add_argument('--to', dest='last_day', help="last day, YYYY-MM-DD (default: same as --from)")
+    parser.add_argument('--resolution', choices=RESOLUTIONS, default='hour', help="bucket size to read")
+    args = parser.parse_args()
+
+    conn = Gym_db.get_connection(args.db)
+    try:
+        initialize_occupancy_tables(conn)
+        if args.rebuild:
+            rebuild(conn)
+            print("Occupancy rebuilt")
+        elif args.expire:
+            expire(conn)
+            print("Expired buckets removed")
+        else:
+            for moment, value in series_range(conn, args.show, args.first_day, args.last_day or args.first_day,
+                                              args.resolution):
+                if value or args.resolution == 'day':
+                    print(f"{moment}  {value:4}  {'#' * min(value, 60)}")
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Occupancy error: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import argparse  # Import argparse to read command line options
+import base64  # Import base64 to store salts and hashes as text
+import binascii  # Import binascii to catch badly encoded salts and hashes
+import hashlib  # Import hashlib for PBKDF2 password hashing
+import hmac  # Import hmac for constant-time comparisons
+import os  # Import os to generate random salts
+import sqlite3  # Import sqlite3 for the benchmark database
+import tempfile  # Import tempfile to hold the benchmark database
+import time  # Import time to measure login latency
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor  # Import executors for background hashing
+import Gym_db  # Shared connection helper that enforces foreign keys
+
+# Work factor for new hashes; raise it as hardware gets faster
+ITERATIONS = 200_000
+
+ALGORITHM = 'pbkdf2_sha256'
+
+# Account tables and the ID column that can be typed instead of the username
+ACCOUNT_TABLES = {'members': 'member_id', 'staff': 'staff_id'}
+
+# Hashing runs here so the Tk event loop never waits on it
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='password')
+
+
+def hash_password(password, iterations=ITERATIONS):
+    """Return a salted PBKDF2 hash in the form algorithm$iterations$salt$hash"""
+    salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+    return '$'.join([
+        ALGORITHM,
+        str(iterations),
+        base64.b64encode(salt).decode('ascii'),
+        base64.b64encode(digest).decode('ascii'),
+    ])
+
+
+def is_hashed(stored):
+    return bool(stored) and stored.startswith(ALGORITHM + '$')
+
+
+def parse_hash(stored):
+    """(iterations, salt, digest) of a stored hash, or None if it is not a well-formed one"""
+    fields = stored.split('$')
+    if len(fields) != 4 or fields[0] != ALGORITHM or not fields[1].isdigit() or int(fields[1]) < 1:
+        return None
+    try:
+        salt = base64.b64decode(fields[2], validate=True)
+        digest = base64.b64decode(fields[3], validate=True)
+    except binascii.Error:
+        return None
+    if not salt or len(digest) != hashlib.sha256().digest_size:
+        return None
+    return int(fields[1]), salt, digest
+
+
+def verify_password(password, stored):
+    """Check a password against a stored hash (or a legacy plaintext value); a malformed hash never matches"""
+    if not stored:
+        return False
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+    parsed = parse_hash(stored)
+    if parsed is None:
+        return False
+    iterations, salt, expected = parsed
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+    return hmac.compare_digest(digest, expected)
+
+
+def needs_rehash(stored, iterations=ITERATIONS):
+    """True for plaintext values and hashes made with an older work factor"""
+    parsed = parse_hash(stored) if is_hashed(stored) else None
+    return parsed is None or parsed[0] != iterations
+
+
+def find_account(conn, table, username_or_id):
+    """Fetch an account row by username or ID using the unique indexes (no password in the query)"""
+    id_column = ACCOUNT_TABLES[table]
+    # Two index probes; a username match wins over an ID match
+    return conn.execute(f'''
+        SELECT * FROM (SELECT * FROM {table} WHERE username = ? LIMIT 1)
+        UNION ALL
+        SELECT * FROM (SELECT * FROM {table} WHERE {id_column} = ? LIMIT 1)
+        LIMIT 1
+    ''', (username_or_id, username_or_id)).fetchone()
+
+
+def authenticate(table, username_or_id, password, path=Gym_db.DB_PATH):
+    """Look up and verify an account; returns the row as a dict or None"""
+    conn = Gym_db.get_connection(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        account = find_account(conn, table, username_or_id)
+        if account is None or not verify_password(password, account['password']):
+            return None
+        # Upgrade plaintext or outdated hashes while the password is at hand
+        if needs_rehash(account['password']):
+            conn.execute(
+                f"UPDATE {table} SET password = ? WHERE username = ?",
+                (hash_password(password), account['username'])
+            )
+            conn.commit()
+        return dict(account)
+    finally:
+        conn.close()
+
+
+def run_in_background(widget, func, args, on_done, on_error=None, poll_ms=20):
+    """Run func(*args) on the worker pool and hand the result to on_done on the Tk thread"""
+    future = _executor.submit(func, *args)
+
+    def check():
+        if not future.done():
+            widget.after(poll_ms, check)
+        elif future.exception() is not None:
+            if on_error:
+                on_error(future.exception())
+        else:
+            on_done(future.result())
+
+    widget.after(poll_ms, check)
+    return future
+
+
+def authenticate_async(widget, table, username_or_id, password, on_done, on_error=None):
+    """Verify a login on the worker pool; on_done receives the account dict or None"""
+    return run_in_background(widget, authenticate, (table, username_or_id, password), on_done, on_error)
+
+
+def _hash_batch(passwords, iterations):
+    return [hash_password(password, iterations) for password in passwords]
+
+
+def hash_many(passwords, pool=None, iterations=ITERATIONS):
+    """Hash a list of passwords across a process pool, keeping their order"""
+    if len(passwords) < 2:
+        return _hash_batch(passwords, iterations)
+    if pool is None:
+        with ProcessPoolExecutor() as own_pool:
+            return hash_many(passwords, own_pool, iterations)
+    # Split the list across processes; each hash is CPU-bound
+    chunk = max(1, len(passwords) // ((os.cpu_count() or 1) * 4))
+    parts = [passwords[i:i + chunk] for i in range(0, len(passwords), chunk)]
+    return [hashed for part in pool.map(_hash_batch, parts, [iterations] * len(parts)) for hashed in part]
+
+
+def rehash_plaintext_passwords(conn, table, batch_size=500, iterations=ITERATIONS):
+    """Replace plaintext passwords with hashes, one committed batch at a time; returns rows updated"""
+    updated = 0
+    last_rowid = 0
+    with ProcessPoolExecutor() as pool:
+        while True:
+            rows = conn.execute(f'''
+                SELECT rowid, password FROM {table}
+                WHERE rowid > ? AND password IS NOT NULL AND password NOT LIKE '{ALGORITHM}$%'
+                ORDER BY rowid LIMIT ?
+            ''', (last_rowid, batch_size)).fetchall()
+            if not rows:
+                break
+            hashes = hash_many([password for _, password in rows], pool, iterations)
+            # Each batch commits on its own, so an interrupted migration resumes where it stopped
+            with conn:
+                conn.executemany(
+                    f"UPDATE {table} SET password = ? WHERE rowid = ?",
+                    [(hashed, rowid) for (rowid, _), hashed in zip(rows, hashes)]
+                )
+            updated += len(rows)
+            last_rowid = rows[-1][0]
+            print(f"{table}: {updated} passwords hashed")
+    return updated
+
+
+def benchmark(accounts=100_000, logins=200):
+    """Compare the old OR-and-password scan with the indexed fetch plus hash check"""
+    with tempfile.TemporaryDirectory() as folder:
+        conn = sqlite3.connect(os.path.join(folder, 'bench.db'))
+        conn.execute('''
+            CREATE TABLE members (
+                username TEXT PRIMARY KEY, email TEXT, password TEXT, member_id TEXT,
+                role TEXT, membership_plan TEXT, price REAL
+            )
+        ''')
+        # One real hash shared by every row keeps setup fast; verification cost is unchanged
+        shared_hash = hash_password('secret')
+        with conn:
+            conn.executemany(
+                "INSERT INTO members VALUES (?, ?, ?, ?, 'member', 'Basic', 10.0)",
+                ((f"user{i}", f"user{i}@example.com", shared_hash, f"M{i:06d}") for i in range(accounts))
+            )
+        targets = [f"M{(i * 7919) % accounts:06d}" for i in range(logins)]
+
+        start = time.perf_counter()
+        for target in targets:
+            conn.execute(
+                "SELECT * FROM members WHERE (username = ? OR member_id = ?) AND password = ?",
+                (target, target, shared_hash)
+            ).fetchone()
+        old_ms = (time.perf_counter() - start) * 1000 / logins
+
+        conn.execute("CREATE UNIQUE INDEX idx_members_member_id ON members(member_id)")
+        start = time.perf_counter()
+        for target in targets:
+            find_account(conn, 'members', target)
+        lookup_ms = (time.perf_counter() - start) * 1000 / logins
+
+        start = time.perf_counter()
+        for _ in range(5):
+            verify_password('secret', shared_hash)
+        verify_ms = (time.perf_counter() - start) * 1000 / 5
+        conn.close()
+
+    print(f"{accounts} accounts, {logins} logins by member ID")
+    print(f"  old unindexed OR lookup:   {old_ms:8.2f} ms per login")
+    print(f"  indexed lookup:            {lookup_ms:8.3f} ms per login")
+    print(f"  PBKDF2 check ({ITERATIONS} it): {verify_ms:6.1f} ms per login (worker thread)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Password hashing utilities")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="database file to migrate")
+    parser.add_argument('--migrate', action='store_true', help="hash every plaintext password in batches")
+    parser.add_argument('--batch-size', type=int, default=500, help="rows hashed per transaction")
+    parser.add_argument('--benchmark', action='store_true', help="measure login latency at 100k accounts")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+    if args.migrate:
+        conn = Gym_db.get_connection(args.db)
+        try:
+            for table in ACCOUNT_TABLES:
+                rehash_plaintext_passwords(conn, table, args.batch_size)
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
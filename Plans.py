@@ -0,0 +1,157 @@
+import argparse  # Import argparse to read command line options
+import sqlite3  # Import sqlite3 to catch database errors
+from datetime import date  # Import date to pick the price in effect today
+import Gym_db  # Shared connection helper that enforces foreign keys
+
+# The plan catalogue the gym opened with: (name, monthly price in pence)
+DEFAULT_PLANS = [
+    ('Basic', 1000),
+    ('Silver', 1500),
+    ('Gold', 2000),
+    ('Inclusive', 2500),
+    ('Student', 3000),
+    ('VIP Elite', 3500),
+    ('Premium', 4000),
+    ('Personal Training', 5500),
+    ('Platinum', 6000),
+    ('Diamond', 6500),
+    ('Family', 7000),
+]
+DEFAULT_EFFECTIVE_FROM = '2025-01-01'
+
+# Process-wide cache: effective date -> (catalogue version, [(plan, price_pence)])
+_cache = {}
+
+# Price of every plan on a given day: the latest price that had started by then
+CURRENT_PRICES = '''
+    SELECT p.name, pp.price_pence
+    FROM plans p
+    JOIN plan_prices pp ON pp.plan = p.name
+    WHERE pp.effective_from = (
+        SELECT max(effective_from) FROM plan_prices WHERE plan = p.name AND effective_from <= :on
+    )
+'''
+
+
+def initialize_plans(conn):
+    """Create the plan catalogue and seed it with the original plans"""
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS plans (
+            name TEXT PRIMARY KEY,
+            display_order INTEGER NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS plan_prices (
+            plan TEXT NOT NULL,
+            effective_from TEXT NOT NULL,
+            price_pence INTEGER NOT NULL CHECK (price_pence >= 0),
+            PRIMARY KEY (plan, effective_from),
+            FOREIGN KEY (plan) REFERENCES plans(name) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+
+        -- Bumped on every catalogue change so each process knows when its cache is stale
+        CREATE TABLE IF NOT EXISTS plans_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO plans_version VALUES (1, 0);
+
+        CREATE TRIGGER IF NOT EXISTS plans_changed_ai AFTER INSERT ON plan_prices BEGIN
+            UPDATE plans_version SET version = version + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS plans_changed_au AFTER UPDATE ON plan_prices BEGIN
+            UPDATE plans_version SET version = version + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS plans_changed_ad AFTER DELETE ON plan_prices BEGIN
+            UPDATE plans_version SET version = version + 1;
+        END;
+    ''')
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO plans (name, display_order) VALUES (?, ?)",
+            ((name, order) for order, (name, _) in enumerate(DEFAULT_PLANS))
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO plan_prices (plan, effective_from, price_pence) VALUES (?, ?, ?)",
+            ((name, DEFAULT_EFFECTIVE_FROM, price) for name, price in DEFAULT_PLANS)
+        )
+
+
+def current_prices(conn, on=None):
+    """[(plan, price_pence)] in display order, as of a date (default today); cached per process"""
+    on = on or date.today().isoformat()
+    version = conn.execute("SELECT version FROM plans_version").fetchone()[0]
+    cached = _cache.get(on)
+    if cached is None or cached[0] != version:
+        rows = conn.execute(CURRENT_PRICES + " ORDER BY p.display_order", {'on': on}).fetchall()
+        cached = _cache[on] = (version, rows)
+    return cached[1]
+
+
+def price_of(conn, plan, on=None):
+    """Monthly price of one plan in pence, or None if it has no price yet"""
+    return dict(current_prices(conn, on)).get(plan)
+
+
+def format_price(price_pence):
+    """'£10/month' for whole pounds, '£10.50/month' otherwise"""
+    pounds = f"{price_pence / 100:.2f}".removesuffix('.00')
+    return f"£{pounds}/month"
+
+
+def reprice_members(conn, on=None):
+    """Bring members.price in line with the catalogue in one set-based UPDATE; returns rows changed"""
+    with conn:
+        cursor = conn.execute(f'''
+            UPDATE members SET price = current.price_pence / 100.0
+            FROM ({CURRENT_PRICES}) AS current
+            WHERE members.membership_plan = current.name
+              AND members.price IS NOT current.price_pence / 100.0
+        ''', {'on': on or date.today().isoformat()})
+    return cursor.rowcount
+
+
+def set_price(conn, plan, price_pence, effective_from=None):
+    """Schedule a plan's price from a date (default today); members are repriced once it is in effect"""
+    effective_from = effective_from or date.today().isoformat()
+    date.fromisoformat(effective_from)  # rejects anything that is not YYYY-MM-DD
+    with conn:
+        conn.execute('''
+            INSERT INTO plans (name, display_order)
+            VALUES (?, (SELECT coalesce(max(display_order), -1) + 1 FROM plans))
+            ON CONFLICT (name) DO NOTHING
+        ''', (plan,))
+        conn.execute('''
+            INSERT INTO plan_prices (plan, effective_from, price_pence) VALUES (?, ?, ?)
+            ON CONFLICT (plan, effective_from) DO UPDATE SET price_pence = excluded.price_pence
+        ''', (plan, effective_from, price_pence))
+    if effective_from <= date.today().isoformat():
+        return reprice_members(conn)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Membership plan catalogue")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="database file")
+    parser.add_argument('--set', nargs=2, metavar=('PLAN', 'PRICE'), help="set a plan's monthly price in pounds")
+    parser.add_argument('--from', dest='effective_from', help="date the new price starts, YYYY-MM-DD (default today)")
+    parser.add_argument('--on', help="show prices as of this date")
+    args = parser.parse_args()
+
+    conn = Gym_db.get_connection(args.db)
+    try:
+        initialize_plans(conn)
+        if args.set:
+            plan, price = args.set
+            changed = set_price(conn, plan, round(float(price) * 100), args.effective_from)
+            print(f"{plan} set to £{float(price):.2f} from {args.effective_from or 'today'}; {changed} members repriced")
+        for plan, price_pence in current_prices(conn, args.on):
+            print(f"{plan:20} {format_price(price_pence)}")
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Plan error: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import argparse  # Import argparse to read command line options
+import csv  # Import csv to write the batch manifest
+import hashlib  # Import hashlib to address cached receipts by content
+import html  # Import html to escape text in HTML receipts
+import json  # Import json to fingerprint receipt data
+import os  # Import os for cache paths and atomic renames
+import sqlite3  # Import sqlite3 to catch database errors
+import time  # Import time to report batch throughput
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait  # Import a process pool for batches
+import Gym_db  # Shared connection helper that enforces foreign keys
+import Billing  # Invoice and payment ledger
+
+# Receipts are written to this folder beside the database they come from, so branches never mix
+RECEIPT_FOLDER = 'receipts'
+CACHE_FOLDER = 'cache'
+
+FORMATS = ('pdf', 'html')
+
+# Bump when the layout changes so old cached files are not reused
+TEMPLATE_VERSION = 1
+
+# Receipts handed to a worker process at a time
+CHUNK_SIZE = 250
+
+GYM_NAME = 'FLEXI GYM'
+
+
+def receipt_dir(conn):
+    """receipts/ beside the database conn has open (branches/<name>/receipts for a branch)"""
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    return os.path.join(os.path.dirname(path), RECEIPT_FOLDER)
+
+
+def receipt_query(where):
+    return f'''
+        SELECT i.invoice_id, i.member_id, m.username, m.email, i.period, i.plan,
+               i.amount_pence, i.status, i.issued_at, i.due_date,
+               coalesce((SELECT SUM(p.amount_pence) FROM payments p WHERE p.invoice_id = i.invoice_id), 0)
+        FROM invoices i
+        LEFT JOIN members m ON m.member_id = i.member_id
+        WHERE {where}
+    '''
+
+
+def receipt_data(row):
+    """Turn an invoice row into the plain dict a receipt is rendered from"""
+    keys = ('invoice_id', 'member_id', 'username', 'email', 'period', 'plan',
+            'amount_pence', 'status', 'issued_at', 'due_date', 'paid_pence')
+    return dict(zip(keys, row))
+
+
+def receipt_lines(data):
+    """The text of a receipt, shared by the PDF and HTML layouts"""
+    return [
+        f"Invoice #{data['invoice_id']}",
+        f"Member: {data['username'] or ''} ({data['member_id']})",
+        f"Email: {data['email'] or ''}",
+        f"Billing period: {data['period']}",
+        f"Plan: {data['plan'] or ''}",
+        f"Amount: £{data['amount_pence'] / 100:.2f}",
+        f"Paid: £{data['paid_pence'] / 100:.2f}",
+        f"Status: {data['status'].title()}",
+        f"Issued: {data['issued_at'][:10]}    Due: {data['due_date']}",
+    ]
+
+
+def render_html(data):
+    rows = ''.join(f"<p>{html.escape(line)}</p>\n" for line in receipt_lines(data))
+    return (
+        "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+        f"<title>Receipt {data['invoice_id']}</title></head>\n"
+        f"<body style=\"font-family: sans-serif\">\n<h1>{GYM_NAME} - Receipt</h1>\n{rows}</body></html>\n"
+    ).encode('utf-8')
+
+
+def _pdf_text(text):
+    """Encode a line for a PDF string in WinAnsi (which has the £ sign), escaping delimiters"""
+    encoded = text.encode('cp1252', errors='replace')
+    return encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def render_pdf(data):
+    """A one-page PDF using the built-in Helvetica font; no external libraries"""
+    lines = [(18, f"{GYM_NAME} - Receipt")] + [(12, line) for line in receipt_lines(data)]
+    content = b"BT\n/F1 18 Tf\n72 770 Td\n"
+    for number, (size, line) in enumerate(lines):
+        if number:
+            content += b"0 -%d Td\n" % (size * 2)
+        content += b"/F1 %d Tf\n(" % size + _pdf_text(line) + b") Tj\n"
+    content += b"ET\n"
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Length %d >>\nstream\n" % len(content) + content + b"endstream",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+
+def cache_key(data, fmt):
+    """Fingerprint of everything that appears on the receipt, so a changed invoice gets a new file"""
+    payload = json.dumps([TEMPLATE_VERSION, fmt, data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def cached_receipt(data, fmt, cache_dir):
+    """Path of the rendered receipt, rendering it only if this exact content is not cached yet"""
+    key = cache_key(data, fmt)
+    path = os.path.join(cache_dir, key[:2], f"{key}.{fmt}")
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        body = render_pdf(data) if fmt == 'pdf' else render_html(data)
+        partial = f"{path}.{os.getpid()}.partial"
+        with open(partial, 'wb') as handle:
+            handle.write(body)
+        os.replace(partial, path)
+    return key, path
+
+
+def _render_chunk(rows, fmt, cache_dir):
+    """Worker: render a chunk of invoice rows; returns manifest entries"""
+    entries = []
+    for row in rows:
+        data = receipt_data(row)
+        key, path = cached_receipt(data, fmt, cache_dir)
+        entries.append((data['invoice_id'], data['member_id'], data['period'], key, path))
+    return entries
+
+
+def receipt_for(conn, invoice_id, fmt='pdf', cache_dir=None):
+    """Path of one invoice's receipt (served from the cache when unchanged)"""
+    cache_dir = cache_dir or os.path.join(receipt_dir(conn), CACHE_FOLDER)
+    row = conn.execute(receipt_query("i.invoice_id = ?"), (invoice_id,)).fetchone()
+    if row is None:
+        raise ValueError(f"No invoice {invoice_id}")
+    return cached_receipt(receipt_data(row), fmt, cache_dir)[1]
+
+
+def render_period(conn, period, fmt='pdf', workers=None, cache_dir=None, manifest_path=None):
+    """Render every receipt for a billing period across processes; returns (count, manifest path)"""
+    cache_dir = cache_dir or os.path.join(receipt_dir(conn), CACHE_FOLDER)
+    manifest_path = manifest_path or os.path.join(receipt_dir(conn), f"manifest-{period}-{fmt}.csv")
+    os.makedirs(os.path.dirname(manifest_path) or '.', exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    cursor = conn.execute(receipt_query("i.period = ?") + " ORDER BY i.invoice_id", (period,))
+    count = 0
+    start = time.perf_counter()
+
+    with open(manifest_path, 'w', newline='', encoding='utf-8') as handle, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        manifest = csv.writer(handle)
+        manifest.writerow(['invoice_id', 'member_id', 'period', 'sha256', 'file'])
+        pending = set()
+        while True:
+            rows = cursor.fetchmany(CHUNK_SIZE)
+            if rows:
+                pending.add(pool.submit(_render_chunk, rows, fmt, cache_dir))
+            # Keep only a couple of chunks per worker in flight so memory stays flat
+            if pending and (len(pending) >= workers * 2 or not rows):
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    entries = future.result()
+                    manifest.writerows(entries)
+                    count += len(entries)
+            if not rows and not pending:
+                break
+
+    elapsed = time.perf_counter() - start
+    print(f"{count} receipts for {period} in {elapsed:.2f}s")
+    return count, manifest_path
+
+
+def render_period_file(period, fmt='pdf', db_path=Gym_db.DB_PATH):
+    """Render a period's receipts from a database file (used by the job queue)"""
+    conn = Gym_db.get_connection(db_path)
+    try:
+        return render_period(conn, period, fmt)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render invoice receipts as PDF or HTML")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="database file to read invoices from")
+    parser.add_argument('--format', choices=FORMATS, default='pdf', help="receipt format")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--period', help="render every receipt for a period (YYYY-MM)")
+    action.add_argument('--invoice', type=int, help="render one invoice's receipt")
+    parser.add_argument('--workers', type=int, help="worker processes for --period")
+    args = parser.parse_args()
+
+    conn = Gym_db.get_connection(args.db)
+    try:
+        Billing.initialize_billing_tables(conn)
+        if args.invoice:
+            print(receipt_for(conn, args.invoice, args.format))
+        else:
+            count, manifest_path = render_period(conn, args.period, args.format, args.workers)
+            print(f"Manifest written to {manifest_path}")
+    except (ValueError, OSError, sqlite3.Error) as e:
+        print(f"Receipt error: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import sqlite3  # Import sqlite3 to catch constraint violations
+import Gym_db  # Shared connection helper that enforces foreign keys
+import Passwords  # Salted password hashing
+
+# Columns each account table accepts at registration
+ACCOUNT_COLUMNS = {
+    'members': ('username', 'email', 'password', 'member_id'),
+    'staff': ('username', 'email', 'password', 'staff_id', 'role'),
+}
+
+
+def conflicting_field(error):
+    """Name of the column behind a UNIQUE constraint error, or None for other errors"""
+    message = str(error)
+    if not message.startswith("UNIQUE constraint failed:"):
+        return None
+    # e.g. "UNIQUE constraint failed: members.email"
+    return message.split(":", 1)[1].split(",")[0].strip().split(".")[-1]
+
+
+def insert_account(conn, table, account):
+    """Insert one account (password already hashed); returns the clashing field or None"""
+    columns = ACCOUNT_COLUMNS[table]
+    try:
+        conn.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+            [account[column] for column in columns]
+        )
+    except sqlite3.IntegrityError as e:
+        field = conflicting_field(e)
+        if field is None:
+            raise
+        return field
+    return None
+
+
+def register_account(table, account, path=Gym_db.DB_PATH):
+    """Hash the password and insert the account in one attempt; returns the clashing field or None"""
+    account = dict(account, password=Passwords.hash_password(account['password']))
+    conn = Gym_db.get_connection(path)
+    try:
+        with conn:
+            return insert_account(conn, table, account)
+    finally:
+        conn.close()
+
+
+def register_batch(conn, table, accounts):
+    """Register many accounts in one transaction; returns [(position, field)] for rows that clashed"""
+    accounts = list(accounts)
+    # Hash up front across processes so the transaction itself stays short
+    hashes = Passwords.hash_many([account['password'] for account in accounts])
+
+    conflicts = []
+    # A failed INSERT only undoes itself, so the rest of the batch still commits together
+    with conn:
+        for position, (account, hashed) in enumerate(zip(accounts, hashes)):
+            field = insert_account(conn, table, dict(account, password=hashed))
+            if field is not None:
+                conflicts.append((position, field))
+    return conflicts
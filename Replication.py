@@ -0,0 +1,511 @@
+import argparse  # Import argparse to read command line options
+import gzip  # Import gzip to compress changeset files
+import hashlib  # Import hashlib for the HMAC digest
+import hmac  # Import hmac to prove both ends of a sync hold the shared secret
+import json  # Import json to encode changesets
+import os  # Import os to list the drop folder and read the shared secret
+import secrets  # Import secrets for unguessable challenges
+import socket  # Import socket to sync with another desk over the network
+import socketserver  # Import socketserver to accept syncs from other desks
+import sqlite3  # Import sqlite3 to catch constraint violations
+import Gym_db  # Shared connection helper that enforces foreign keys
+import Sessions  # Desk name used as this machine's replication ID
+from Registration import conflicting_field  # Reads the column out of a UNIQUE constraint error
+
+DEFAULT_PORT = 8765
+
+# Only this machine can sync unless the desk is told to listen on another address (--bind)
+DEFAULT_BIND = '127.0.0.1'
+
+# Every desk is configured with the same secret; a peer or a dropped file that cannot prove it
+# holds the secret is refused before any of its changes are read
+SECRET_VARIABLE = 'FLEXIGYM_SYNC_SECRET'
+
+# Replicated tables and their keys. assignments and trainer_hours are left out: their
+# AUTOINCREMENT IDs are handed out per desk and would collide between machines.
+REPLICATED_TABLES = {
+    'members': ('username',),
+    'staff': ('username',),
+    'classes': ('class_id',),
+    'trainers': ('staff_id',),
+    'member_class': ('member_id', 'class_id'),
+}
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _json_array(ref, columns):
+    return f"json_array({', '.join(f'{ref}.{column}' for column in columns)})"
+
+
+def _log_statements(table, op, pk, row, condition='1'):
+    """Trigger body that stamps a change with the next clock value and records it"""
+    return f'''
+        UPDATE replication_state SET clock = clock + 1 WHERE {condition};
+        INSERT INTO changelog (origin, clock, tbl, pk, op, row)
+            SELECT device, clock, '{table}', {pk}, '{op}', {row} FROM replication_state WHERE {condition};
+        INSERT INTO row_versions (tbl, pk, clock, origin)
+            SELECT '{table}', {pk}, clock, device FROM replication_state WHERE {condition}
+            ON CONFLICT (tbl, pk) DO UPDATE SET clock = excluded.clock, origin = excluded.origin;
+    '''
+
+
+def initialize_replication(conn):
+    """Create the changelog and the triggers that record every write; safe to run repeatedly"""
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS replication_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            device TEXT NOT NULL,
+            clock INTEGER NOT NULL,
+            applying INTEGER NOT NULL DEFAULT 0
+        );
+
+        -- Every change made here or received from another desk, keyed by where it was made
+        CREATE TABLE IF NOT EXISTS changelog (
+            origin TEXT NOT NULL,
+            clock INTEGER NOT NULL,
+            tbl TEXT NOT NULL,
+            pk TEXT NOT NULL,
+            op TEXT NOT NULL,
+            row TEXT,
+            PRIMARY KEY (origin, clock)
+        ) WITHOUT ROWID;
+
+        -- The change that last won for each row; decides which of two conflicting writes stands
+        CREATE TABLE IF NOT EXISTS row_versions (
+            tbl TEXT NOT NULL,
+            pk TEXT NOT NULL,
+            clock INTEGER NOT NULL,
+            origin TEXT NOT NULL,
+            PRIMARY KEY (tbl, pk)
+        ) WITHOUT ROWID;
+
+        -- Highest clock seen from each desk; tells a peer exactly which changes we lack
+        CREATE TABLE IF NOT EXISTS replication_vector (
+            origin TEXT PRIMARY KEY,
+            clock INTEGER NOT NULL
+        );
+
+        -- Bookkeeping for the file drop: what was exported and which files were imported
+        CREATE TABLE IF NOT EXISTS replication_marks (
+            name TEXT PRIMARY KEY,
+            value TEXT
+        );
+
+        CREATE TRIGGER IF NOT EXISTS changelog_vector AFTER INSERT ON changelog BEGIN
+            INSERT INTO replication_vector (origin, clock) VALUES (new.origin, new.clock)
+            ON CONFLICT (origin) DO UPDATE SET clock = max(clock, excluded.clock);
+        END;
+    ''')
+
+    # A database copied from another desk keeps its clock but takes this desk's name
+    device = Sessions.current_device()
+    with conn:
+        conn.execute('''
+            INSERT INTO replication_state (id, device, clock) VALUES (1, ?, 0)
+            ON CONFLICT (id) DO UPDATE SET device = excluded.device, applying = 0
+        ''', (device,))
+
+    for table, keys in REPLICATED_TABLES.items():
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                        (f"{table}_replicate_ai",)).fetchone():
+            continue
+        columns = _columns(conn, table)
+        pairs = [f"'{column}', new.{column}" for column in columns]
+        new_row = f"json_object({', '.join(pairs)})"
+        new_pk, old_pk = _json_array('new', keys), _json_array('old', keys)
+        recording = "WHEN (SELECT applying FROM replication_state) = 0"
+        conn.executescript(f'''
+            CREATE TRIGGER {table}_replicate_ai AFTER INSERT ON {table} {recording} BEGIN
+                {_log_statements(table, 'upsert', new_pk, new_row)}
+            END;
+
+            CREATE TRIGGER {table}_replicate_au AFTER UPDATE ON {table} {recording} BEGIN
+                {_log_statements(table, 'delete', old_pk, 'NULL', f'{old_pk} IS NOT {new_pk}')}
+                {_log_statements(table, 'upsert', new_pk, new_row)}
+            END;
+
+            CREATE TRIGGER {table}_replicate_ad AFTER DELETE ON {table} {recording} BEGIN
+                {_log_statements(table, 'delete', old_pk, 'NULL')}
+            END;
+        ''')
+
+
+def current_vector(conn):
+    """{desk: highest clock seen from that desk}"""
+    return dict(conn.execute("SELECT origin, clock FROM replication_vector"))
+
+
+def changes_since(conn, vector):
+    """Yield every change the holder of vector has not seen, oldest first per desk"""
+    for origin, clock in conn.execute("SELECT origin, clock FROM replication_vector"):
+        if clock > vector.get(origin, 0):
+            # A range scan on the changelog's (origin, clock) key: cost follows the changes, not the data
+            yield from conn.execute(
+                "SELECT origin, clock, tbl, pk, op, row FROM changelog WHERE origin = ? AND clock > ? ORDER BY clock",
+                (origin, vector.get(origin, 0))
+            )
+
+
+def _pk_text(values):
+    """Key values encoded exactly as SQLite's json_array() writes them in the triggers"""
+    return json.dumps(list(values), separators=(',', ':'), ensure_ascii=False)
+
+
+def _row_version(conn, table, pk):
+    row = conn.execute("SELECT clock, origin FROM row_versions WHERE tbl = ? AND pk = ?", (table, pk)).fetchone()
+    # Rows written before replication was switched on count as the oldest of all
+    return tuple(row) if row else (0, '')
+
+
+def _write_row(conn, table, row):
+    keys = REPLICATED_TABLES[table]
+    local = set(_columns(conn, table))
+    # Desks may run the Create_db or the Sprint_1 schema; only shared columns are copied
+    columns = [column for column in row if column in local]
+    updates = [f"{column} = excluded.{column}" for column in columns if column not in keys]
+    conn.execute(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+        f"ON CONFLICT ({', '.join(keys)}) DO " + (f"UPDATE SET {', '.join(updates)}" if updates else "NOTHING"),
+        [row[column] for column in columns]
+    )
+
+
+def _write_row_resolving_duplicates(conn, table, row, version):
+    """Write a row; if it clashes on a unique column (e.g. email), the older of the two rows wins"""
+    try:
+        _write_row(conn, table, row)
+        return True
+    except sqlite3.IntegrityError as e:
+        field = conflicting_field(e)
+        if field is None or field not in row:
+            raise
+        keys = REPLICATED_TABLES[table]
+        existing = conn.execute(
+            f"SELECT {', '.join(keys)} FROM {table} WHERE {field} = ?", (row[field],)
+        ).fetchone()
+        if existing is None or _row_version(conn, table, _pk_text(existing)) <= version:
+            return False
+        conn.execute(f"DELETE FROM {table} WHERE {' AND '.join(f'{key} = ?' for key in keys)}", existing)
+        _write_row(conn, table, row)
+        return True
+
+
+def _enforce_capacity(conn, class_ids):
+    """Cancel the latest signups of any class booked past capacity (same outcome on every desk)"""
+    cancelled = 0
+    for class_id, capacity in conn.execute(f'''
+        SELECT c.class_id, c.capacity FROM classes c
+        WHERE c.class_id IN ({', '.join('?' for _ in class_ids)})
+          AND c.capacity < (SELECT COUNT(*) FROM member_class mc WHERE mc.class_id = c.class_id)
+    ''', list(class_ids)).fetchall():
+        # The earliest bookings by (clock, desk) keep their places
+        signups = conn.execute('''
+            SELECT mc.member_id FROM member_class mc
+            LEFT JOIN row_versions v ON v.tbl = 'member_class' AND v.pk = json_array(mc.member_id, mc.class_id)
+            WHERE mc.class_id = ?
+            ORDER BY coalesce(v.clock, 0), coalesce(v.origin, ''), mc.member_id
+        ''', (class_id,)).fetchall()
+        for (member_id,) in signups[capacity:]:
+            # Recorded as a normal change so every desk hears about the cancellation
+            conn.execute("DELETE FROM member_class WHERE member_id = ? AND class_id = ?", (member_id, class_id))
+            cancelled += 1
+    return cancelled
+
+
+def _acceptable(table, pk, op, row):
+    """Only the replicated tables are an allow-list for incoming changes, each shaped as the triggers write it"""
+    if table not in REPLICATED_TABLES or op not in ('upsert', 'delete'):
+        return False
+    keys = REPLICATED_TABLES[table]
+    try:
+        key_values = json.loads(pk)
+        values = json.loads(row) if op == 'upsert' else None
+    except (TypeError, ValueError):
+        return False
+    if not isinstance(key_values, list) or len(key_values) != len(keys):
+        return False
+    return op == 'delete' or (isinstance(values, dict) and all(key in values for key in keys))
+
+
+def apply_changes(conn, changes):
+    """Apply changes received from another desk; returns (applied, skipped)"""
+    vector = current_vector(conn)
+    applied = skipped = rejected = 0
+    booked_classes = set()
+    with conn:
+        conn.execute("UPDATE replication_state SET applying = 1")
+        try:
+            for origin, clock, table, pk, op, row in changes:
+                if clock <= vector.get(origin, 0):
+                    continue
+                if not _acceptable(table, pk, op, row):
+                    rejected += 1
+                    continue
+                vector[origin] = clock
+                # Lamport clock: later local writes must order after everything seen so far
+                conn.execute("UPDATE replication_state SET clock = max(clock, ?)", (clock,))
+                conn.execute(
+                    "INSERT INTO changelog (origin, clock, tbl, pk, op, row) VALUES (?, ?, ?, ?, ?, ?)",
+                    (origin, clock, table, pk, op, row)
+                )
+                # Last writer wins, ordered by (clock, desk) so every desk picks the same winner
+                if (clock, origin) <= _row_version(conn, table, pk):
+                    skipped += 1
+                    continue
+
+                conn.execute("SAVEPOINT replicate_change")
+                try:
+                    if op == 'delete':
+                        keys = REPLICATED_TABLES[table]
+                        conn.execute(f"DELETE FROM {table} WHERE {' AND '.join(f'{key} = ?' for key in keys)}",
+                                     json.loads(pk))
+                        written = True
+                    else:
+                        values = json.loads(row)
+                        written = _write_row_resolving_duplicates(conn, table, values, (clock, origin))
+                        if written and table == 'member_class':
+                            booked_classes.add(values['class_id'])
+                except sqlite3.IntegrityError:
+                    # e.g. a signup for a member this desk has since deleted
+                    written = False
+                if written:
+                    conn.execute('''
+                        INSERT INTO row_versions (tbl, pk, clock, origin) VALUES (?, ?, ?, ?)
+                        ON CONFLICT (tbl, pk) DO UPDATE SET clock = excluded.clock, origin = excluded.origin
+                    ''', (table, pk, clock, origin))
+                    conn.execute("RELEASE replicate_change")
+                    applied += 1
+                else:
+                    conn.execute("ROLLBACK TO replicate_change")
+                    conn.execute("RELEASE replicate_change")
+                    skipped += 1
+        finally:
+            conn.execute("UPDATE replication_state SET applying = 0")
+        if booked_classes:
+            _enforce_capacity(conn, booked_classes)
+    if rejected:
+        print(f"Replication: refused {rejected} changes for tables or in shapes this desk does not accept")
+    return applied, skipped + rejected
+
+
+def sync_secret():
+    """The shared sync secret (set FLEXIGYM_SYNC_SECRET on every desk)"""
+    secret = os.environ.get(SECRET_VARIABLE)
+    if not secret:
+        raise PermissionError(f"Set {SECRET_VARIABLE} to the desks' shared sync secret first")
+    return secret.encode('utf-8')
+
+
+def _proof(secret, role, challenge):
+    return hmac.new(secret, f"{role}:{challenge}".encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+# --- Network sync: newline-delimited JSON over TCP ---
+
+def _send(stream, message):
+    stream.write((json.dumps(message) + '\n').encode('utf-8'))
+
+
+def _send_changes(stream, changes):
+    for change in changes:
+        _send(stream, list(change))
+    _send(stream, {'end': True})
+    stream.flush()
+
+
+def _read_changes(stream):
+    while True:
+        message = json.loads(stream.readline())
+        if isinstance(message, dict):
+            return
+        yield message
+
+
+def _exchange(conn, stream, first):
+    """One sync session; both desks end up with each other's changes"""
+    mine = current_vector(conn)
+    if first:
+        _send(stream, {'vector': mine})
+        stream.flush()
+        theirs = json.loads(stream.readline())['vector']
+    else:
+        theirs = json.loads(stream.readline())['vector']
+        _send(stream, {'vector': mine})
+    # Work out what to send before applying theirs, so their own changes are not echoed back
+    outgoing = list(changes_since(conn, theirs))
+    if first:
+        received = apply_changes(conn, list(_read_changes(stream)))
+        _send_changes(stream, outgoing)
+    else:
+        _send_changes(stream, outgoing)
+        received = apply_changes(conn, list(_read_changes(stream)))
+    return len(outgoing), received
+
+
+def _authenticate(stream, secret, first):
+    """Challenge/response in both directions; raises PermissionError unless the peer holds the secret"""
+    mine = secrets.token_hex(16)
+    if first:
+        theirs = json.loads(stream.readline())['challenge']
+        _send(stream, {'challenge': mine, 'proof': _proof(secret, 'client', theirs)})
+        stream.flush()
+        if not hmac.compare_digest(str(json.loads(stream.readline()).get('proof')), _proof(secret, 'server', mine)):
+            raise PermissionError("The other desk did not prove it holds the sync secret")
+    else:
+        _send(stream, {'challenge': mine})
+        stream.flush()
+        reply = json.loads(stream.readline())
+        if not hmac.compare_digest(str(reply.get('proof')), _proof(secret, 'client', mine)):
+            _send(stream, {'error': 'not authorised'})
+            stream.flush()
+            raise PermissionError("The other desk did not prove it holds the sync secret")
+        _send(stream, {'proof': _proof(secret, 'server', reply['challenge'])})
+        stream.flush()
+
+
+def sync_with(conn, host, port=DEFAULT_PORT):
+    """Sync with a desk running serve(); returns (changes sent, (applied, skipped))"""
+    secret = sync_secret()
+    with socket.create_connection((host, port), timeout=30) as sock, sock.makefile('rwb') as stream:
+        _authenticate(stream, secret, first=True)
+        return _exchange(conn, stream, first=True)
+
+
+class _Duplex:
+    """Read and write halves of a socketserver request as one stream"""
+
+    def __init__(self, handler):
+        self.readline = handler.rfile.readline
+        self.write = handler.wfile.write
+        self.flush = handler.wfile.flush
+
+
+def serve(db_path=Gym_db.DB_PATH, port=DEFAULT_PORT, bind=DEFAULT_BIND):
+    """Accept syncs from other desks until interrupted"""
+    secret = sync_secret()
+
+    class SyncHandler(socketserver.StreamRequestHandler):
+        timeout = 30
+
+        def handle(self):
+            stream = _Duplex(self)
+            try:
+                _authenticate(stream, secret, first=False)
+            except (PermissionError, ValueError, KeyError, TypeError, OSError) as e:
+                print(f"Refused sync from {self.client_address[0]}: {e}")
+                return
+            conn = Gym_db.get_connection(db_path)
+            try:
+                initialize_replication(conn)
+                sent, (applied, skipped) = _exchange(conn, stream, first=False)
+                print(f"Sync with {self.client_address[0]}: sent {sent}, applied {applied}, skipped {skipped}")
+            finally:
+                conn.close()
+
+    with socketserver.TCPServer((bind, port), SyncHandler) as server:
+        print(f"Waiting for desks on {bind}:{port}")
+        server.serve_forever()
+
+
+# --- File drop: for desks that are not always on the same network ---
+
+def _file_signature(secret, path):
+    with open(path, 'rb') as handle:
+        return hmac.new(secret, handle.read(), hashlib.sha256).hexdigest()
+
+
+def drop(conn, folder):
+    """Write our new changes to a shared folder and apply every other desk's files; returns counts
+
+    Each file is signed with the shared secret in a .hmac file beside it; unsigned or altered files are not read.
+    """
+    secret = sync_secret()
+    os.makedirs(folder, exist_ok=True)
+    device = conn.execute("SELECT device FROM replication_state").fetchone()[0]
+    mark = conn.execute("SELECT value FROM replication_marks WHERE name = 'dropped'").fetchone()
+    exported = json.loads(mark[0]) if mark else {}
+
+    outgoing = list(changes_since(conn, exported))
+    if outgoing:
+        name = f"{device}-{max(clock for _, clock, *_ in outgoing):012d}.jsonl.gz"
+        with gzip.open(os.path.join(folder, name + '.partial'), 'wt', encoding='utf-8') as handle:
+            for change in outgoing:
+                handle.write(json.dumps(list(change)) + '\n')
+        with open(os.path.join(folder, name + '.hmac'), 'w') as handle:
+            handle.write(_file_signature(secret, os.path.join(folder, name + '.partial')))
+        # Renamed only once complete (and signed), so other desks never read half a file
+        os.replace(os.path.join(folder, name + '.partial'), os.path.join(folder, name))
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO replication_marks VALUES ('dropped', ?)",
+                     (json.dumps(current_vector(conn)),))
+
+    applied = skipped = 0
+    for name in sorted(os.listdir(folder)):
+        if not name.endswith('.jsonl.gz') or name.startswith(device + '-'):
+            continue
+        if conn.execute("SELECT 1 FROM replication_marks WHERE name = ?", ('imported:' + name,)).fetchone():
+            continue
+        try:
+            with open(os.path.join(folder, name + '.hmac')) as handle:
+                signature = handle.read().strip()
+        except FileNotFoundError:
+            signature = ''
+        if not hmac.compare_digest(signature, _file_signature(secret, os.path.join(folder, name))):
+            # Left unmarked: a file still being copied in gets another chance on the next drop
+            print(f"Replication: skipped {name}, its signature does not match the sync secret")
+            continue
+        with gzip.open(os.path.join(folder, name), 'rt', encoding='utf-8') as handle:
+            done = apply_changes(conn, [json.loads(line) for line in handle])
+        applied, skipped = applied + done[0], skipped + done[1]
+        with conn:
+            conn.execute("INSERT INTO replication_marks VALUES (?, NULL)", ('imported:' + name,))
+    return len(outgoing), applied, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replicate the gym database between front-desk machines")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="this desk's database file")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--enable', action='store_true', help="start recording changes on this desk")
+    action.add_argument('--serve', type=int, nargs='?', const=DEFAULT_PORT, metavar='PORT',
+                        help="accept syncs from other desks")
+    action.add_argument('--sync', metavar='HOST[:PORT]', help="sync with a desk running --serve")
+    action.add_argument('--drop', metavar='FOLDER', help="exchange changes through a shared folder")
+    action.add_argument('--status', action='store_true', help="show the clock seen from every desk")
+    parser.add_argument('--bind', default=DEFAULT_BIND,
+                        help=f"address --serve listens on (default {DEFAULT_BIND}; 0.0.0.0 for every interface)")
+    args = parser.parse_args()
+
+    if args.serve:
+        try:
+            serve(args.db, args.serve, args.bind)
+        except OSError as e:
+            print(f"Replication error: {e}")
+        return
+
+    conn = Gym_db.get_connection(args.db)
+    try:
+        initialize_replication(conn)
+        if args.enable:
+            print(f"Replication enabled for desk {Sessions.current_device()}")
+        elif args.sync:
+            host, _, port = args.sync.partition(':')
+            sent, (applied, skipped) = sync_with(conn, host, int(port or DEFAULT_PORT))
+            print(f"Sent {sent} changes; applied {applied}, skipped {skipped}")
+        elif args.drop:
+            sent, applied, skipped = drop(conn, args.drop)
+            print(f"Dropped {sent} changes; applied {applied}, skipped {skipped}")
+        elif args.status:
+            for origin, clock in sorted(current_vector(conn).items()):
+                print(f"{origin}: {clock}")
+    except (OSError, sqlite3.Error) as e:
+        print(f"Replication error: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import argparse  # Import argparse to read command line options
+import re  # Import regular expressions to split search text into words
+import time  # Import time to report query latency
+import Gym_db  # Shared connection helper that enforces foreign keys
+
+# What gets indexed for each searchable table: (kind, table, key column, title columns, detail columns).
+# Only columns present in both the Create_db and Sprint_1 schemas are used.
+SEARCH_SOURCES = [
+    ('member', 'members', 'username', ['username'], ['email', 'member_id']),
+    ('staff', 'staff', 'username', ['username'], ['email', 'staff_id', 'role']),
+    ('class', 'classes', 'class_id', ['class_name'], ['class_id', 'difficulty_level', 'date']),
+    ('trainer', 'trainers', 'staff_id', ['forname', 'surname'], ['staff_id']),
+]
+
+# Results returned by a search unless the caller asks for another amount
+DEFAULT_LIMIT = 20
+
+# Hits scored per query; bounds the ranking cost of very common prefixes
+CANDIDATE_WINDOW = 500
+
+
+def _table_exists(conn, name, kind='table'):
+    """Check whether a table or trigger exists in the database"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = ? AND name = ?", (kind, name)
+    ).fetchone() is not None
+
+
+def _joined(row, columns):
+    """SQL expression joining columns of a row with spaces, treating NULL as empty"""
+    return " || ' ' || ".join(f"coalesce({row}.{column}, '')" for column in columns)
+
+
+def initialize_search_index(conn):
+    """Create the full-text index and the triggers that keep it in sync"""
+    index_is_new = not _table_exists(conn, 'search_index')
+
+    # 'search_docs' holds one row per searchable record; the FTS5 table indexes it
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS search_docs (
+            doc_id INTEGER PRIMARY KEY,
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            title TEXT,
+            detail TEXT,
+            UNIQUE (kind, key)
+        );
+
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            title, detail,
+            content='search_docs', content_rowid='doc_id',
+            prefix='2 3'
+        );
+
+
+        CREATE TRIGGER IF NOT EXISTS search_docs_ai AFTER INSERT ON search_docs BEGIN
+            INSERT INTO search_index(rowid, title, detail) VALUES (new.doc_id, new.title, new.detail);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS search_docs_ad AFTER DELETE ON search_docs BEGIN
+            INSERT INTO search_index(search_index, rowid, title, detail)
+            VALUES ('delete', old.doc_id, old.title, old.detail);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS search_docs_au AFTER UPDATE ON search_docs BEGIN
+            INSERT INTO search_index(search_index, rowid, title, detail)
+            VALUES ('delete', old.doc_id, old.title, old.detail);
+            INSERT INTO search_index(rowid, title, detail) VALUES (new.doc_id, new.title, new.detail);
+        END;
+    ''')
+
+    if index_is_new:
+        # Name hits (title column) outrank hits in the detail column
+        with conn:
+            conn.execute("INSERT INTO search_index(search_index, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+
+    for kind, table, key, title, detail in SEARCH_SOURCES:
+        if not _table_exists(conn, table):
+            continue
+
+        new_title, new_detail = _joined('new', title), _joined('new', detail)
+        # Only updates to indexed columns re-index a record; a password change or a login stamp does not
+        indexed = ', '.join(dict.fromkeys([key] + title + detail))
+        update_trigger = f'''
+            CREATE TRIGGER {table}_search_au AFTER UPDATE OF {indexed} ON {table} BEGIN
+                DELETE FROM search_docs WHERE kind = '{kind}' AND key = old.{key};
+                INSERT INTO search_docs(kind, key, title, detail)
+                VALUES ('{kind}', new.{key}, {new_title}, {new_detail});
+            END;
+        '''
+
+        # Databases indexed before that have an update trigger that fires on every column
+        existing = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (f"{table}_search_au",)
+        ).fetchone()
+        if existing and ' UPDATE OF ' not in existing[0]:
+            conn.executescript(f"DROP TRIGGER {table}_search_au; {update_trigger}")
+
+        if _table_exists(conn, f"{table}_search_ai", 'trigger'):
+            continue
+
+        # Delete before insert so INSERT OR REPLACE on the source table cannot leave a stale entry
+        conn.executescript(f'''
+            CREATE TRIGGER {table}_search_ai AFTER INSERT ON {table} BEGIN
+                DELETE FROM search_docs WHERE kind = '{kind}' AND key = new.{key};
+                INSERT INTO search_docs(kind, key, title, detail)
+                VALUES ('{kind}', new.{key}, {new_title}, {new_detail});
+            END;
+
+            {update_trigger}
+
+            CREATE TRIGGER {table}_search_ad AFTER DELETE ON {table} BEGIN
+                DELETE FROM search_docs WHERE kind = '{kind}' AND key = old.{key};
+            END;
+        ''')
+
+        # Index the rows written before the triggers existed
+        with conn:
+            conn.execute(f'''
+                INSERT OR IGNORE INTO search_docs(kind, key, title, detail)
+                SELECT '{kind}', {key}, {_joined(table, title)}, {_joined(table, detail)}
+                FROM {table}
+            ''')
+
+
+def rebuild_search_index(conn):
+    """Re-index every searchable record from scratch"""
+    initialize_search_index(conn)
+    with conn:
+        conn.execute("DELETE FROM search_docs")
+        for kind, table, key, title, detail in SEARCH_SOURCES:
+            if _table_exists(conn, table):
+                conn.execute(f'''
+                    INSERT INTO search_docs(kind, key, title, detail)
+                    SELECT '{kind}', {key}, {_joined(table, title)}, {_joined(table, detail)}
+                    FROM {table}
+                ''')
+        conn.execute("INSERT INTO search_index(search_index) VALUES ('optimize')")
+
+
+def build_match_query(text, prefix=True):
+    """Turn free text into an FTS5 query that requires every word"""
+    words = re.findall(r"\w+", text)
+    # Single letters are matched whole: a one-letter prefix would touch most of the index
+    return " ".join(f'"{word}"*' if prefix and len(word) > 1 else f'"{word}"' for word in words)
+
+
+def _ranked_matches(conn, match, limit, kinds):
+    """Rank at most CANDIDATE_WINDOW hits for an FTS5 query and return the best"""
+    query = '''
+        SELECT d.kind, d.key, d.title, d.detail
+        FROM (
+            SELECT rowid, rank FROM search_index WHERE search_index MATCH ? LIMIT ?
+        ) hits
+        JOIN search_docs d ON d.doc_id = hits.rowid
+    '''
+    params = [match, CANDIDATE_WINDOW]
+    if kinds:
+        query += f" WHERE d.kind IN ({', '.join('?' for _ in kinds)})"
+        params.extend(kinds)
+    query += " ORDER BY hits.rank LIMIT ?"
+    params.append(limit)
+    return conn.execute(query, params).fetchall()
+
+
+def search(conn, text, limit=DEFAULT_LIMIT, kinds=None):
+    """Return the best matches as (kind, key, title, detail) tuples, best first"""
+    exact = build_match_query(text, prefix=False)
+    if not exact:
+        return []
+
+    # Whole-word hits come first, then prefix hits fill the remaining places
+    results = _ranked_matches(conn, exact, limit, kinds)
+    if len(results) < limit:
+        seen = {(kind, key) for kind, key, _, _ in results}
+        for row in _ranked_matches(conn, build_match_query(text), limit, kinds):
+            if (row[0], row[1]) not in seen:
+                results.append(row)
+                if len(results) == limit:
+                    break
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search members, staff, classes and trainers")
+    parser.add_argument('text', nargs='?', default='', help="words to search for")
+    parser.add_argument('--db', default=Gym_db.DB_PATH, help="database file to search")
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help="maximum results to show")
+    parser.add_argument('--rebuild', action='store_true', help="re-index everything before searching")
+    args = parser.parse_args()
+
+    conn = Gym_db.get_connection(args.db)
+    try:
+        if args.rebuild:
+            rebuild_search_index(conn)
+        else:
+            initialize_search_index(conn)
+        if args.text:
+            start = time.perf_counter()
+            results = search(conn, args.text, args.limit)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            for kind, key, title, detail in results:
+                print(f"[{kind}] {title} ({key}) - {detail}")
+            print(f"{len(results)} results in {elapsed_ms:.1f} ms")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
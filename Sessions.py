@@ -0,0 +1,103 @@
+import os  # Import os to read the desk name from the environment
+import secrets  # Import secrets to generate unguessable session tokens
+import socket  # Import socket to fall back on the machine name as the desk name
+from datetime import datetime, timedelta  # Import datetime to work out session expiry
+
+# How long a remembered login lasts
+REMEMBER_DAYS = 30
+
+# Process-wide cache of remembered logins: (device_id, account_type) -> (username, expires_at)
+_cache = {}
+
+
+def current_device():
+    """Name of this front-desk machine (override with FLEXIGYM_DEVICE)"""
+    return os.environ.get('FLEXIGYM_DEVICE') or socket.gethostname()
+
+
+def initialize_sessions_table(conn):
+    """Create the sessions table: one remembered login per desk and account type"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            token TEXT PRIMARY KEY,
+            device_id TEXT NOT NULL,
+            account_type TEXT NOT NULL,
+            username TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            expires_at TEXT NOT NULL,
+            UNIQUE (device_id, account_type)
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)")
+    conn.commit()
+
+
+def remember(conn, account_type, username, device_id=None, days=REMEMBER_DAYS):
+    """Remember a login on this desk, replacing the desk's previous one; returns the token"""
+    device_id = device_id or current_device()
+    token = secrets.token_urlsafe(32)
+    now = datetime.now()
+    expires_at = (now + timedelta(days=days)).isoformat(timespec='seconds')
+    # A single-row upsert on the (device_id, account_type) unique index
+    conn.execute('''
+        INSERT INTO sessions (token, device_id, account_type, username, created_at, expires_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(device_id, account_type) DO UPDATE SET
+            token = excluded.token, username = excluded.username,
+            created_at = excluded.created_at, expires_at = excluded.expires_at
+    ''', (token, device_id, account_type, username, now.isoformat(timespec='seconds'), expires_at))
+    conn.commit()
+    _cache[(device_id, account_type)] = (username, expires_at)
+    return token
+
+
+def forget(conn, account_type, device_id=None):
+    """Drop the remembered login for this desk"""
+    device_id = device_id or current_device()
+    conn.execute(
+        "DELETE FROM sessions WHERE device_id = ? AND account_type = ?",
+        (device_id, account_type)
+    )
+    conn.commit()
+    _cache[(device_id, account_type)] = None
+
+
+def remembered_user(conn, account_type, device_id=None):
+    """Username remembered on this desk, or None if there is none or it has expired"""
+    device_id = device_id or current_device()
+    key = (device_id, account_type)
+    if key not in _cache:
+        row = conn.execute(
+            "SELECT username, expires_at FROM sessions WHERE device_id = ? AND account_type = ?",
+            key
+        ).fetchone()
+        _cache[key] = tuple(row) if row else None
+
+    entry = _cache[key]
+    if entry is None:
+        return None
+    username, expires_at = entry
+    if expires_at <= datetime.now().isoformat(timespec='seconds'):
+        forget(conn, account_type, device_id)
+        return None
+    return username
+
+
+def user_for_token(conn, token):
+    """Look up the (account_type, username) a live session token belongs to"""
+    row = conn.execute(
+        "SELECT account_type, username FROM sessions WHERE token = ? AND expires_at > ?",
+        (token, datetime.now().isoformat(timespec='seconds'))
+    ).fetchone()
+    return tuple(row) if row else None
+
+
+def purge_expired(conn):
+    """Delete every expired session; returns how many were removed"""
+    cursor = conn.execute(
+        "DELETE FROM sessions WHERE expires_at <= ?",
+        (datetime.now().isoformat(timespec='seconds'),)
+    )
+    conn.commit()
+    _cache.clear()
+    return cursor.rowcount
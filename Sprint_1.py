@@ -1,12 +1,21 @@
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import filedialog, messagebox, ttk
 import sqlite3
 import os
+import Gym_db
+import Search_index
+import Member_directory
+import Sessions
+import Passwords
+import Registration
+import Data_export
+import Job_queue
+import Dashboard
 
 # Database utility functions
 def get_db_connection():
     """Create and return a database connection"""
-    conn = sqlite3.connect("gym_database.db")
+    conn = Gym_db.get_connection()
     conn.row_factory = sqlite3.Row  # Allows accessing columns by name
     return conn
 
@@ -23,8 +32,7 @@ def initialize_database():
                 username TEXT UNIQUE NOT NULL,
                 email TEXT UNIQUE NOT NULL,
                 password TEXT NOT NULL,
-                member_id TEXT UNIQUE NOT NULL,
-                remember_me BOOLEAN DEFAULT 0
+                member_id TEXT UNIQUE NOT NULL
             )
         ''')
         
@@ -36,12 +44,17 @@ def initialize_database():
                 email TEXT UNIQUE NOT NULL,
                 password TEXT NOT NULL,
                 staff_id TEXT UNIQUE NOT NULL,
-                role TEXT NOT NULL,
-                remember_me BOOLEAN DEFAULT 0
+                role TEXT NOT NULL
             )
         ''')
         
         conn.commit()
+        
+        # Create the sessions table used by "Remember Me"
+        Sessions.initialize_sessions_table(conn)
+        
+        # Emails and IDs must be unique so registration can rely on the constraints
+        Gym_db.create_unique_indexes(conn)
     except sqlite3.Error as e:
         print(f"Database error: {e}")
     finally:
@@ -112,96 +125,106 @@ current_user = None
 current_staff = None
 
 # User management functions
+def with_session_store(action, *args):
+    """Run a Sessions function with a short-lived connection"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        return action(conn, *args)
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+# Remembered logins are kept per desk in the sessions table (one row each)
 def load_remembered_user():
-    result = execute_query(
-        "SELECT username FROM members WHERE remember_me = 1",
-        fetch_one=True
-    )
-    return result['username'] if result else None
+    return with_session_store(Sessions.remembered_user, 'member')
 
 def load_remembered_staff():
-    result = execute_query(
-        "SELECT username FROM staff WHERE remember_me = 1",
-        fetch_one=True
-    )
-    return result['username'] if result else None
+    return with_session_store(Sessions.remembered_user, 'staff')
 
 def save_remembered_user(username):
-    execute_query("UPDATE members SET remember_me = 0")
-    execute_query(
-        "UPDATE members SET remember_me = 1 WHERE username = ?",
-        (username,)
-    )
+    with_session_store(Sessions.remember, 'member', username)
 
 def save_remembered_staff(username):
-    execute_query("UPDATE staff SET remember_me = 0")
-    execute_query(
-        "UPDATE staff SET remember_me = 1 WHERE username = ?",
-        (username,)
-    )
+    with_session_store(Sessions.remember, 'staff', username)
 
 def clear_remembered_user():
-    execute_query("UPDATE members SET remember_me = 0")
+    with_session_store(Sessions.forget, 'member')
 
 def clear_remembered_staff():
-    execute_query("UPDATE staff SET remember_me = 0")
+    with_session_store(Sessions.forget, 'staff')
 
 # Login functions
 def login():
-    global current_user
     username_or_id = entry_username.get().strip()
     password = entry_password.get().strip()
 
-    try:
-        user = execute_query(
-            "SELECT * FROM members WHERE (username = ? OR member_id = ?) AND password = ?",
-            (username_or_id, username_or_id, password),
-            fetch_one=True
-        )
-        
-        if user:
-            current_user = user['username']
-            if remember_me_var.get():
-                save_remembered_user(current_user)
+    def finish_login(user):
+        global current_user
+        try:
+            if user:
+                current_user = user['username']
+                if remember_me_var.get():
+                    save_remembered_user(current_user)
+                else:
+                    clear_remembered_user()
+                
+                messagebox.showinfo("Login Success", f"Welcome to Flexi Gym, {current_user}!")
+                login_window.destroy()
+                show_user_dashboard()
             else:
-                clear_remembered_user()
-            
-            messagebox.showinfo("Login Success", f"Welcome to Flexi Gym, {current_user}!")
-            login_window.destroy()
-            show_user_dashboard()
-        else:
-            messagebox.showerror("Login Failed", "Invalid username, member ID, or password!")
-    except Exception as e:
-        messagebox.showerror("Error", f"An error occurred: {str(e)}")
+                messagebox.showerror("Login Failed", "Invalid username, member ID, or password!")
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+
+    # Password hashing is slow by design, so verify on a worker thread
+    Passwords.authenticate_async(
+        login_window, 'members', username_or_id, password,
+        on_done=finish_login,
+        on_error=lambda e: messagebox.showerror("Error", f"An error occurred: {str(e)}")
+    )
 
 def staff_login():
-    global current_staff
     username_or_id = entry_staff_username.get().strip()
     password = entry_staff_password.get().strip()
 
-    try:
-        staff_member = execute_query(
-            "SELECT * FROM staff WHERE (username = ? OR staff_id = ?) AND password = ?",
-            (username_or_id, username_or_id, password),
-            fetch_one=True
-        )
-        
-        if staff_member:
-            current_staff = staff_member['username']
-            if staff_remember_me_var.get():
-                save_remembered_staff(current_staff)
+    def finish_staff_login(staff_member):
+        global current_staff
+        try:
+            if staff_member:
+                current_staff = staff_member['username']
+                if staff_remember_me_var.get():
+                    save_remembered_staff(current_staff)
+                else:
+                    clear_remembered_staff()
+                
+                messagebox.showinfo("Staff Login Success", f"Welcome back, {staff_member['role']} {current_staff}!")
+                staff_login_window.destroy()
+                show_staff_dashboard(staff_member['role'])
             else:
-                clear_remembered_staff()
-            
-            messagebox.showinfo("Staff Login Success", f"Welcome back, {staff_member['role']} {current_staff}!")
-            staff_login_window.destroy()
-            show_staff_dashboard(staff_member['role'])
-        else:
-            messagebox.showerror("Login Failed", "Invalid username, staff ID, or password!")
-    except Exception as e:
-        messagebox.showerror("Error", f"An error occurred: {str(e)}")
+                messagebox.showerror("Login Failed", "Invalid username, staff ID, or password!")
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+
+    # Password hashing is slow by design, so verify on a worker thread
+    Passwords.authenticate_async(
+        staff_login_window, 'staff', username_or_id, password,
+        on_done=finish_staff_login,
+        on_error=lambda e: messagebox.showerror("Error", f"An error occurred: {str(e)}")
+    )
 
 # Registration functions
+# Message shown for each field a registration can collide on
+CONFLICT_MESSAGES = {
+    "email": "Email already registered! Use another email.",
+    "username": "Username already exists! Choose another.",
+    "member_id": "Member ID already exists! Choose another.",
+    "staff_id": "Staff ID already exists! Choose another.",
+}
+
 def register():
     email = entry_new_email.get().strip()
     username = entry_new_username.get().strip()
@@ -212,32 +235,21 @@ def register():
         messagebox.showerror("Registration Failed", "Please fill in all fields.")
         return
 
-    try:
-        # Check if email is already registered
-        if execute_query("SELECT 1 FROM members WHERE email = ?", (email,), fetch_one=True):
-            messagebox.showerror("Registration Failed", "Email already registered! Use another email.")
-            return
-
-        # Check if username exists
-        if execute_query("SELECT 1 FROM members WHERE username = ?", (username,), fetch_one=True):
-            messagebox.showerror("Registration Failed", "Username already exists! Choose another.")
-            return
-
-        # Check if member ID exists
-        if execute_query("SELECT 1 FROM members WHERE member_id = ?", (member_id,), fetch_one=True):
-            messagebox.showerror("Registration Failed", "Member ID already exists! Choose another.")
+    def finish_register(conflict):
+        if conflict:
+            messagebox.showerror("Registration Failed", CONFLICT_MESSAGES.get(conflict, f"{conflict} already in use!"))
             return
-
-        # Insert new member
-        execute_query(
-            "INSERT INTO members (username, email, password, member_id) VALUES (?, ?, ?, ?)",
-            (username, email, password, member_id)
-        )
-
         messagebox.showinfo("Registration Successful", "You can now log in!")
         register_window.destroy()
-    except Exception as e:
-        messagebox.showerror("Error", f"Registration failed: {str(e)}")
+
+    # One INSERT; the UNIQUE constraints report which field is already taken.
+    # Hashing and the insert run on a worker thread.
+    account = {"username": username, "email": email, "password": password, "member_id": member_id}
+    Passwords.run_in_background(
+        register_window, Registration.register_account, ('members', account),
+        on_done=finish_register,
+        on_error=lambda e: messagebox.showerror("Error", f"Registration failed: {str(e)}")
+    )
 
 def staff_register():
     email = entry_staff_email.get().strip()
@@ -250,37 +262,25 @@ def staff_register():
         messagebox.showerror("Registration Failed", "Please fill in all fields.")
         return
 
-    try:
-        # Validate work email
-        if not email.endswith("@flexigym.com"):
-            messagebox.showerror("Registration Failed", "Please use your official Flexi Gym work email (@flexigym.com).")
-            return
-
-        # Check if email is already registered
-        if execute_query("SELECT 1 FROM staff WHERE email = ?", (email,), fetch_one=True):
-            messagebox.showerror("Registration Failed", "Email already registered! Use another email.")
-            return
-
-        # Check if username exists
-        if execute_query("SELECT 1 FROM staff WHERE username = ?", (username,), fetch_one=True):
-            messagebox.showerror("Registration Failed", "Username already exists! Choose another.")
-            return
+    # Validate work email
+    if not email.endswith("@flexigym.com"):
+        messagebox.showerror("Registration Failed", "Please use your official Flexi Gym work email (@flexigym.com).")
+        return
 
-        # Check if staff ID exists
-        if execute_query("SELECT 1 FROM staff WHERE staff_id = ?", (staff_id,), fetch_one=True):
-            messagebox.showerror("Registration Failed", "Staff ID already exists! Choose another.")
+    def finish_staff_register(conflict):
+        if conflict:
+            messagebox.showerror("Registration Failed", CONFLICT_MESSAGES.get(conflict, f"{conflict} already in use!"))
             return
-
-        # Insert new staff member
-        execute_query(
-            "INSERT INTO staff (username, email, password, staff_id, role) VALUES (?, ?, ?, ?, ?)",
-            (username, email, password, staff_id, role)
-        )
-
         messagebox.showinfo("Registration Successful", "Staff account created successfully!")
         staff_register_window.destroy()
-    except Exception as e:
-        messagebox.showerror("Error", f"Registration failed: {str(e)}")
+
+    # One INSERT; the UNIQUE constraints report which field is already taken
+    account = {"username": username, "email": email, "password": password, "staff_id": staff_id, "role": role}
+    Passwords.run_in_background(
+        staff_register_window, Registration.register_account, ('staff', account),
+        on_done=finish_staff_register,
+        on_error=lambda e: messagebox.showerror("Error", f"Registration failed: {str(e)}")
+    )
 
 # Logout functions
 def logout():
@@ -360,6 +360,12 @@ def open_login_window():
         activeforeground=FG_COLOR,
         selectcolor=BG_COLOR
     ).pack(pady=5)
+    
+    # Pre-fill the member remembered on this desk
+    remembered = load_remembered_user()
+    if remembered:
+        entry_username.insert(0, remembered)
+        remember_me_var.set(True)
 
     button_frame = tk.Frame(main_frame, bg=BG_COLOR)
     button_frame.pack(pady=10)
@@ -480,59 +486,65 @@ def open_update_user_window():
         new_username = entry_new_username.get().strip()
         new_password = entry_new_password.get().strip()
         
-        try:
-            # Find the user
-            user = execute_query(
-                "SELECT * FROM members WHERE (username = ? OR member_id = ?) AND password = ?",
-                (current_id, current_id, current_pass),
-                fetch_one=True
-            )
-            
-            if not user:
-                messagebox.showerror("Error", "Invalid credentials!")
-                return
-            
-            current_username = user['username']
-            current_data = {
-                "email": user['email'],
-                "password": user['password'],
-                "member_id": user['member_id']
-            }
-            
-            # Check if new email is provided and not used by others
-            if new_email:
-                if execute_query("SELECT 1 FROM members WHERE email = ? AND username != ?", (new_email, current_username), fetch_one=True):
-                    messagebox.showerror("Error", "Email already in use by another account!")
-                    return
-                current_data['email'] = new_email
-            
-            # Check if new password is provided
-            if new_password:
-                current_data['password'] = new_password
-            
-            # Handle username change
-            if new_username and new_username != current_username:
-                if execute_query("SELECT 1 FROM members WHERE username = ?", (new_username,), fetch_one=True):
-                    messagebox.showerror("Error", "Username already taken!")
+        def apply_update(result):
+            user, new_password_hash = result
+            try:
+                if not user:
+                    messagebox.showerror("Error", "Invalid credentials!")
                     return
                 
-                # Update username
+                current_username = user['username']
+                current_data = {
+                    "email": user['email'],
+                    "password": None,  # None keeps the stored hash
+                    "member_id": user['member_id']
+                }
+                
+                # Check if new email is provided and not used by others
+                if new_email:
+                    if execute_query("SELECT 1 FROM members WHERE email = ? AND username != ?", (new_email, current_username), fetch_one=True):
+                        messagebox.showerror("Error", "Email already in use by another account!")
+                        return
+                    current_data['email'] = new_email
+                
+                # New password, already hashed on the worker thread
+                if new_password_hash:
+                    current_data['password'] = new_password_hash
+                
+                # Handle username change
+                if new_username and new_username != current_username:
+                    if execute_query("SELECT 1 FROM members WHERE username = ?", (new_username,), fetch_one=True):
+                        messagebox.showerror("Error", "Username already taken!")
+                        return
+                    
+                    # Update username
+                    execute_query(
+                        "UPDATE members SET username = ? WHERE username = ?",
+                        (new_username, current_username)
+                    )
+                    current_username = new_username
+                
+                # Update other fields
                 execute_query(
-                    "UPDATE members SET username = ? WHERE username = ?",
-                    (new_username, current_username)
+                    "UPDATE members SET email = ?, password = COALESCE(?, password) WHERE username = ?",
+                    (current_data['email'], current_data['password'], current_username)
                 )
-                current_username = new_username
-            
-            # Update other fields
-            execute_query(
-                "UPDATE members SET email = ?, password = ? WHERE username = ?",
-                (current_data['email'], current_data['password'], current_username)
-            )
-            
-            messagebox.showinfo("Success", "User information updated successfully!")
-            update_window.destroy()
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+                
+                messagebox.showinfo("Success", "User information updated successfully!")
+                update_window.destroy()
+            except Exception as e:
+                messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        
+        def check_and_hash():
+            user = Passwords.authenticate('members', current_id, current_pass)
+            return user, Passwords.hash_password(new_password) if user and new_password else None
+        
+        # Check the current password and hash the new one on a worker thread; both are slow by design
+        Passwords.run_in_background(
+            update_window, check_and_hash, (),
+            on_done=apply_update,
+            on_error=lambda e: messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        )
 
     tk.Button(
         main_frame, 
@@ -565,30 +577,57 @@ def show_user_dashboard():
         fg=FG_COLOR
     ).pack(pady=5)
     
-    try:
-        user_info = execute_query(
-            "SELECT email, member_id FROM members WHERE username = ?",
-            (current_user,),
-            fetch_one=True
-        )
-        
+    def info_label(text, pady=5):
         tk.Label(
             main_frame, 
-            text=f"Email: {user_info['email']}", 
+            text=text, 
             font=("Arial", 12),
             bg=BG_COLOR,
-            fg=FG_COLOR
-        ).pack(pady=5)
-        
+            fg=FG_COLOR,
+            justify="left"
+        ).pack(pady=pady)
+
+    conn = None
+    try:
+        # Plan, status, billing and bookings all come back from one joined query
+        conn = get_db_connection()
+        Dashboard.prepare_dashboard(conn)
+        summary = Dashboard.member_dashboard(conn, current_user)
+
+        info_label(f"Email: {summary['email']}")
+        info_label(f"Member ID: {summary['member_id']}")
+        if summary['plan']:
+            info_label(f"Plan: {summary['plan']} (£{summary['price']:.2f}/month) - {summary['status'].title()}")
+        else:
+            info_label(f"Status: {summary['status'].title()}")
+
+        if summary['payer_id']:
+            info_label(f"Billed to household payer {summary['payer_id']}")
+        elif summary['latest_invoice']:
+            period, amount, status, due_date = summary['latest_invoice']
+            info_label(f"Latest invoice {period}: £{amount / 100:.2f} {status} (due {due_date})")
+            info_label(f"Outstanding balance: £{summary['outstanding_pence'] / 100:.2f}")
+        else:
+            info_label("No invoices yet")
+
         tk.Label(
             main_frame, 
-            text=f"Member ID: {user_info['member_id']}", 
-            font=("Arial", 12),
+            text="Upcoming Classes", 
+            font=("Arial", 14, "bold"),
             bg=BG_COLOR,
             fg=FG_COLOR
-        ).pack(pady=5)
+        ).pack(pady=(15, 5))
+        for class_id, class_name, class_date, class_time, trainers in summary['bookings']:
+            info_label(f"{class_date} {class_time}  {class_name}" + (f" with {trainers}" if trainers else ""), pady=1)
+        if not summary['bookings']:
+            info_label("No upcoming classes booked")
+        if summary['trainers']:
+            info_label(f"Your trainers: {', '.join(summary['trainers'])}")
     except Exception as e:
         messagebox.showerror("Error", f"Could not load user information: {str(e)}")
+    finally:
+        if conn:
+            conn.close()
 
     tk.Button(
         main_frame, 
@@ -652,6 +691,12 @@ def open_staff_login_window():
         activeforeground=FG_COLOR,
         selectcolor=BG_COLOR
     ).pack(pady=5)
+    
+    # Pre-fill the staff member remembered on this desk
+    remembered = load_remembered_staff()
+    if remembered:
+        entry_staff_username.insert(0, remembered)
+        staff_remember_me_var.set(True)
 
     tk.Button(
         main_frame, 
@@ -896,6 +941,13 @@ def show_staff_dashboard(role):
         **button_style
     ).pack(side=tk.LEFT, padx=5)
     
+    tk.Button(
+        button_frame1, 
+        text="Search", 
+        **button_style,
+        command=open_search_window
+    ).pack(side=tk.LEFT, padx=5)
+    
     # Gym Operations section
     tk.Label(
         main_frame, 
@@ -920,6 +972,13 @@ def show_staff_dashboard(role):
         **button_style
     ).pack(side=tk.LEFT, padx=5)
     
+    tk.Button(
+        button_frame2, 
+        text="Export Data", 
+        **button_style,
+        command=open_export_window
+    ).pack(side=tk.LEFT, padx=5)
+    
     tk.Button(
         main_frame, 
         text="Logout", 
@@ -928,58 +987,275 @@ def show_staff_dashboard(role):
     ).pack(pady=20)
 
 def view_members():
+    """Member directory: one page at a time, sorted by clicking a column heading"""
     view_window = tk.Toplevel(welcome_window)
     view_window.title("Flexi Gym - Member List")
     view_window.configure(bg=BG_COLOR)
     
     main_frame = tk.Frame(view_window, bg=BG_COLOR)
-    main_frame.pack(padx=20, pady=20)
+    main_frame.pack(padx=20, pady=20, fill=tk.BOTH, expand=True)
     
     try:
-        members = execute_query(
-            "SELECT username, email, member_id FROM members",
-            fetch_all=True
-        )
-        
-        if not members:
-            tk.Label(
-                main_frame, 
-                text="No members registered yet.", 
-                font=("Arial", 12),
-                bg=BG_COLOR,
-                fg=FG_COLOR
-            ).pack(pady=20)
-        else:
-            tk.Label(
-                main_frame, 
-                text="Registered Members:", 
-                font=("Arial", 14, "bold"),
-                bg=BG_COLOR,
-                fg=FG_COLOR
-            ).pack(pady=10)
-            
-            frame = tk.Frame(main_frame, bg=BG_COLOR)
-            frame.pack(fill=tk.BOTH, expand=True)
-            
-            scrollbar = tk.Scrollbar(frame)
-            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-            
-            member_list = tk.Listbox(
-                frame, 
-                yscrollcommand=scrollbar.set, 
-                font=("Arial", 12), 
-                width=60,
-                bg=ENTRY_BG,
-                fg=ENTRY_FG
-            )
-            
-            for member in members:
-                member_list.insert(tk.END, f"Username: {member['username']} | Email: {member['email']} | Member ID: {member['member_id']}")
-            
-            member_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            scrollbar.config(command=member_list.yview)
+        directory = Member_directory.open_directory()
     except Exception as e:
         messagebox.showerror("Error", f"Could not load members: {str(e)}")
+        view_window.destroy()
+        return
+    
+    tk.Label(
+        main_frame, 
+        text="Registered Members:", 
+        font=("Arial", 14, "bold"),
+        bg=BG_COLOR,
+        fg=FG_COLOR
+    ).pack(pady=10)
+    
+    frame = tk.Frame(main_frame, bg=BG_COLOR)
+    frame.pack(fill=tk.BOTH, expand=True)
+    
+    scrollbar = tk.Scrollbar(frame)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    
+    headings = {"username": "Username", "email": "Email", "member_id": "Member ID"}
+    member_tree = ttk.Treeview(
+        frame, 
+        columns=Member_directory.SORT_COLUMNS, 
+        show="headings",
+        height=20,
+        yscrollcommand=scrollbar.set
+    )
+    for column in Member_directory.SORT_COLUMNS:
+        member_tree.column(column, width=200)
+    member_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.config(command=member_tree.yview)
+    
+    nav_frame = tk.Frame(main_frame, bg=BG_COLOR)
+    nav_frame.pack(pady=10)
+    
+    page_label = tk.Label(
+        nav_frame, 
+        font=("Arial", 12),
+        bg=BG_COLOR,
+        fg=FG_COLOR
+    )
+    
+    def show_page(rows):
+        member_tree.delete(*member_tree.get_children())
+        for row in rows:
+            member_tree.insert("", tk.END, values=tuple(row))
+        
+        # Mark the sorted column with an arrow
+        for column, text in headings.items():
+            if column == directory.sort_column:
+                text += " ▼" if directory.descending else " ▲"
+            member_tree.heading(column, text=text, command=lambda c=column: sort_by(c))
+        
+        if not rows and directory.page_number == 1:
+            page_label.config(text="No members registered yet.")
+        else:
+            page_label.config(text=f"Page {directory.page_number}")
+        prev_button.config(state=tk.NORMAL if directory.page_number > 1 else tk.DISABLED)
+        next_button.config(state=tk.NORMAL if directory.has_next else tk.DISABLED)
+        
+        # Load the following page while the user reads this one
+        view_window.after_idle(directory.prefetch_next)
+    
+    def sort_by(column):
+        # Clicking the sorted column again flips the direction
+        descending = column == directory.sort_column and not directory.descending
+        show_page(directory.sort_by(column, descending))
+    
+    prev_button = tk.Button(
+        nav_frame, 
+        text="< Previous", 
+        **button_style,
+        command=lambda: show_page(directory.previous_page())
+    )
+    prev_button.pack(side=tk.LEFT, padx=5)
+    page_label.pack(side=tk.LEFT, padx=10)
+    next_button = tk.Button(
+        nav_frame, 
+        text="Next >", 
+        **button_style,
+        command=lambda: show_page(directory.next_page())
+    )
+    next_button.pack(side=tk.LEFT, padx=5)
+    
+    def on_close():
+        directory.conn.close()
+        view_window.destroy()
+    
+    view_window.protocol("WM_DELETE_WINDOW", on_close)
+    show_page(directory.rows)
+
+def open_search_window():
+    """Search-as-you-type lookup across members, staff, classes and trainers"""
+    search_window = tk.Toplevel(welcome_window)
+    search_window.title("Flexi Gym - Search")
+    search_window.configure(bg=BG_COLOR)
+    
+    # One connection for the lifetime of the window keeps each keystroke cheap
+    conn = Gym_db.get_connection()
+    Search_index.initialize_search_index(conn)
+    pending = {"job": None}
+    
+    main_frame = tk.Frame(search_window, bg=BG_COLOR)
+    main_frame.pack(padx=20, pady=20, fill=tk.BOTH, expand=True)
+    
+    tk.Label(
+        main_frame, 
+        text="Search members, staff, classes and trainers:", 
+        font=("Arial", 12),
+        bg=BG_COLOR,
+        fg=FG_COLOR
+    ).pack(pady=5)
+    
+    search_var = tk.StringVar()
+    entry_search = tk.Entry(
+        main_frame, 
+        textvariable=search_var,
+        font=("Arial", 12), 
+        width=50,
+        bg=ENTRY_BG,
+        fg=ENTRY_FG,
+        insertbackground=ENTRY_FG
+    )
+    entry_search.pack(pady=5)
+    entry_search.focus_set()
+    
+    result_list = tk.Listbox(
+        main_frame, 
+        font=("Arial", 12), 
+        width=70,
+        height=15,
+        bg=ENTRY_BG,
+        fg=ENTRY_FG
+    )
+    result_list.pack(pady=5, fill=tk.BOTH, expand=True)
+    
+    def run_search():
+        pending["job"] = None
+        result_list.delete(0, tk.END)
+        try:
+            for kind, key, title, detail in Search_index.search(conn, search_var.get()):
+                result_list.insert(tk.END, f"[{kind.title()}] {title} | {detail}")
+        except Exception as e:
+            result_list.insert(tk.END, f"Search failed: {str(e)}")
+    
+    def on_change(*args):
+        # Debounce: only query once typing pauses
+        if pending["job"] is not None:
+            search_window.after_cancel(pending["job"])
+        pending["job"] = search_window.after(200, run_search)
+    
+    def on_close():
+        if pending["job"] is not None:
+            search_window.after_cancel(pending["job"])
+        conn.close()
+        search_window.destroy()
+    
+    search_var.trace_add("write", on_change)
+    search_window.protocol("WM_DELETE_WINDOW", on_close)
+
+# How long a queued export waits for the home screen's workers before this window runs its own
+LOCAL_WORKER_WAIT_MS = 3000
+
+# Job workers started here when Sprint_1 runs without the home screen
+local_job_workers = None
+
+def start_local_job_workers():
+    global local_job_workers
+    if local_job_workers is None:
+        local_job_workers = Job_queue.WorkerPool(workers=1)
+        local_job_workers.start()
+
+def open_export_window():
+    """Export a table or report to CSV / JSON Lines without blocking the dashboard"""
+    export_window = tk.Toplevel(welcome_window)
+    export_window.title("Flexi Gym - Export Data")
+    export_window.configure(bg=BG_COLOR)
+    
+    main_frame = tk.Frame(export_window, bg=BG_COLOR)
+    main_frame.pack(padx=20, pady=20)
+    
+    tk.Label(main_frame, text="Export:", font=("Arial", 12), bg=BG_COLOR, fg=FG_COLOR).pack(pady=5)
+    export_var = tk.StringVar(value="members")
+    ttk.Combobox(
+        main_frame, 
+        textvariable=export_var,
+        values=sorted(Data_export.EXPORTS),
+        state="readonly",
+        width=20
+    ).pack(pady=5)
+    
+    gzip_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(
+        main_frame, 
+        text="Compress (gzip)", 
+        variable=gzip_var,
+        bg=BG_COLOR,
+        fg=FG_COLOR,
+        selectcolor=ENTRY_BG
+    ).pack(pady=5)
+    
+    status_label = tk.Label(main_frame, text="", font=("Arial", 10), bg=BG_COLOR, fg=FG_COLOR)
+    status_label.pack(pady=5)
+    
+    def start_export():
+        suffix = ".gz" if gzip_var.get() else ""
+        path = filedialog.asksaveasfilename(
+            parent=export_window,
+            initialfile=f"{export_var.get()}.csv{suffix}",
+            filetypes=[("CSV", f"*.csv{suffix}"), ("JSON Lines", f"*.jsonl{suffix}")]
+        )
+        if not path:
+            return
+        export_button.config(state=tk.DISABLED)
+        
+        def finish(rows):
+            export_button.config(state=tk.NORMAL)
+            status_label.config(text=f"Exported {rows} rows to {os.path.basename(path)}")
+        
+        def fail(error):
+            export_button.config(state=tk.NORMAL)
+            status_label.config(text="")
+            messagebox.showerror("Error", f"Export failed:\n{error.strip().splitlines()[-1]}")
+        
+        def waiting(status):
+            status_label.config(text="Exporting..." if status == "running" else "Waiting for a job worker...")
+        
+        # The export runs on the job workers started by the home screen (or here, if none pick it up);
+        # this window only polls
+        try:
+            conn = Gym_db.get_connection()
+            try:
+                Job_queue.initialize_job_queue(conn)
+                job_id = Job_queue.enqueue(
+                    conn, "export", (export_var.get(), os.path.abspath(path), None, gzip_var.get()), priority=1
+                )
+            finally:
+                conn.close()
+        except Exception as e:
+            export_button.config(state=tk.NORMAL)
+            messagebox.showerror("Error", f"Could not queue the export: {str(e)}")
+            return
+        
+        def check_picked_up():
+            # Still queued: nothing else is running workers, so take the job on in this process
+            conn = Gym_db.get_connection()
+            try:
+                status = Job_queue.job_status(conn, job_id)[0]
+            finally:
+                conn.close()
+            if status == "queued":
+                start_local_job_workers()
+        
+        waiting("queued")
+        Job_queue.watch_job(export_window, job_id, on_done=finish, on_error=fail, on_waiting=waiting)
+        welcome_window.after(LOCAL_WORKER_WAIT_MS, check_picked_up)
+    
+    export_button = tk.Button(main_frame, text="Export...", **button_style, command=start_export)
+    export_button.pack(pady=10)
 
 # Create the welcome screen
 welcome_window = tk.Tk()
@@ -1,5 +1,16 @@
 import tkinter as tk
-from tkinter import messagebox, ttk
+from tkinter import filedialog, messagebox, ttk
+import os
+import shutil
+import Gym_db
+import Billing
+import Receipts
+import Plans
+import Discounts
+import Memberships
+import Households
+import Bookings
+import Passwords
 
 class FlexGymApp(tk.Tk):
     def __init__(self):
@@ -12,6 +23,15 @@ class FlexGymApp(tk.Tk):
         style.configure('TNotebook', background='white')
         style.configure('TNotebook.Tab', background='green', foreground='white')
         style.map('TNotebook.Tab', background=[('selected', 'green')], foreground=[('selected', 'white')])
+
+        # Database connection and the member who has logged in on this window
+        self.conn = Gym_db.get_connection()
+        Billing.initialize_billing_tables(self.conn)
+        Plans.initialize_plans(self.conn)
+        Discounts.initialize_discount_tables(self.conn)
+        Bookings.initialize_booking_indexes(self.conn)
+        self.current_member = None
+
         self.create_tabs()
 
     def create_tabs(self):
@@ -42,30 +62,16 @@ class FlexGymApp(tk.Tk):
     def create_signup_tab(self):
         self.signup_name = tk.StringVar()
         self.signup_email = tk.StringVar()
+        self.login_password = tk.StringVar()
         self.themed_label(self.tab_signup, "Choose a Membership Plan:").pack() 
-        plans={ 
-            
-             'Basic' : '£10/month',
-             'Silver': '£15/month',
-             'Gold'  :'£20/month',
-            'Inclusive': '£25/month',
-             'Student'  : '£30/month',
-             'VIP Elite':'£35/month',
-             'Premium': '£40/month',
-             'Personal Training':'£55/month',
-            ' Platinum': '£60/month',
-             'Diamond':'£65/month',
-             'Family': '£70/month', 
-
-
-
-             } 
+        # Plans and prices come from the catalogue, so a price change shows up here without an edit
+        plans = Plans.current_prices(self.conn)
 
         self.selected_plan = tk.StringVar()
-        for plan, price in plans.items():
+        for plan, pence in plans:
             tk.Radiobutton(
                 self.tab_signup,
-                text=f"{plan} Plan - {price}",
+                text=f"{plan} Plan - {Plans.format_price(pence)}",
                 variable=self.selected_plan,
                 value=plan,
                 bg='green',
@@ -78,6 +84,8 @@ class FlexGymApp(tk.Tk):
         tk.Entry(self.tab_signup, textvariable=self.signup_name, bg='white', fg='green').pack()
         self.themed_label(self.tab_signup, "Email:").pack()
         tk.Entry(self.tab_signup, textvariable=self.signup_email, bg='white', fg='green').pack()
+        self.themed_label(self.tab_signup, "Password (to login):").pack()
+        tk.Entry(self.tab_signup, textvariable=self.login_password, show='*', bg='white', fg='green').pack()
         self.themed_button(self.tab_signup, "Sign Up", self.sign_up_user).pack()
         self.themed_button(self.tab_signup, "Login", self.login_user).pack()
 
@@ -100,6 +108,13 @@ class FlexGymApp(tk.Tk):
         self.themed_button(self.tab_billing, "Apply Discount Code", self.apply_discount_code).pack()
         self.themed_label(self.tab_billing, "Email Alerts for Payment Issues Enabled").pack()
 
+    def require_member(self):
+        """Return True if a member has logged in, otherwise ask them to"""
+        if self.current_member is None:
+            messagebox.showwarning("Login Required", "Please log in on the Sign Up / Login tab first.")
+            return False
+        return True
+
     def popup_window(self, title, message):
         popup = tk.Toplevel(self)
         popup.title(title)
@@ -131,56 +146,259 @@ class FlexGymApp(tk.Tk):
         self.themed_button(popup, "Close", popup.destroy).pack()
 
     def pause_membership(self):
-        self.popup_window("Pause Membership", "Your membership is now paused.")
+        if not self.require_member():
+            return
+        try:
+            Memberships.pause(self.conn, self.current_member['member_id'])
+        except ValueError as e:
+            messagebox.showwarning("Pause Membership", str(e))
+            return
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not pause membership: {str(e)}")
+            return
+        self.popup_window("Pause Membership", "Your membership is now paused. You will not be billed while it is paused.")
 
     def reactivate_membership(self):
+        if not self.require_member():
+            return
+        try:
+            Memberships.resume(self.conn, self.current_member['member_id'])
+        except ValueError as e:
+            messagebox.showwarning("Reactivate Membership", str(e))
+            return
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not reactivate membership: {str(e)}")
+            return
         self.popup_window("Reactivate Membership", "Your membership has been reactivated.")
 
     def manage_family_accounts(self):
+        if not self.require_member():
+            return
         popup = tk.Toplevel(self)
         popup.title("Manage Family Accounts")
         popup.configure(bg='black')
-        self.themed_label(popup, "Add Family Member Name:").pack()
+        self.themed_label(popup, "Your household:").pack()
+        household_list = tk.Listbox(popup, width=50, height=8, bg='white', fg='green')
+        household_list.pack(padx=10, pady=5)
+
+        def refresh():
+            household_list.delete(0, tk.END)
+            for member_id, username, plan, depth, payer_id in Households.household(self.conn, self.current_member['member_id']):
+                role = "pays for the household" if payer_id is None else "dependent"
+                household_list.insert(tk.END, f"{'    ' * depth}{username} ({plan or 'no plan'}) - {role}")
+
+        self.themed_label(popup, "Add Family Member Username:").pack()
         family_entry = self.themed_entry(popup)
         family_entry.pack()
-        self.themed_button(popup, "Add", lambda: messagebox.showinfo("Added", f"Added {family_entry.get()} to your family accounts.")).pack()
+        # The family member agrees to being billed to this account by entering their own password
+        self.themed_label(popup, "Their Password (they enter it to agree):").pack()
+        family_password = tk.Entry(popup, show='*', bg='white', fg='green')
+        family_password.pack()
+
+        def add():
+            username = family_entry.get().strip()
+            password = family_password.get()
+            if not username or not password:
+                messagebox.showwarning("Missing Info", "The family member's username and password are required.")
+                return
+
+            def finish_add(member):
+                if not popup.winfo_exists():
+                    return
+                family_password.delete(0, tk.END)
+                if member is None:
+                    messagebox.showwarning("Not Confirmed", "That username and password do not match a member.")
+                    return
+                try:
+                    Households.add_dependent(self.conn, self.current_member['member_id'], member['member_id'])
+                except ValueError as e:
+                    messagebox.showwarning("Not Added", str(e))
+                    return
+                except Exception as e:
+                    messagebox.showerror("Error", f"Could not add family member: {str(e)}")
+                    return
+                family_entry.delete(0, tk.END)
+                refresh()
+                messagebox.showinfo("Added", "They are now billed to you.")
+
+            Passwords.authenticate_async(
+                self, 'members', username, password,
+                on_done=finish_add,
+                on_error=lambda e: messagebox.showerror("Error", f"Could not check their password: {str(e)}")
+            )
+
+        refresh()
+        self.themed_button(popup, "Add", add).pack()
         self.themed_button(popup, "Close", popup.destroy).pack()
 
     def book_gym_classes(self):
+        if not self.require_member():
+            return
         popup = tk.Toplevel(self)
         popup.title("Book Gym Classes")
         popup.configure(bg='black')
-        self.themed_label(popup, "Enter class name to book:").pack()
+        self.themed_label(popup, "Class name (leave blank for all):").pack()
         class_entry = self.themed_entry(popup)
         class_entry.pack()
-        self.themed_button(popup, "Book", lambda: messagebox.showinfo("Booked", f"Booked class: {class_entry.get()}.")).pack(pady=5)
+        self.themed_label(popup, "Date (DD/MM/YYYY, optional):").pack()
+        date_entry = self.themed_entry(popup)
+        date_entry.pack()
+
+        columns = ("class", "date", "time", "duration", "level", "spaces")
+        tree = ttk.Treeview(popup, columns=columns, show='headings', height=10)
+        for column in columns:
+            tree.heading(column, text=column.title())
+            tree.column(column, width=100)
+        tree.pack(padx=10, pady=5)
+
+        def search(quiet=False):
+            try:
+                classes = Bookings.upcoming_classes(self.conn, class_entry.get(), date_entry.get() or None)
+            except ValueError as e:
+                if not quiet:
+                    messagebox.showwarning("Invalid Date", str(e))
+                return
+            # Update rows in place so a refresh keeps the member's selection
+            found = {row[0] for row in classes}
+            tree.delete(*[iid for iid in tree.get_children() if iid not in found])
+            for class_id, name, day, time, duration, level, capacity, spaces in classes:
+                values = (name, day, time, duration, level, "Full" if spaces <= 0 else f"{spaces} of {capacity}")
+                if tree.exists(class_id):
+                    tree.item(class_id, values=values)
+                else:
+                    tree.insert('', 'end', iid=class_id, values=values)
+
+        def refresh_seats():
+            # Seats change as other members book, so keep the open list current
+            if popup.winfo_exists():
+                search(quiet=True)
+                self.after(5000, refresh_seats)
+
+        def book():
+            selected = tree.selection()
+            if not selected:
+                messagebox.showwarning("No Class Selected", "Please select a class to book.")
+                return
+            try:
+                spaces = Bookings.book_class(self.conn, self.current_member['member_id'], selected[0])
+            except ValueError as e:
+                messagebox.showwarning("Not Booked", str(e))
+                search()
+                return
+            except Exception as e:
+                messagebox.showerror("Error", f"Could not book class: {str(e)}")
+                return
+            search()
+            messagebox.showinfo("Booked", f"Booked class: {tree.set(selected[0], 'class')}. {spaces} spaces left.")
+
+        self.themed_button(popup, "Search", search).pack(pady=5)
+        self.themed_button(popup, "Book", book).pack(pady=5)
         self.themed_button(popup, "Close", popup.destroy).pack()
+        refresh_seats()
 
     def view_billing_history(self):
-        self.popup_window("Billing History", "Here is your list of past payments and invoices.")
+        if not self.require_member():
+            return
+        popup = tk.Toplevel(self)
+        popup.title("Billing History")
+        popup.configure(bg='black')
+        self.themed_label(popup, f"Invoices for {self.current_member['username']}").pack(pady=5)
+
+        columns = ("period", "plan", "amount", "paid", "status", "due")
+        tree = ttk.Treeview(popup, columns=columns, show='headings', height=12)
+        for column in columns:
+            tree.heading(column, text=column.title())
+            tree.column(column, width=100)
+        tree.pack(padx=10, pady=5)
+
+        try:
+            history = Billing.billing_history(self.conn, self.current_member['member_id'])
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not load billing history: {str(e)}")
+            history = []
+        for invoice_id, period, plan, amount, paid, status, due_date in history:
+            tree.insert('', 'end', iid=invoice_id, values=(
+                period, plan, f"£{amount / 100:.2f}", f"£{paid / 100:.2f}", status.title(), due_date
+            ))
+        if not history:
+            self.themed_label(popup, "No invoices yet.").pack()
+        self.themed_button(popup, "Close", popup.destroy).pack(pady=5)
 
     def update_payment_method(self):
+        if not self.require_member():
+            return
         popup = tk.Toplevel(self)
         popup.title("Update Payment Method")
         popup.configure(bg='black')
         self.themed_label(popup, "Card Number:").pack()
         card_entry = self.themed_entry(popup)
         card_entry.pack()
-        self.themed_label(popup, "Expiry Date:").pack()
+        self.themed_label(popup, "Expiry Date (MM/YY):").pack()
         expiry_entry = self.themed_entry(popup)
         expiry_entry.pack()
-        self.themed_button(popup, "Save", lambda: messagebox.showinfo("Saved", "Payment method updated.")).pack()
+
+        def save():
+            try:
+                Billing.save_payment_method(
+                    self.conn, self.current_member['member_id'], card_entry.get(), expiry_entry.get()
+                )
+            except ValueError as e:
+                messagebox.showwarning("Invalid Card", str(e))
+                return
+            except Exception as e:
+                messagebox.showerror("Error", f"Could not save payment method: {str(e)}")
+                return
+            messagebox.showinfo("Saved", "Payment method updated.")
+            popup.destroy()
+
+        self.themed_button(popup, "Save", save).pack()
         self.themed_button(popup, "Close", popup.destroy).pack()
 
     def download_receipts(self):
-        self.popup_window("Download Receipts", "Receipts downloaded successfully.")
+        if not self.require_member():
+            return
+        folder = filedialog.askdirectory(parent=self, title="Save receipts to")
+        if not folder:
+            return
+        try:
+            invoices = Billing.billing_history(self.conn, self.current_member['member_id'])
+            for invoice_id, period, *_ in invoices:
+                # Unchanged invoices come straight from the receipt cache
+                path = Receipts.receipt_for(self.conn, invoice_id)
+                shutil.copyfile(path, os.path.join(folder, f"receipt-{period}-{invoice_id}.pdf"))
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not save receipts: {str(e)}")
+            return
+        if invoices:
+            self.popup_window("Download Receipts", f"{len(invoices)} receipts saved to {folder}.")
+        else:
+            self.popup_window("Download Receipts", "No invoices yet.")
 
     def apply_discount_code(self):
         code = self.discount_entry.get()
-        if code:
-            messagebox.showinfo("Discount Applied", f"Code '{code}' applied.")
-        else:
+        if not code.strip():
             messagebox.showwarning("Error", "Please enter a discount code.")
+            return
+        if not self.require_member():
+            return
+        plan = self.conn.execute(
+            "SELECT membership_plan FROM members WHERE member_id = ?", (self.current_member['member_id'],)
+        ).fetchone()[0]
+        price = Plans.price_of(self.conn, plan)
+        if price is None:
+            messagebox.showwarning("Error", "Discount codes need a membership plan.")
+            return
+        try:
+            discount = Discounts.redeem(self.conn, code, self.current_member['member_id'], plan, price)
+        except ValueError as e:
+            messagebox.showwarning("Discount Not Applied", str(e))
+            return
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not apply discount code: {str(e)}")
+            return
+        self.discount_entry.delete(0, tk.END)
+        messagebox.showinfo("Discount Applied",
+                            f"Code '{Discounts.normalise(code)}' takes £{discount / 100:.2f} off your next {plan} plan invoice.")
 
     def sign_up_user(self):
         selected = self.selected_plan.get()
@@ -195,12 +413,26 @@ class FlexGymApp(tk.Tk):
             messagebox.showwarning("No Plan Selected", "Please select a membership plan before signing up.")
         
     def login_user(self):
-        name = self.signup_name.get()
-        email = self.signup_email.get()
-        if not name or not email:
-            messagebox.showwarning("Missing Info", "Name and Email are required to login.")
+        name = self.signup_name.get().strip()
+        password = self.login_password.get()
+        if not name or not password:
+            messagebox.showwarning("Missing Info", "Name (username or member ID) and Password are required to login.")
             return
-        self.show_welcome_page(name, None)
+
+        def finish_login(member):
+            self.login_password.set('')
+            if member is None:
+                messagebox.showerror("Login Failed", "Invalid username, member ID, or password.")
+                return
+            self.current_member = {'username': member['username'], 'member_id': member['member_id']}
+            self.show_welcome_page(member['username'], None)
+
+        # Same check as the Sprint_1 login, on a worker thread since hashing is slow by design
+        Passwords.authenticate_async(
+            self, 'members', name, password,
+            on_done=finish_login,
+            on_error=lambda e: messagebox.showerror("Error", f"Could not log in: {str(e)}")
+        )
 
     def show_welcome_page(self, name, plan):
         popup = tk.Toplevel(self)
@@ -1,5 +1,7 @@
 # Import SQLite library for database operations
 import sqlite3                           
+# Import the shared database helper (enforces foreign keys)
+import Gym_db
 # Import Tkinter for creating GUI applications
 import tkinter as tk                     
 # Import themed widgets and message boxes from Tkinter 
@@ -8,6 +10,10 @@ from tkinter import ttk, messagebox
 from datetime import datetime            
 # Import Calendar widget for date selection in the GUI
 from tkcalendar import Calendar          
+# Import type-ahead filtering for the class ID dropdown
+import Type_ahead
+# Import the occupancy buckets so staff signups show in each class's booked seats
+import Occupancy
 
 # Define the main class for the Gym Class Management GUI application 
 class GymClassManager:                 
@@ -20,8 +26,9 @@ class GymClassManager:
         self.root.configure(bg="#f0f0f0")
         
         # Database setup - create connection and cursor
-        self.conn = sqlite3.connect('gym_database.db')
+        self.conn = Gym_db.get_connection()
         self.cursor = self.conn.cursor()
+        Occupancy.initialize_occupancy_tables(self.conn)
         
         # Configure visual styles for the application
         self.setup_styles()
@@ -297,10 +304,8 @@ class GymClassManager:
         self.signup_class_entry = ttk.Combobox(form_container, width=23)
         self.signup_class_entry.grid(row=2, column=1, padx=5, pady=5, sticky='w')
         
-        # Populate class IDs in dropdown from database
-        self.cursor.execute("SELECT class_id FROM classes")
-        class_ids = [row[0] for row in self.cursor.fetchall()]
-        self.signup_class_entry['values'] = class_ids
+        # Typing narrows the dropdown; the class IDs are loaded by load_classes
+        self.signup_class_filter = Type_ahead.ComboboxFilter(self.signup_class_entry)
         
         # Signup button
         signup_btn = ttk.Button(form_container, text="SIGN UP", command=self.member_signup, 
@@ -371,11 +376,9 @@ class GymClassManager:
             # Insert with capacity display showing available/total
             self.member_class_tree.insert('', tk.END, values=(cls[0], cls[1], cls[2], cls[3], cls[4], f"{available_capacity}/{cls[5]}", cls[6]))
 
-        # Update class ID dropdown in member portal
-        if hasattr(self, 'signup_class_entry'):
-            self.cursor.execute("SELECT class_id FROM classes")
-            class_ids = [row[0] for row in self.cursor.fetchall()]
-            self.signup_class_entry['values'] = class_ids
+        # Update class ID dropdown in member portal from the rows already fetched
+        if hasattr(self, 'signup_class_filter'):
+            self.signup_class_filter.set_values([cls[0] for cls in classes])
 
     def refresh_data(self):
         """Refresh the class data from database"""
@@ -535,7 +538,7 @@ class GymClassManager:
                     messagebox.showerror("Error", "New Class ID already exists")
                     return
 
-            # Update the class record with all fields
+            # Update the class record with all fields (signups follow via ON UPDATE CASCADE)
             self.cursor.execute('''
                 UPDATE classes SET
                 class_id = ?,
@@ -557,14 +560,6 @@ class GymClassManager:
                 original_class_id
             ))
 
-            # If class ID was changed, update all related member_class records
-            if new_class_id != original_class_id:
-                self.cursor.execute('''
-                    UPDATE member_class SET
-                    class_id = ?
-                    WHERE class_id = ?
-                ''', (new_class_id, original_class_id))
-
             self.conn.commit()
             self.update_status(f"Class {original_class_id} updated to {new_class_id} successfully")
             messagebox.showinfo("Success", "Class updated successfully")
@@ -581,9 +576,12 @@ class GymClassManager:
             return
             
         try:
-            # First delete all signups for this class
-            self.cursor.execute("DELETE FROM member_class WHERE class_id=?", (self.class_id_var.get(),))
-            # Then delete the class itself
+            # Its remaining signups stop counting from now, in the same transaction as the delete
+            self.cursor.execute("SELECT COUNT(*) FROM member_class WHERE class_id=?", (self.class_id_var.get(),))
+            signups = self.cursor.fetchone()[0]
+            if signups:
+                Occupancy.record_signup(self.conn, self.class_id_var.get(), delta=-signups)
+            # Delete the class; its signups, assignments and trainer hours cascade with it
             self.cursor.execute("DELETE FROM classes WHERE class_id=?", (self.class_id_var.get(),))
             self.conn.commit()
             self.update_status(f"Class {self.class_id_var.get()} deleted successfully")
@@ -591,6 +589,7 @@ class GymClassManager:
             self.load_classes()
             self.clear_form()
         except Exception as e:
+            self.conn.rollback()
             self.update_status(f"Error: {str(e)}")
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
 
@@ -645,11 +644,13 @@ class GymClassManager:
         # Process signup
         try:
             # Get current date/time for signup record
-            signup_date = datetime.now().strftime("%d/%m/%Y %H:%M")
-            # Insert signup record
+            signed_up_at = datetime.now().replace(second=0, microsecond=0)
+            signup_date = signed_up_at.strftime(Occupancy.SIGNUP_FORMAT)
+            # Insert signup record and count the seat, committed together
             self.cursor.execute('''
                 INSERT INTO member_class VALUES (?, ?, ?)
             ''', (member_id, class_id, signup_date))
+            Occupancy.record_signup(self.conn, class_id, signed_up_at)
             self.conn.commit()
             self.update_status(f"Member {member_id} signed up for class {class_id} successfully")
             messagebox.showinfo("Success", "Member signed up successfully")
@@ -659,6 +660,7 @@ class GymClassManager:
             # Refresh data to show updated capacity
             self.load_classes()
         except Exception as e:
+            self.conn.rollback()
             self.update_status(f"Error: {str(e)}")
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
 
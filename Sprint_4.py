@@ -2,6 +2,8 @@ import sqlite3                             # Import the sqlite3 module to connec
 import tkinter as tk                       # Import the tkinter module to create a GUI (Graphical User Interface) in Python
 from tkinter import ttk, messagebox        # Import ttk for themed widgets
 from datetime import datetime              # Import datetime to work with dates and times 
+import Gym_db                              # Import the shared database helper (enforces foreign keys)
+import Type_ahead                          # Import type-ahead filtering for the selection comboboxes
 
 class ProfessionalTrainerAssignmentApp:    # Define a class to manage the professional trainer assignment GUI
     def __init__(self, root):
@@ -11,7 +13,7 @@ class ProfessionalTrainerAssignmentApp:    # Define a class to manage the profes
         self.root.minsize(1000, 650)
         
         # Create database connection 
-        self.conn = sqlite3.connect('gym_database.db')
+        self.conn = Gym_db.get_connection()
         self.cursor = self.conn.cursor()
         
         # Configure style
@@ -342,12 +344,13 @@ class ProfessionalTrainerAssignmentApp:    # Define a class to manage the profes
         self.class_combobox = ttk.Combobox(
             self.form_frame,
             textvariable=self.class_var,
-            state="readonly",
             font=('Helvetica', 10),
             width=30
         )
         self.class_combobox.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
         self.class_combobox.bind("<<ComboboxSelected>>", self.update_class_details)
+        # Typing narrows the dropdown to matching classes
+        self.class_filter = Type_ahead.ComboboxFilter(self.class_combobox)
         
         # Class Details
         self.class_details_frame = ttk.Frame(self.form_frame)
@@ -377,11 +380,12 @@ class ProfessionalTrainerAssignmentApp:    # Define a class to manage the profes
         self.trainer_combobox = ttk.Combobox(
             self.form_frame,
             textvariable=self.trainer_var,
-            state="readonly",
             font=('Helvetica', 10),
             width=30
         )
         self.trainer_combobox.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+        # Typing narrows the dropdown to matching trainers
+        self.trainer_filter = Type_ahead.ComboboxFilter(self.trainer_combobox)
         
         # Assignment Button
         self.assign_button = ttk.Button(
@@ -545,19 +549,21 @@ class ProfessionalTrainerAssignmentApp:    # Define a class to manage the profes
                     return
             
             with self.conn:
+                # A changed ID reaches assignments and trainer_hours via ON UPDATE CASCADE
                 self.cursor.execute(
                     "UPDATE trainers SET staff_id = ?, forname = ?, surname = ? WHERE staff_id = ?",
                     (new_trainer_id, first_name, last_name, original_trainer_id)
                 )
                 
+                # Only the copied display names still need refreshing
                 self.cursor.execute(
-                    "UPDATE assignments SET trainer_id = ?, trainer_name = ? WHERE trainer_id = ?",
-                    (new_trainer_id, f"{first_name} {last_name}", original_trainer_id)
+                    "UPDATE assignments SET trainer_name = ? WHERE trainer_id = ?",
+                    (f"{first_name} {last_name}", new_trainer_id)
                 )
                 
                 self.cursor.execute(
-                    "UPDATE trainer_hours SET trainer_id = ?, trainer_name = ? WHERE trainer_id = ?",
-                    (new_trainer_id, f"{first_name} {last_name}", original_trainer_id)
+                    "UPDATE trainer_hours SET trainer_name = ? WHERE trainer_id = ?",
+                    (f"{first_name} {last_name}", new_trainer_id)
                 )
             
             self.update_status(f"Updated trainer: {first_name} {last_name} (ID: {new_trainer_id})")
@@ -594,19 +600,7 @@ class ProfessionalTrainerAssignmentApp:    # Define a class to manage the profes
             return
         
         try:
-            self.cursor.execute(
-                "SELECT COUNT(*) FROM assignments WHERE trainer_id = ?",
-                (trainer_id,)
-            )
-            assignment_count = self.cursor.fetchone()[0]
-            
-            if assignment_count > 0:
-                messagebox.showwarning(
-                    "Cannot Delete",
-                    f"This trainer has {assignment_count} assignments and cannot be deleted"
-                )
-                return
-            
+            # The foreign keys refuse the delete while assignments or hours reference the trainer
             self.cursor.execute(
                 "DELETE FROM trainers WHERE staff_id = ?",
                 (trainer_id,)
@@ -619,6 +613,13 @@ class ProfessionalTrainerAssignmentApp:    # Define a class to manage the profes
             self.load_trainers_list()
             self.load_data()
             
+        except sqlite3.IntegrityError:
+            self.conn.rollback()
+            self.update_status(f"Cannot delete trainer {trainer_id}: still referenced")
+            messagebox.showwarning(
+                "Cannot Delete",
+                "This trainer has assignments or logged hours and cannot be deleted"
+            )
         except Exception as e:
             self.conn.rollback()
             self.update_status(f"Error deleting trainer: {str(e)}")
@@ -664,14 +665,14 @@ class ProfessionalTrainerAssignmentApp:    # Define a class to manage the profes
             self.cursor.execute("SELECT class_id, class_name, date, time, duration FROM classes")
             classes = self.cursor.fetchall()
             class_display = [f"{c[0]} - {c[1]} ({c[2]} at {c[3]})" for c in classes]
-            self.class_combobox["values"] = class_display
+            self.class_filter.set_values(class_display)
             self.class_data = {display: c for display, c in zip(class_display, classes)}
             
             # Load trainers into combobox
             self.cursor.execute("SELECT staff_id, forname || ' ' || surname FROM trainers")
             trainers = self.cursor.fetchall()
             trainer_display = [f"{t[0]} - {t[1]}" for t in trainers]
-            self.trainer_combobox["values"] = trainer_display
+            self.trainer_filter.set_values(trainer_display)
             self.trainer_data = {display: t for display, t in zip(trainer_display, trainers)}
             
             # Load current assignments
@@ -709,6 +710,12 @@ class ProfessionalTrainerAssignmentApp:    # Define a class to manage the profes
             messagebox.showwarning("Selection Required", "Please select both a class and a trainer")
             return
         
+        # The comboboxes accept typing, so make sure the text is an actual entry
+        if selected_class not in self.class_data or selected_trainer not in self.trainer_data:
+            self.update_status("Please choose a class and a trainer from the lists")
+            messagebox.showwarning("Selection Required", "Please choose a class and a trainer from the lists")
+            return
+        
         class_id, class_name, date, time, duration = self.class_data[selected_class]
         trainer_id, trainer_name = self.trainer_data[selected_trainer]
         duration_min = int(duration.replace("min", "").strip())
@@ -734,14 +741,16 @@ class ProfessionalTrainerAssignmentApp:    # Define a class to manage the profes
                 ''',
                 (class_id, class_name, trainer_id, trainer_name, date, duration_min, assignment_date)
             )
+            assignment_id = self.cursor.lastrowid
             
+            # Hours are linked to the assignment so deleting it removes them too
             self.cursor.execute(
                 '''
                 INSERT INTO trainer_hours 
-                (trainer_id, trainer_name, date, minutes_worked)
-                VALUES (?, ?, ?, ?)
+                (trainer_id, trainer_name, date, minutes_worked, assignment_id)
+                VALUES (?, ?, ?, ?, ?)
                 ''',
-                (trainer_id, trainer_name, date, duration_min)
+                (trainer_id, trainer_name, date, duration_min, assignment_id)
             )
             
             self.conn.commit()
@@ -781,25 +790,12 @@ class ProfessionalTrainerAssignmentApp:    # Define a class to manage the profes
             return
         
         try:
+            # The linked trainer_hours record is removed by ON DELETE CASCADE
             self.cursor.execute(
                 "DELETE FROM assignments WHERE class_id = ? AND trainer_id = ? AND date = ?",
                 (class_id, trainer_id, date)
             )
             
-            self.cursor.execute(
-                '''
-                UPDATE trainer_hours 
-                SET minutes_worked = minutes_worked - ?
-                WHERE trainer_id = ? AND date = ?
-                ''',
-                (int(duration), trainer_id, date)
-            )
-            
-            self.cursor.execute(
-                "DELETE FROM trainer_hours WHERE trainer_id = ? AND date = ? AND minutes_worked <= 0",
-                (trainer_id, date)
-            )
-            
             self.conn.commit()
             
             self.load_assignments()
@@ -0,0 +1,90 @@
+import re  # Import regular expressions to split display strings into words
+from bisect import bisect_left  # Import bisect for prefix lookups in the sorted word list
+
+# Most entries shown in a filtered dropdown
+DEFAULT_LIMIT = 50
+
+# Keys that move around the dropdown rather than change the typed text
+NAVIGATION_KEYS = {'Up', 'Down', 'Left', 'Right', 'Return', 'Escape', 'Tab', 'Home', 'End'}
+
+WORD_RE = re.compile(r"\w+")
+
+
+class TypeAheadIndex:
+    """Sorted word index over display strings for keystroke-speed filtering"""
+
+    def __init__(self, values=(), limit=DEFAULT_LIMIT):
+        self.limit = limit
+        self.reset(values)
+
+    def reset(self, values):
+        """Rebuild the index for a new list of display strings"""
+        self.values = list(values)
+        self._lowered = [value.lower() for value in self.values]
+        # One (word, position) entry per distinct word so any word can be prefix-matched
+        self._words = sorted(
+            (word, position)
+            for position, text in enumerate(self._lowered)
+            for word in set(WORD_RE.findall(text))
+        )
+        self._keys = [word for word, _ in self._words]
+        self._last_query = None
+        self._last_matches = []
+
+    def _word_prefix_hits(self, prefix):
+        """Positions of values containing a word that starts with prefix"""
+        start = bisect_left(self._keys, prefix)
+        end = bisect_left(self._keys, prefix + '\uffff')
+        return {position for _, position in self._words[start:end]}
+
+    def _all_matches(self, query):
+        """Every matching position: word-prefix hits first, then substring hits"""
+        # Typing one more character can only narrow the previous result
+        if self._last_query and query.startswith(self._last_query):
+            candidates = self._last_matches
+        else:
+            candidates = range(len(self.values))
+
+        words = WORD_RE.findall(query)
+        prefix_hits = None
+        for word in words:
+            hits = self._word_prefix_hits(word)
+            prefix_hits = hits if prefix_hits is None else prefix_hits & hits
+        prefix_hits = prefix_hits or set()
+
+        first = [position for position in candidates if position in prefix_hits]
+        rest = [position for position in candidates
+                if position not in prefix_hits and query in self._lowered[position]]
+        # Keep value order inside each group so the combined list stays a valid narrowing base
+        matches = sorted(first) + sorted(rest)
+
+        self._last_query = query
+        self._last_matches = matches
+        return matches
+
+    def matches(self, text):
+        """Return up to limit display strings matching the typed text"""
+        query = text.strip().lower()
+        if not query:
+            return self.values[:self.limit]
+        return [self.values[position] for position in self._all_matches(query)[:self.limit]]
+
+
+class ComboboxFilter:
+    """Narrow a combobox's dropdown to the best matches as the user types"""
+
+    def __init__(self, combobox, values=(), limit=DEFAULT_LIMIT):
+        self.combobox = combobox
+        self.index = TypeAheadIndex(values, limit)
+        self.combobox['values'] = self.index.matches('')
+        self.combobox.bind('<KeyRelease>', self.on_key, add='+')
+
+    def set_values(self, values):
+        """Replace the full list of choices (e.g. after reloading from the database)"""
+        self.index.reset(values)
+        self.combobox['values'] = self.index.matches(self.combobox.get())
+
+    def on_key(self, event):
+        if event.keysym in NAVIGATION_KEYS:
+            return
+        self.combobox['values'] = self.index.matches(self.combobox.get())